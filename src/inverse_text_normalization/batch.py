@@ -0,0 +1,67 @@
+'''
+Batch engine for inverse text normalization.
+
+Identical sentences of a batch are normalized once and sentences without any content
+are returned without running the grammars.
+'''
+
+import time
+from collections import namedtuple
+from typing import Callable, List, Tuple
+
+BatchReport = namedtuple('BatchReport', 'lang sentences unique skipped seconds')
+
+
+def is_blank(text: str) -> bool:
+    """
+    Returns true if text has nothing to normalize
+    """
+    return not text or text.isspace()
+
+
+def sentences_per_second(report: BatchReport) -> float:
+    """
+    Returns throughput of a batch
+    """
+    if report.seconds <= 0:
+        return float('inf')
+    return report.sentences / report.seconds
+
+
+def run_batch(
+    text_list: List[str], lang: str, normalize: Callable[[List[str], str], List[str]]
+) -> Tuple[List[str], BatchReport]:
+    """
+    Normalizes a batch of sentences, calling `normalize` once on the unique non blank sentences
+
+    Args:
+        text_list: list of sentences
+        lang: language code
+        normalize: function mapping a list of sentences and language code to normalized sentences
+
+    Returns: normalized sentences in input order, batch report
+    """
+    start = time.perf_counter()
+
+    unique = []
+    unique_index = {}
+    positions = []
+    skipped = 0
+    for text in text_list:
+        if is_blank(text):
+            positions.append(None)
+            skipped += 1
+            continue
+        index = unique_index.get(text)
+        if index is None:
+            index = unique_index[text] = len(unique)
+            unique.append(text)
+        positions.append(index)
+
+    unique_results = normalize(unique, lang) if unique else []
+    results = ['' if index is None else unique_results[index] for index in positions]
+
+    report = BatchReport(
+        lang=lang, sentences=len(text_list), unique=len(unique), skipped=skipped, seconds=time.perf_counter() - start
+    )
+    return results, report
@@ -0,0 +1,153 @@
+'''
+Benchmark of the final verbalizer.
+
+Builds the raw `VerbalizeFinalFst` of each language, as the grammars used to, and the optimized,
+arc sorted one, then times composing serialized tokens with each of them, for whole sentences and
+for single tokens as verbalized by token_verbalizer.py. Both variants are built from source in the
+same process, exported FAR archives are ignored, so the build times compare building the grammars.
+
+Usage:
+    python -m inverse_text_normalization.benchmark_verbalizer [--langs hi en ...] [--repeat 20]
+'''
+
+import importlib
+import platform
+import time
+from argparse import ArgumentParser
+from collections import namedtuple
+from typing import Iterable, List, Optional
+
+from inverse_text_normalization.grammar_cache import get_package_dir, ignore_exported
+from inverse_text_normalization.registry import LANGUAGE_PACKAGES, get_package
+
+# serialized tagger output covering every semiotic class, the verbalizers of all languages read the same fields
+SAMPLE_TOKENS = [
+    'tokens { cardinal { integer: "200" } }',
+    'tokens { cardinal { negative: "-" integer: "15" } }',
+    'tokens { ordinal { integer: "21" } }',
+    'tokens { decimal { integer_part: "2" fractional_part: "5" } }',
+    'tokens { money { currency: "₹" integer_part: "200" } }',
+    'tokens { measure { cardinal { integer: "5" } units: "kg" } }',
+    'tokens { time { hours: "2" minutes: "15" } }',
+    'tokens { date { day: "5" month: "january" year: "2012" preserve_order: true } }',
+]
+SAMPLE_WORDS = [
+    'tokens { name: "word" }',
+    'tokens { name: "," pause_length: "PAUSE_MEDIUM phrase_break: true type: PUNCT" }',
+]
+
+BenchmarkResult = namedtuple(
+    'BenchmarkResult', 'lang variant build_seconds num_states num_arcs sentence_ms token_ms'
+)
+
+
+def sample_sentences() -> List[str]:
+    """
+    Returns serialized sentences mixing words and every semiotic class
+    """
+    sentences = []
+    for i, token in enumerate(SAMPLE_TOKENS):
+        words = [SAMPLE_WORDS[0]] * (i % 3 + 2)
+        sentences.append(' '.join(words + [token] + words + [SAMPLE_WORDS[1]]))
+    return sentences
+
+
+def _verbalize(fst, tagged_text: str) -> Optional[str]:
+    import pynini
+
+    lattice = pynini.escape(tagged_text) @ fst
+    if lattice.num_states() == 0:
+        return None
+    return pynini.shortestpath(lattice, nshortest=1, unique=True).string()
+
+
+def _time_ms(fst, texts: List[str], repeat: int) -> float:
+    if not texts:
+        return 0.0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            _verbalize(fst, text)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(texts))
+
+
+def benchmark_package(package: str, repeat: int = 20) -> List[BenchmarkResult]:
+    """
+    Times the raw and the optimized final verbalizer of a language package
+
+    Args:
+        package: language package name, e.g. 'hi'
+        repeat: number of times every sample is verbalized
+
+    Returns: list of results, raw first
+    """
+    verbalize_final = importlib.import_module(f'inverse_text_normalization.{package}.verbalizers.verbalize_final')
+
+    with ignore_exported(get_package_dir(package)):
+        start = time.perf_counter()
+        raw = verbalize_final.VerbalizeFinalFst(optimize=False).fst
+        raw_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        optimized = verbalize_final.VerbalizeFinalFst().fst
+        optimized_seconds = time.perf_counter() - start
+
+    # not every language verbalizes every sample, e.g. month names, only the accepted ones are timed
+    sentences = [sentence for sentence in sample_sentences() if _verbalize(raw, sentence) is not None]
+    tokens = [token for token in SAMPLE_TOKENS if _verbalize(raw, token) is not None]
+    for text in sentences + tokens:
+        if _verbalize(optimized, text) != _verbalize(raw, text):
+            raise ValueError(f"{package}: optimized verbalizer output differs for {text}")
+
+    return [
+        BenchmarkResult(
+            lang=package,
+            variant=variant,
+            build_seconds=build_seconds,
+            num_states=fst.num_states(),
+            num_arcs=sum(fst.num_arcs(state) for state in fst.states()),
+            sentence_ms=_time_ms(fst, sentences, repeat),
+            token_ms=_time_ms(fst, tokens, repeat),
+        )
+        for variant, fst, build_seconds in [('raw', raw, raw_seconds), ('optimized', optimized, optimized_seconds)]
+    ]
+
+
+def run_benchmark(langs: Optional[Iterable[str]] = None, repeat: int = 20) -> List[BenchmarkResult]:
+    """
+    Benchmarks the final verbalizer of the given languages and prints a table
+
+    Args:
+        langs: language codes, all languages if None
+        repeat: number of times every sample is verbalized
+
+    Returns: list of results
+    """
+    langs = LANGUAGE_PACKAGES if langs is None else langs
+    # languages sharing a package, e.g. en and en_bio, share their verbalizer
+    packages = list(dict.fromkeys(get_package(lang) for lang in langs))
+    import pynini
+
+    print(f"{platform.processor() or platform.machine()}, python {platform.python_version()}, "
+          f"pynini {pynini.__version__}, {repeat} repeats, grammars built from source")
+    print(f"{'lang':<6}{'variant':<11}{'build s':>9}{'states':>9}{'arcs':>10}{'sentence ms':>13}{'token ms':>10}")
+    results = []
+    for package in packages:
+        for result in benchmark_package(package, repeat=repeat):
+            print(
+                f"{package:<6}{result.variant:<11}{result.build_seconds:>9.2f}{result.num_states:>9}"
+                f"{result.num_arcs:>10}{result.sentence_ms:>13.3f}{result.token_ms:>10.3f}"
+            )
+            results.append(result)
+    return results
+
+
+def parse_args():
+    parser = ArgumentParser(description="Times composition with the raw and the optimized final verbalizer")
+    parser.add_argument("--langs", help="language codes, default all", nargs='+', required=False, type=str)
+    parser.add_argument("--repeat", help="times every sample is verbalized", default=20, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_benchmark(args.langs, args.repeat)
@@ -17,6 +17,7 @@
 # lang_taggers = f'inverse_text_normalization.taggers.{LANG}_taggers'
 lang_taggers = 'inverse_text_normalization.bn.taggers'
 
+from inverse_text_normalization.components import ComponentRegistry
 from inverse_text_normalization.bn.graph_utils import GraphFst
 exec(f"from {lang_taggers}.cardinal import CardinalFst")
 exec(f"from {lang_taggers}.date import DateFst")
@@ -39,26 +40,30 @@ except (ModuleNotFoundError, ImportError):
 class ClassifyFst(GraphFst):
     """
     Composes other classfier grammars. This class will be compiled and exported to thrax FAR. 
+
+    components: registry of the sub grammars, shared with the other classifiers of the language, a new one if None
     """
 
-    def __init__(self):
+    def __init__(self, components: ComponentRegistry = None):
         super().__init__(name="tokenize_and_classify", kind="classify")
+        if components is None:
+            components = ComponentRegistry()
 
-        cardinal_graph_fst = CardinalFst()
+        cardinal_graph_fst = components.get(CardinalFst)
         cardinal = cardinal_graph_fst.fst
 
-        ordinal_graph_fst = OrdinalFst(cardinal_graph_fst)
+        ordinal_graph_fst = components.get(OrdinalFst, cardinal_graph_fst)
         ordinal = ordinal_graph_fst.fst
 
-        decimal_graph_fst = DecimalFst(cardinal_graph_fst)
+        decimal_graph_fst = components.get(DecimalFst, cardinal_graph_fst)
         decimal = decimal_graph_fst.fst
 
-        measure = MeasureFst(cardinal_graph_fst, decimal_graph_fst).fst
-        date = DateFst(ordinal_graph_fst).fst
-        word = WordFst().fst
-        time = TimeFst().fst
-        money = MoneyFst(cardinal_graph_fst, decimal_graph_fst).fst
-        whitelist = WhiteListFst().fst
+        measure = components.get(MeasureFst, cardinal_graph_fst, decimal_graph_fst).fst
+        date = components.get(DateFst, ordinal_graph_fst).fst
+        word = components.get(WordFst).fst
+        time = components.get(TimeFst, cardinal_graph_fst).fst
+        money = components.get(MoneyFst, cardinal_graph_fst, decimal_graph_fst).fst
+        whitelist = components.get(WhiteListFst).fst
 
         graph = (
             pynutil.add_weight(whitelist, 1.01)
@@ -0,0 +1,345 @@
+'''
+Resumable bulk normalization of large corpora.
+
+The input file is split into shards at line boundaries near equal byte offsets. Shards are
+normalized in parallel on a pool of processes forked after the grammars are built, each writing
+its own output file in the work directory. After every micro batch a shard flushes its output
+and updates its checkpoint manifest, so a job that was killed resumes where every shard stopped
+when it is started again with the same work directory. Once all shards are done their outputs
+are merged in input order and a summary with lines, errors and throughput per shard is written.
+
+A line the grammars fail on is written unchanged and counted as an error.
+
+Gzip compressed inputs cannot be split by byte offset and are processed as a single, still
+resumable, shard.
+
+Usage:
+    python -m inverse_text_normalization.bulk --lang hi --input corpus.txt --output corpus.itn.txt \
+        [--work_dir corpus.itn.txt.work] [--shards 64] [--workers 8] [--batch_size 1024]
+'''
+
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import warnings
+from argparse import ArgumentParser
+from collections import namedtuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from inverse_text_normalization.parallel import fork_available
+from inverse_text_normalization.registry import preload
+from inverse_text_normalization.stream import DEFAULT_BATCH_SIZE
+
+JOB_FILE = 'job.json'
+SUMMARY_FILE = 'summary.json'
+# error messages kept per shard in its manifest
+MAX_ERROR_SAMPLES = 5
+
+Shard = namedtuple('Shard', 'index start end')
+ShardTask = namedtuple('ShardTask', 'input_path work_dir lang batch_size normalize shard')
+
+
+def _normalize_lines(text_list: List[str], lang: str) -> List[str]:
+    from inverse_text_normalization.run_predict import inverse_normalize_text
+
+    return inverse_normalize_text(text_list, lang)
+
+
+def _is_compressed(path: str) -> bool:
+    return path.endswith('.gz')
+
+
+def _open_input(path: str):
+    # binary, so offsets can be told and seeked, gzip offsets count uncompressed bytes
+    return gzip.open(path, 'rb') if _is_compressed(path) else open(path, 'rb')
+
+
+def _write_json(path: str, data: Dict):
+    # written next to the target and renamed, so a killed job never leaves a partial manifest
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fp:
+        json.dump(data, fp, indent=2, ensure_ascii=False)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def shard_file(path: str, shards: int) -> List[Shard]:
+    """
+    Splits a file into shards starting at line boundaries near equal byte offsets
+
+    Args:
+        path: input file
+        shards: number of shards, fewer are returned for files with fewer lines
+
+    Returns: list of Shard, end is None for a compressed file read to its end
+    """
+    if _is_compressed(path):
+        return [Shard(index=0, start=0, end=None)]
+
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as fp:
+        for i in range(1, shards):
+            offset = size * i // shards
+            if offset <= boundaries[-1]:
+                continue
+            # the line containing the byte before offset ends the previous shard
+            fp.seek(offset - 1)
+            fp.readline()
+            position = fp.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+    boundaries.append(size)
+    return [Shard(index=i, start=start, end=end) for i, (start, end) in enumerate(zip(boundaries, boundaries[1:]))]
+
+
+def _shard_path(work_dir: str, index: int, extension: str) -> str:
+    return os.path.join(work_dir, f'shard-{index:05d}.{extension}')
+
+
+def _read_batches(fp, end: Optional[int], batch_size: int) -> Iterator[Tuple[List[str], int]]:
+    # yields lines of the shard with the input offset after the last of them
+    batch = []
+    while end is None or fp.tell() < end:
+        line = fp.readline()
+        if not line:
+            break
+        batch.append(line.decode('utf-8').strip())
+        if len(batch) == batch_size:
+            yield batch, fp.tell()
+            batch = []
+    if batch:
+        yield batch, fp.tell()
+
+
+def _normalize_batch(
+    normalize: Callable[[List[str], str], List[str]], batch: List[str], lang: str
+) -> Tuple[List[str], List[str]]:
+    # returns outputs and error messages, lines are retried one by one if the batch fails
+    try:
+        return normalize(batch, lang), []
+    except Exception:
+        pass
+
+    results = []
+    errors = []
+    for line in batch:
+        try:
+            results.extend(normalize([line], lang))
+        except Exception as e:
+            results.append(line)
+            errors.append(f"{type(e).__name__}: {e}: {line[:200]}")
+    return results, errors
+
+
+def run_shard(task: ShardTask) -> Dict:
+    """
+    Normalizes a shard, resuming from its checkpoint manifest
+
+    Args:
+        task: ShardTask
+
+    Returns: checkpoint manifest of the finished shard
+    """
+    shard = task.shard
+    manifest_path = _shard_path(task.work_dir, shard.index, 'json')
+    output_path = _shard_path(task.work_dir, shard.index, 'txt')
+
+    manifest = _read_json(manifest_path)
+    if manifest is None:
+        manifest = {
+            'index': shard.index,
+            'start': shard.start,
+            'end': shard.end,
+            'offset': shard.start,
+            'lines': 0,
+            'errors': 0,
+            'error_samples': [],
+            'output_bytes': 0,
+            'seconds': 0.0,
+            'done': False,
+        }
+    if manifest['done']:
+        return manifest
+
+    start = time.perf_counter()
+    seconds = manifest['seconds']
+    with open(output_path, 'r+b' if os.path.exists(output_path) else 'wb') as out, _open_input(task.input_path) as fp:
+        # drop output written after the last checkpoint
+        out.truncate(manifest['output_bytes'])
+        out.seek(manifest['output_bytes'])
+        fp.seek(manifest['offset'])
+
+        for batch, offset in _read_batches(fp, shard.end, task.batch_size):
+            results, errors = _normalize_batch(task.normalize, batch, task.lang)
+            out.write(''.join(result + '\n' for result in results).encode('utf-8'))
+            out.flush()
+            os.fsync(out.fileno())
+
+            manifest['offset'] = offset
+            manifest['lines'] += len(batch)
+            manifest['errors'] += len(errors)
+            manifest['error_samples'] = (manifest['error_samples'] + errors)[:MAX_ERROR_SAMPLES]
+            manifest['output_bytes'] = out.tell()
+            manifest['seconds'] = seconds + time.perf_counter() - start
+            _write_json(manifest_path, manifest)
+
+    manifest['seconds'] = seconds + time.perf_counter() - start
+    manifest['done'] = True
+    _write_json(manifest_path, manifest)
+    return manifest
+
+
+def _load_job(input_path: str, work_dir: str, lang: str, shards: int) -> List[Shard]:
+    # the shards of a work directory are fixed by its first run, so checkpoints stay valid
+    stat = os.stat(input_path)
+    job = {
+        'input': os.path.abspath(input_path),
+        'input_bytes': stat.st_size,
+        'input_mtime': stat.st_mtime,
+        'lang': lang,
+    }
+    job_path = os.path.join(work_dir, JOB_FILE)
+    stored = _read_json(job_path)
+    if stored is not None:
+        if any(stored.get(key) != value for key, value in job.items()):
+            raise ValueError(f"{work_dir} belongs to another job or the input changed, use a new work directory")
+        return [Shard(*shard) for shard in stored['shards']]
+
+    job['shards'] = [list(shard) for shard in shard_file(input_path, shards)]
+    _write_json(job_path, job)
+    return [Shard(*shard) for shard in job['shards']]
+
+
+def merge_outputs(work_dir: str, shards: List[Shard], output_path: str):
+    """
+    Concatenates the outputs of the shards in input order, gzip compressed if output_path ends with .gz
+    """
+    tmp_path = output_path + '.tmp'
+    with (gzip.open(tmp_path, 'wb') if _is_compressed(output_path) else open(tmp_path, 'wb')) as out:
+        for shard in shards:
+            with open(_shard_path(work_dir, shard.index, 'txt'), 'rb') as fp:
+                shutil.copyfileobj(fp, out)
+    os.replace(tmp_path, output_path)
+
+
+def _summarize(input_path: str, output_path: str, lang: str, manifests: List[Dict], seconds: float) -> Dict:
+    shards = [
+        {
+            'index': manifest['index'],
+            'lines': manifest['lines'],
+            'errors': manifest['errors'],
+            'error_samples': manifest['error_samples'],
+            'seconds': manifest['seconds'],
+            'sentences_per_second': manifest['lines'] / manifest['seconds'] if manifest['seconds'] > 0 else None,
+        }
+        for manifest in manifests
+    ]
+    return {
+        'input': input_path,
+        'output': output_path,
+        'lang': lang,
+        'lines': sum(shard['lines'] for shard in shards),
+        'errors': sum(shard['errors'] for shard in shards),
+        'seconds': seconds,
+        'shards': shards,
+    }
+
+
+def run_job(
+    input_path: str,
+    output_path: str,
+    lang: str,
+    work_dir: Optional[str] = None,
+    shards: int = 64,
+    workers: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    normalize: Optional[Callable[[List[str], str], List[str]]] = None,
+) -> Dict:
+    """
+    Normalizes a file in parallel shards, resuming the shards of an earlier run of the same work directory,
+    and merges their outputs in input order
+
+    Args:
+        input_path: input file, one sentence per line, .gz is decompressed
+        output_path: output file, one normalized sentence per input line, .gz is compressed
+        lang: language code
+        work_dir: directory of shard outputs, checkpoint manifests and summary, output_path + '.work' if None
+        shards: number of shards of a new job
+        workers: number of worker processes
+        batch_size: number of lines normalized between two checkpoints of a shard
+        normalize: module level function mapping a list of sentences and language code to normalized sentences,
+            `run_predict.inverse_normalize_text` if None
+
+    Returns: summary with lines, errors and throughput per shard, also written to the work directory
+    """
+    start = time.perf_counter()
+    work_dir = output_path + '.work' if work_dir is None else work_dir
+    os.makedirs(work_dir, exist_ok=True)
+    job_shards = _load_job(input_path, work_dir, lang, shards)
+
+    if normalize is None:
+        # built before forking, so the workers share the grammars
+        preload([lang])
+        normalize = _normalize_lines
+    tasks = [ShardTask(input_path, work_dir, lang, batch_size, normalize, shard) for shard in job_shards]
+
+    if workers > 1 and len(tasks) > 1 and not fork_available():
+        warnings.warn("Forking worker processes is not supported on this platform, normalizing in a single process")
+        workers = 1
+    if workers > 1 and len(tasks) > 1:
+        with multiprocessing.get_context('fork').Pool(processes=min(workers, len(tasks))) as pool:
+            manifests = list(pool.imap_unordered(run_shard, tasks))
+    else:
+        manifests = [run_shard(task) for task in tasks]
+    manifests.sort(key=lambda manifest: manifest['index'])
+
+    merge_outputs(work_dir, job_shards, output_path)
+    summary = _summarize(input_path, output_path, lang, manifests, time.perf_counter() - start)
+    _write_json(os.path.join(work_dir, SUMMARY_FILE), summary)
+    return summary
+
+
+def parse_args():
+    parser = ArgumentParser(description="Normalizes a large file in parallel, resumable shards")
+    parser.add_argument("--lang", help="language code", required=True, type=str)
+    parser.add_argument("--input", help="input file, .gz is decompressed", required=True, type=str)
+    parser.add_argument("--output", help="output file, .gz is compressed", required=True, type=str)
+    parser.add_argument("--work_dir", help="shard outputs and checkpoints, default <output>.work", type=str)
+    parser.add_argument("--shards", help="number of shards of a new job", default=64, type=int)
+    parser.add_argument("--workers", help="worker processes", default=1, type=int)
+    parser.add_argument("--batch_size", help="lines between checkpoints", default=DEFAULT_BATCH_SIZE, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    job_summary = run_job(
+        args.input,
+        args.output,
+        args.lang,
+        work_dir=args.work_dir,
+        shards=args.shards,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    )
+    for shard_summary in job_summary['shards']:
+        print(
+            f"shard {shard_summary['index']:>5}: {shard_summary['lines']} lines, {shard_summary['errors']} errors, "
+            f"{shard_summary['seconds']:.1f}s"
+        )
+    print(
+        f"{job_summary['lang']}: {job_summary['lines']} lines, {job_summary['errors']} errors, "
+        f"{job_summary['seconds']:.1f}s -> {job_summary['output']}"
+    )
@@ -0,0 +1,55 @@
+'''
+Registry of the sub grammars of a language.
+
+The classifiers of a language are built from the same sub grammars: ClassifyFst and
+ClassifyNumberFst of hi both use cardinal, decimal, money, ..., TimeFst uses cardinal, and every
+final classifier uses punctuation. Building them through a registry compiles each sub grammar
+once and hands the same instance to every grammar using it.
+
+A component is identified by its class and the components it is built from, e.g.
+    cardinal = components.get(CardinalFst)
+    decimal = components.get(DecimalFst, cardinal)
+
+The registry keeps every component alive; drop it once the final grammars are built to free the
+sub grammars.
+'''
+
+import threading
+from typing import Type
+
+class ComponentRegistry:
+    """
+    Builds every sub grammar of a language once
+    """
+
+    def __init__(self):
+        self._components = {}
+        self._lock = threading.RLock()
+        self.builds = 0
+
+    def get(self, component_class: Type, *components):
+        """
+        Returns the shared instance of a sub grammar, built on first use
+
+        Args:
+            component_class: GraphFst subclass, e.g. CardinalFst
+            components: components the grammar is built from, in the order of its constructor
+
+        Returns: GraphFst
+        """
+        # components are kept alive by the registry, so their ids are stable
+        key = (component_class, tuple(id(component) for component in components))
+        with self._lock:
+            component = self._components.get(key)
+            if component is None:
+                component = component_class(*components)
+                self._components[key] = component
+                self.builds += 1
+            return component
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def clear(self):
+        with self._lock:
+            self._components.clear()
@@ -17,6 +17,9 @@ import os
 import string
 from pathlib import Path
 
+from inverse_text_normalization.grammar_cache import is_cache_valid
+from inverse_text_normalization.profiler import instrument
+
 try:
     import pynini
     from inverse_text_normalization.en.data_loader_utils import get_abs_path
@@ -151,6 +154,11 @@ class GraphFst:
         kind: either 'classify' or 'verbalize'
     """
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # records build time and size of every grammar while profiling, see profiler.py
+        instrument(cls)
+
     def __init__(self, name: str, kind: str):
         self.name = name
         self.kind = str
@@ -162,9 +170,9 @@ class GraphFst:
 
     def far_exist(self) -> bool:
         """
-        Returns true if FAR can be loaded
+        Returns true if FAR can be loaded, i.e. it was exported from the current grammar data
         """
-        return self.far_path.exists()
+        return self.far_path.exists() and is_cache_valid(os.path.dirname(__file__))
 
     @property
     def fst(self) -> 'pynini.FstLike':
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from inverse_text_normalization.components import ComponentRegistry
 from inverse_text_normalization.en.graph_utils import GraphFst, delete_extra_space, delete_space
 from inverse_text_normalization.en.taggers.punctuation import PunctuationFst
 from inverse_text_normalization.en.taggers.tokenize_and_classify import ClassifyFst
@@ -29,13 +30,20 @@ class ClassifyFinalFst(GraphFst):
     """
     Final FST that tokenizes an entire sentence
         e.g. its twelve thirty now. -> tokens { name: "its" } tokens { time { hours: "12" minutes: "30" } } tokens { name: "now" } tokens { name: "." pause_length: "PAUSE_LONG phrase_break: true type: PUNCT" }
+
+    components: registry of the sub grammars, shared with the other classifiers of the language, a new one if None
     """
 
-    def __init__(self):
+    def __init__(self, components: ComponentRegistry = None):
         super().__init__(name="tokenize_and_classify_final", kind="classify")
-
-        classify = ClassifyFst().fst
-        punct = PunctuationFst().fst
+        if self.far_exist():
+            # loaded from the exported FAR archive, see grammar_cache.py
+            return
+        if components is None:
+            components = ComponentRegistry()
+
+        classify = ClassifyFst(components).fst
+        punct = components.get(PunctuationFst).fst
         token = pynutil.insert("tokens { ") + classify + pynutil.insert(" }")
         token_plus_punct = (
             pynini.closure(punct + pynutil.insert(" ")) + token + pynini.closure(pynutil.insert(" ") + punct)
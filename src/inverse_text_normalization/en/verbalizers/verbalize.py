@@ -27,9 +27,12 @@ from inverse_text_normalization.en.verbalizers.whitelist import WhiteListFst
 class VerbalizeFst(GraphFst):
     """
     Composes other verbalizer grammars. This class will be compiled and exported to thrax FAR.
+
+    Args:
+        optimize: optimize the union of the verbalizer grammars
     """
 
-    def __init__(self):
+    def __init__(self, optimize: bool = True):
         super().__init__(name="verbalize", kind="verbalize")
         cardinal = CardinalFst().fst
         ordinal = OrdinalFst().fst
@@ -40,4 +43,6 @@ class VerbalizeFst(GraphFst):
         money = MoneyFst().fst
         whitelist = WhiteListFst().fst
         graph = time | date | money | measure | ordinal | decimal | cardinal | whitelist
+        if optimize:
+            graph = graph.optimize()
         self.fst = graph
@@ -0,0 +1,99 @@
+'''
+Canonical field order of the tokens passed from the taggers to the verbalizers.
+
+The taggers emit the fields of a semiotic class in the order they were spoken, e.g. minutes
+before hours for "quarter past two" or integer_part before currency for money, while every
+verbalizer reads them in a single order. The token is serialized in that order, so exactly one
+verbalizer composition runs per token. Trying every permutation of the fields, which the
+grammars used to do, is only an opt-in fallback; `permutation_fallbacks` counts how often it was
+needed.
+'''
+
+import threading
+from typing import Callable, Iterator, List, Optional
+
+# same key as in token_parser.py of every language
+PRESERVE_ORDER_KEY = "preserve_order"
+
+# semiotic class -> fields in the order its verbalizer reads them, see verbalizers/*.py
+FIELD_ORDER = {
+    'cardinal': ['negative', 'integer'],
+    'ordinal': ['integer'],
+    'decimal': ['negative', 'integer_part', 'fractional_part', 'quantity'],
+    'money': ['currency', 'integer_part', 'fractional_part', 'quantity'],
+    'measure': ['cardinal', 'decimal', 'units'],
+    'time': ['hours', 'minutes', 'suffix', 'zone'],
+    'date': ['month', 'day', 'year'],
+    'tokens': ['name', 'pause_length'],
+}
+
+_fallback_enabled = False
+_fallbacks = 0
+_lock = threading.Lock()
+
+
+def set_permutation_fallback(enabled: bool):
+    """
+    Enables trying every field permutation of the tokens when the canonical order cannot be verbalized
+    """
+    global _fallback_enabled
+    _fallback_enabled = enabled
+
+
+def permutation_fallbacks() -> int:
+    """
+    Returns how often the canonical order could not be verbalized in this process
+    """
+    return _fallbacks
+
+
+def _ordered_items(d: dict, name: Optional[str]) -> list:
+    if PRESERVE_ORDER_KEY in d or name not in FIELD_ORDER:
+        return list(d.items())
+    order = FIELD_ORDER[name]
+    # fields missing in the table keep their tagger order after the known ones
+    return sorted(d.items(), key=lambda item: order.index(item[0]) if item[0] in order else len(order))
+
+
+def serialize(d: dict, name: Optional[str] = None) -> str:
+    """
+    Serializes a (nested) dictionary of token fields in canonical order, like a single permutation of `_permute`
+
+    Args:
+        d: dictionary of key value pairs
+        name: key of d in its parent, i.e. the semiotic class of its fields
+
+    Returns: serialized token
+    """
+    serialized = ""
+    for k, v in _ordered_items(d, name):
+        if isinstance(v, str):
+            serialized += f"{k}: \"{v}\" "
+        elif isinstance(v, dict):
+            serialized += f" {k} {{ " + serialize(v, k) + " } "
+        elif isinstance(v, bool):
+            serialized += f"{k}: true "
+        else:
+            raise ValueError()
+    return serialized
+
+
+def token_orderings(token: dict, permute: Callable[[dict], List[str]]) -> Iterator[str]:
+    """
+    Yields the canonical serialization of a token, then, only if the permutation fallback is enabled,
+    every permutation of its fields
+
+    Args:
+        token: parsed token
+        permute: `_permute` of the language
+
+    Returns: serialized token
+    """
+    global _fallbacks
+
+    yield serialize(token)
+    # asked for another ordering: the canonical one could not be verbalized
+    with _lock:
+        _fallbacks += 1
+    if _fallback_enabled:
+        yield from permute(token)
@@ -0,0 +1,244 @@
+'''
+Compiled grammar cache.
+
+`export_grammars` builds the final tagger and verbalizer of each language and writes them to
+`<package>/grammars/<kind>/<name>.far`, the location `GraphFst` loads FARs from. Next to the
+archives it writes `grammars/cache_key.txt`, a hash of the grammar data and sources of the
+package. The archives are only used while that key matches, so editing a tsv/json file or a
+grammar invalidates them and the grammars are rebuilt from scratch.
+
+Usage:
+    python -m inverse_text_normalization.grammar_cache [--langs hi en ...]
+'''
+
+import hashlib
+import importlib
+import os
+import time
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from inverse_text_normalization.components import ComponentRegistry
+from inverse_text_normalization.registry import LANGUAGE_PACKAGES
+
+GRAMMARS_DIR = 'grammars'
+CACHE_KEY_FILE = 'cache_key.txt'
+DATA_EXTENSIONS = ('.tsv', '.json', '.txt')
+SOURCE_DIRS = ('taggers', 'verbalizers')
+
+PACKAGE_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# package directory -> True if cache key on disk matches the grammar data, computed once per process
+_valid_cache = {}
+
+
+def get_package_dir(package: str) -> str:
+    """
+    Returns absolute directory of the given language package
+    """
+    return os.path.join(PACKAGE_ROOT, package)
+
+
+def _cache_key_files(package_dir: str) -> List[str]:
+    """
+    Lists files whose content determines the compiled grammars of a package: data files and grammar sources
+
+    Args:
+        package_dir: language package directory
+
+    Returns: sorted list of paths relative to package_dir
+    """
+    files = []
+    for root, _, names in os.walk(os.path.join(package_dir, 'data')):
+        for name in names:
+            if name.endswith(DATA_EXTENSIONS):
+                files.append(os.path.relpath(os.path.join(root, name), package_dir))
+    for source_dir in SOURCE_DIRS:
+        for name in os.listdir(os.path.join(package_dir, source_dir)):
+            if name.endswith('.py'):
+                files.append(os.path.join(source_dir, name))
+    files.append('graph_utils.py')
+    return sorted(files)
+
+
+def compute_cache_key(package_dir: str) -> str:
+    """
+    Hashes grammar data and sources of a language package
+
+    Args:
+        package_dir: language package directory
+
+    Returns: hex digest
+    """
+    digest = hashlib.sha256()
+    for rel_path in _cache_key_files(package_dir):
+        digest.update(rel_path.encode('utf-8'))
+        with open(os.path.join(package_dir, rel_path), 'rb') as fp:
+            digest.update(hashlib.sha256(fp.read()).digest())
+    return digest.hexdigest()
+
+
+def read_cache_key(package_dir: str) -> Optional[str]:
+    """
+    Returns cache key the exported grammars of a package were built with, None if there are none
+    """
+    key_path = os.path.join(package_dir, GRAMMARS_DIR, CACHE_KEY_FILE)
+    if not os.path.exists(key_path):
+        return None
+    with open(key_path, 'r') as fp:
+        return fp.read().strip()
+
+
+def is_cache_valid(package_dir: str) -> bool:
+    """
+    Returns true if exported grammars of a package exist and were built from its current data and sources
+
+    Args:
+        package_dir: language package directory
+    """
+    package_dir = os.path.abspath(package_dir)
+    if package_dir not in _valid_cache:
+        stored_key = read_cache_key(package_dir)
+        _valid_cache[package_dir] = stored_key is not None and stored_key == compute_cache_key(package_dir)
+    return _valid_cache[package_dir]
+
+
+def invalidate(package_dir: str):
+    """
+    Removes cache key of a package, so exported grammars are ignored until the next export
+    """
+    package_dir = os.path.abspath(package_dir)
+    key_path = os.path.join(package_dir, GRAMMARS_DIR, CACHE_KEY_FILE)
+    if os.path.exists(key_path):
+        os.remove(key_path)
+    _valid_cache[package_dir] = False
+
+
+@contextmanager
+def ignore_exported(package_dir: str):
+    """
+    Builds the grammars of a package from source inside the block, even if valid exported grammars exist
+
+    Args:
+        package_dir: language package directory
+    """
+    package_dir = os.path.abspath(package_dir)
+    previous = _valid_cache.get(package_dir)
+    _valid_cache[package_dir] = False
+    try:
+        yield
+    finally:
+        if previous is None:
+            _valid_cache.pop(package_dir, None)
+        else:
+            _valid_cache[package_dir] = previous
+
+
+def _write_far(fst, far_path: str, name: str):
+    """
+    Writes a single fst to a FAR archive, atomically replacing an existing one
+
+    Args:
+        fst: fst to write
+        far_path: archive path
+        name: key of fst inside the archive
+    """
+    from pynini import Far
+
+    os.makedirs(os.path.dirname(far_path), exist_ok=True)
+    tmp_path = far_path + '.tmp'
+    far = Far(tmp_path, mode="w", arc_type="standard", far_type="default")
+    try:
+        far.add(name, fst)
+    finally:
+        far.close()
+    os.replace(tmp_path, far_path)
+
+
+def build_final_grammars(package: str) -> list:
+    """
+    Builds the final grammars of a language package
+
+    Returns: list of GraphFst
+    """
+    taggers = importlib.import_module(f'inverse_text_normalization.{package}.taggers.tokenize_and_classify_final')
+    verbalizers = importlib.import_module(f'inverse_text_normalization.{package}.verbalizers.verbalize_final')
+    # the taggers of a package share their sub grammars
+    components = ComponentRegistry()
+    grammars = [taggers.ClassifyFinalFst(components)]
+    if hasattr(taggers, 'ClassifyNumberFinalFst'):
+        grammars.append(taggers.ClassifyNumberFinalFst(components))
+    grammars.append(verbalizers.VerbalizeFinalFst())
+    return grammars
+
+
+def export_package(package: str, verbose: bool = True, grammars_dir: Optional[str] = None) -> Dict[str, str]:
+    """
+    Builds and exports the final tagger and verbalizer grammars of a language package
+
+    Args:
+        package: language package name, e.g. 'hi'
+        verbose: print progress
+        grammars_dir: directory to export to, default the grammars directory of the package, where they are loaded from
+
+    Returns: dictionary of grammar name -> FAR path
+    """
+    package_dir = get_package_dir(package)
+    package_grammars_dir = os.path.join(package_dir, GRAMMARS_DIR)
+    if grammars_dir is None:
+        grammars_dir = package_grammars_dir
+        # never load stale archives while rebuilding
+        invalidate(package_dir)
+    key = compute_cache_key(package_dir)
+
+    start = time.time()
+    exported = {}
+    with ignore_exported(package_dir):
+        grammars = build_final_grammars(package)
+    for grammar in grammars:
+        far_path = os.path.join(grammars_dir, os.path.relpath(str(grammar.far_path), package_grammars_dir))
+        # written as built: optimizing the weighted taggers again changes the paths shortestpath picks
+        _write_far(grammar.fst, far_path, grammar.name)
+        exported[grammar.name] = far_path
+        if verbose:
+            print(f"- {package}: {grammar.name} ({grammar.fst.num_states()} states) -> {far_path}")
+
+    with open(os.path.join(grammars_dir, CACHE_KEY_FILE), 'w') as fp:
+        fp.write(key + '\n')
+    if grammars_dir == package_grammars_dir:
+        _valid_cache[package_dir] = True
+    if verbose:
+        print(f"- {package}: exported in {time.time() - start:.1f}s")
+    return exported
+
+
+def export_grammars(langs: Optional[Iterable[str]] = None, verbose: bool = True) -> Dict[str, Dict[str, str]]:
+    """
+    Builds and exports the final grammars of the given languages
+
+    Args:
+        langs: language codes, all supported languages if None
+        verbose: print progress
+
+    Returns: dictionary of package -> exported grammars
+    """
+    if langs is None:
+        langs = list(LANGUAGE_PACKAGES)
+    packages = []
+    for lang in langs:
+        package = LANGUAGE_PACKAGES.get(lang, lang)
+        if package not in packages:
+            packages.append(package)
+    return {package: export_package(package, verbose=verbose) for package in packages}
+
+
+def parse_args():
+    parser = ArgumentParser(description="Exports compiled inverse text normalization grammars to FAR archives")
+    parser.add_argument("--langs", help="language codes, default all", nargs='+', required=False, type=str)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    export_grammars(args.langs)
@@ -15,7 +15,7 @@
 import itertools
 import sys
 from collections import OrderedDict
-from typing import List
+from typing import List, Optional
 
 # from inverse_text_normalization.lang_params import LANG
 # lang_taggers = f'inverse_text_normalization.taggers.{LANG}_taggers'
@@ -26,6 +26,10 @@ from typing import List
 from inverse_text_normalization.gu.taggers.tokenize_and_classify_final import ClassifyFinalFst
 from inverse_text_normalization.gu.token_parser import PRESERVE_ORDER_KEY, TokenParser
 from inverse_text_normalization.gu.verbalizers.verbalize_final import VerbalizeFinalFst
+from inverse_text_normalization.lexicon import load_lexicon
+from inverse_text_normalization.result_cache import get_cache
+from inverse_text_normalization.spans import normalize_spans
+from inverse_text_normalization.token_verbalizer import TokenVerbalizer
 from tqdm import tqdm
 
 try:
@@ -44,6 +48,9 @@ except (ModuleNotFoundError, ImportError):
 
     PYNINI_AVAILABLE = False
 
+# only the windows of a sentence the grammars could rewrite go through the fsts, see spans.py
+lexicon = load_lexicon('gu')
+
 
 def _permute(d: OrderedDict) -> List[str]:
     """
@@ -75,37 +82,6 @@ def _permute(d: OrderedDict) -> List[str]:
     return l
 
 
-def generate_permutations(tokens: List[dict]):
-    """
-    Generates permutations of string serializations of list of dictionaries
-
-    Args:
-        tokens: list of dictionaries
-
-    Returns string serialization of list of dictionaries
-    """
-
-    def _helper(prefix: str, tokens: List[dict], idx: int):
-        """
-        Generates permutations of string serializations of given dictionary
-
-        Args:
-            tokens: list of dictionaries
-            prefix: prefix string
-            idx:    index of next dictionary
-
-        Returns string serialization of dictionary
-        """
-        if idx == len(tokens):
-            yield prefix
-            return
-        token_options = _permute(tokens[idx])
-        for token_option in token_options:
-            yield from _helper(prefix + token_option, tokens, idx + 1)
-
-    return _helper("", tokens, 0)
-
-
 def find_tags(text: str) -> 'pynini.FstLike':
     """
     Given text use tagger Fst to tag text
@@ -159,6 +135,25 @@ def select_verbalizer(lattice: 'pynini.FstLike') -> str:
     return output
 
 
+def verbalize_tagged(tagged_text: str) -> Optional[str]:
+    """
+    Verbalizes serialized tokens
+
+    Args:
+        tagged_text: serialized tokens, e.g. tokens { money { currency: "$" integer_part: "12" } }
+
+    Returns: written form, None if the verbalizer does not accept the tokens
+    """
+    verbalizer_lattice = find_verbalizer(pynini.escape(tagged_text))
+    if verbalizer_lattice.num_states() == 0:
+        return None
+    return select_verbalizer(verbalizer_lattice)
+
+
+# words and punctuation are verbalized in python, semiotic tokens one at a time and memoized
+token_verbalizer = TokenVerbalizer(verbalize_tagged, _permute)
+
+
 def inverse_normalize(text: str, verbose: bool) -> str:
     """
     main function. normalizes spoken tokens in given text to its written form
@@ -176,18 +171,10 @@ def inverse_normalize(text: str, verbose: bool) -> str:
     tagged_text = select_tag(tagged_lattice)
     parser(tagged_text)
     tokens = parser.parse()
-    tags_reordered = generate_permutations(tokens)
-    for tagged_text in tags_reordered:
-        tagged_text = pynini.escape(tagged_text)
-        # print("tagged text is ", tagged_text)
-        verbalizer_lattice = find_verbalizer(tagged_text)
-        if verbalizer_lattice.num_states() == 0:
-            continue
-        output = select_verbalizer(verbalizer_lattice)
-        if verbose:
-            print(output)
-        return output
-    raise ValueError()
+    output = token_verbalizer(tokens)
+    if verbose:
+        print(output)
+    return output
 
 
 def inverse_normalize_identity(texts: List[str], verbose=False) -> List[str]:
@@ -214,7 +201,9 @@ def inverse_normalize_nemo(texts: List[str], verbose=False) -> List[str]:
     res = []
     for input in tqdm(texts):
         try:
-            text = inverse_normalize(input, verbose=verbose)
+            text = normalize_spans(
+                input, lexicon, lambda span: inverse_normalize(span, verbose=verbose), cache=get_cache('gu')
+            )
         except:
             raise Exception
         res.append(text)
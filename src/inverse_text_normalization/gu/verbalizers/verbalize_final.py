@@ -32,11 +32,17 @@ class VerbalizeFinalFst(GraphFst):
     Finite state transducer that verbalizes an entire sentence
         e.g. tokens { name: "its" } tokens { time { hours: "12" minutes: "30" } } tokens { name: "now" } tokens { name: "." pause_length: "PAUSE_LONG phrase_break: true type: PUNCT" }
             -> its 12:30 now .
+
+    Args:
+        optimize: optimize and arc sort the final fst, False builds the raw fst, e.g. for benchmarks
     """
 
-    def __init__(self):
+    def __init__(self, optimize: bool = True):
         super().__init__(name="verbalize_final", kind="verbalize")
-        verbalize = VerbalizeFst().fst
+        if optimize and self.far_exist():
+            # loaded from the exported FAR archive, see grammar_cache.py
+            return
+        verbalize = VerbalizeFst(optimize=optimize).fst
         punct = PunctuationFst().fst
         word = WordFst().fst
         types = verbalize | word | punct
@@ -50,4 +56,7 @@ class VerbalizeFinalFst(GraphFst):
             + pynutil.delete("}")
         )
         graph = delete_space + pynini.closure(graph + delete_extra_space) + graph + delete_space
+        if optimize:
+            # optimize determinizes the fst where the grammar permits, sorted input labels speed up composition
+            graph = graph.optimize().arcsort(sort_type="ilabel")
         self.fst = graph
@@ -0,0 +1,40 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+
+from inverse_text_normalization.batch import run_batch
+
+
+class BatchInverseTextNormalization(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+    def _normalize(self, text_list, lang):
+        self.calls.append(list(text_list))
+        return [text.replace('दो सौ', '200') for text in text_list]
+
+    def test_duplicates_are_normalized_once(self):
+        data = ['दो सौ रुपये', 'एक लाख', 'दो सौ रुपये', 'दो सौ रुपये']
+        expected_output = ['200 रुपये', 'एक लाख', '200 रुपये', '200 रुपये']
+
+        results, report = run_batch(data, 'hi', self._normalize)
+
+        self.assertEqual(expected_output, results)
+        self.assertEqual([['दो सौ रुपये', 'एक लाख']], self.calls)
+        self.assertEqual((4, 2, 0), (report.sentences, report.unique, report.skipped))
+
+    def test_blank_sentences_skip_the_grammars(self):
+        results, report = run_batch(['', '  ', 'दो सौ'], 'hi', self._normalize)
+
+        self.assertEqual(['', '', '200'], results)
+        self.assertEqual([['दो सौ']], self.calls)
+        self.assertEqual(2, report.skipped)
+
+    def test_batch_of_blank_sentences_does_not_call_normalizer(self):
+        results, _ = run_batch(['', ''], 'hi', self._normalize)
+
+        self.assertEqual(['', ''], results)
+        self.assertEqual([], self.calls)
@@ -0,0 +1,104 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from inverse_text_normalization.bulk import SUMMARY_FILE, run_job, shard_file
+
+normalized = []
+
+
+class Killed(BaseException):
+    pass
+
+
+def normalize(text_list, lang):
+    if any(text == 'error' for text in text_list):
+        raise ValueError('cannot normalize')
+    normalized.extend(text_list)
+    return [text.replace('दो सौ', '200') for text in text_list]
+
+
+def normalize_until_killed(text_list, lang):
+    if 'kill' in text_list:
+        raise Killed()
+    return normalize(text_list, lang)
+
+
+class Bulk(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.tmp_dir, 'corpus.txt')
+        self.output_path = os.path.join(self.tmp_dir, 'corpus.itn.txt')
+        normalized.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_input(self, lines):
+        with open(self.input_path, 'w', encoding='utf-8') as fp:
+            fp.write(''.join(line + '\n' for line in lines))
+
+    def read_output(self):
+        with open(self.output_path, 'r', encoding='utf-8') as fp:
+            return fp.read().splitlines()
+
+    def test_shards_start_at_lines(self):
+        lines = [f'वाक्य {i} दो सौ' * (i % 3 + 1) for i in range(50)]
+        self.write_input(lines)
+
+        shards = shard_file(self.input_path, 8)
+
+        with open(self.input_path, 'rb') as fp:
+            data = fp.read()
+        self.assertEqual(8, len(shards))
+        self.assertEqual(data, b''.join(data[shard.start:shard.end] for shard in shards))
+        for shard in shards[1:]:
+            self.assertEqual(b'\n', data[shard.start - 1:shard.start])
+
+    def test_outputs_are_merged_in_order(self):
+        lines = [f'{i} दो सौ' for i in range(100)]
+        self.write_input(lines)
+
+        summary = run_job(self.input_path, self.output_path, 'hi', shards=7, workers=3, batch_size=4,
+                          normalize=normalize)
+
+        self.assertEqual([f'{i} 200' for i in range(100)], self.read_output())
+        self.assertEqual(100, summary['lines'])
+        self.assertEqual(7, len(summary['shards']))
+        with open(os.path.join(self.output_path + '.work', SUMMARY_FILE), 'r') as fp:
+            self.assertEqual(summary, json.load(fp))
+
+    def test_failing_lines_are_kept_and_counted(self):
+        self.write_input(['दो सौ', 'error', 'दो सौ'])
+
+        summary = run_job(self.input_path, self.output_path, 'hi', shards=1, batch_size=3, normalize=normalize)
+
+        self.assertEqual(['200', 'error', '200'], self.read_output())
+        self.assertEqual(1, summary['errors'])
+
+    def test_killed_job_resumes(self):
+        self.write_input(['दो सौ', 'एक', 'kill', 'दो'])
+        with self.assertRaises(Killed):
+            run_job(self.input_path, self.output_path, 'hi', shards=1, batch_size=2, normalize=normalize_until_killed)
+
+        normalized.clear()
+        summary = run_job(self.input_path, self.output_path, 'hi', shards=1, batch_size=2, normalize=normalize)
+
+        self.assertEqual(['kill', 'दो'], normalized)
+        self.assertEqual(['200', 'एक', 'kill', 'दो'], self.read_output())
+        self.assertEqual(4, summary['lines'])
+
+    def test_changed_input_needs_new_work_dir(self):
+        self.write_input(['दो सौ'])
+        run_job(self.input_path, self.output_path, 'hi', shards=1, normalize=normalize)
+        self.write_input(['दो सौ', 'एक'])
+
+        with self.assertRaises(ValueError):
+            run_job(self.input_path, self.output_path, 'hi', shards=1, normalize=normalize)
@@ -0,0 +1,45 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+
+from inverse_text_normalization.components import ComponentRegistry
+
+
+class Cardinal:
+    pass
+
+
+class Decimal:
+    def __init__(self, cardinal):
+        self.cardinal = cardinal
+
+
+class Components(unittest.TestCase):
+
+    def test_component_is_built_once(self):
+        components = ComponentRegistry()
+
+        cardinal = components.get(Cardinal)
+
+        self.assertIs(cardinal, components.get(Cardinal))
+        self.assertEqual(1, components.builds)
+
+    def test_dependencies_are_shared(self):
+        components = ComponentRegistry()
+        cardinal = components.get(Cardinal)
+
+        decimal = components.get(Decimal, cardinal)
+
+        self.assertIs(cardinal, decimal.cardinal)
+        self.assertIs(decimal, components.get(Decimal, components.get(Cardinal)))
+        self.assertEqual(2, components.builds)
+
+    def test_other_dependencies_build_another_component(self):
+        components = ComponentRegistry()
+
+        decimal = components.get(Decimal, components.get(Cardinal))
+
+        self.assertIsNot(decimal, components.get(Decimal, Cardinal()))
+        self.assertEqual(3, len(components))
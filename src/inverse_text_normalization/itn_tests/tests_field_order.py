@@ -0,0 +1,43 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+from collections import OrderedDict
+
+from inverse_text_normalization import field_order
+from inverse_text_normalization.field_order import serialize, token_orderings
+
+
+def _token(name, **fields):
+    return OrderedDict(tokens=OrderedDict([(name, OrderedDict(fields))]))
+
+
+class CanonicalFieldOrder(unittest.TestCase):
+
+    def tearDown(self):
+        field_order.set_permutation_fallback(False)
+
+    def test_fields_are_serialized_in_verbalizer_order(self):
+        money = _token('money', integer_part='200', currency='₹')
+        time = _token('time', minutes='15', hours='2', suffix='p.m.')
+
+        self.assertEqual(' tokens {  money { currency: "₹" integer_part: "200"  }  } ', serialize(money))
+        self.assertEqual(' tokens {  time { hours: "2" minutes: "15" suffix: "p.m."  }  } ', serialize(time))
+
+    def test_preserve_order_is_kept(self):
+        date = _token('date', day='5', month='january', preserve_order=True)
+
+        self.assertEqual(
+            ' tokens {  date { day: "5" month: "january" preserve_order: true  }  } ', serialize(date)
+        )
+
+    def test_permutations_are_opt_in_and_counted(self):
+        token = _token('cardinal', integer='5')
+        permute = lambda token: ['permutation']
+
+        before = field_order.permutation_fallbacks()
+        self.assertEqual(1, len(list(token_orderings(token, permute))))
+        field_order.set_permutation_fallback(True)
+        self.assertEqual(2, len(list(token_orderings(token, permute))))
+        self.assertEqual(before + 2, field_order.permutation_fallbacks())
@@ -0,0 +1,118 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import ast
+import os
+import shutil
+import tempfile
+import unittest
+
+from inverse_text_normalization import grammar_cache
+from inverse_text_normalization.token_verbalizer import TokenVerbalizer
+
+
+class GrammarCacheKey(unittest.TestCase):
+
+    def setUp(self):
+        self.package_dir = tempfile.mkdtemp()
+        for sub_dir in ['data/numbers', 'taggers', 'verbalizers', 'grammars']:
+            os.makedirs(os.path.join(self.package_dir, sub_dir))
+        self._write('data/numbers/digit.tsv', 'एक\t1\n')
+        self._write('taggers/cardinal.py', '')
+        self._write('verbalizers/cardinal.py', '')
+        self._write('graph_utils.py', '')
+
+    def tearDown(self):
+        shutil.rmtree(self.package_dir)
+
+    def _write(self, rel_path, content):
+        with open(os.path.join(self.package_dir, rel_path), 'w') as fp:
+            fp.write(content)
+
+    def _export_key(self):
+        self._write('grammars/' + grammar_cache.CACHE_KEY_FILE, grammar_cache.compute_cache_key(self.package_dir))
+        grammar_cache._valid_cache.clear()
+
+    def test_cache_without_key_is_invalid(self):
+        self.assertFalse(grammar_cache.is_cache_valid(self.package_dir))
+
+    def test_cache_with_matching_key_is_valid(self):
+        self._export_key()
+        self.assertTrue(grammar_cache.is_cache_valid(self.package_dir))
+
+    def test_editing_data_invalidates_cache(self):
+        self._export_key()
+        self._write('data/numbers/digit.tsv', 'एक\t1\nदो\t2\n')
+        grammar_cache._valid_cache.clear()
+        self.assertFalse(grammar_cache.is_cache_valid(self.package_dir))
+
+    def test_key_ignores_files_outside_grammar(self):
+        key = grammar_cache.compute_cache_key(self.package_dir)
+        self._write('notes.md', 'unrelated')
+        self.assertEqual(key, grammar_cache.compute_cache_key(self.package_dir))
+
+
+def _test_sentences(package: str, test_file: str) -> list:
+    # every `data = [...]` list of the language tests
+    with open(os.path.join(grammar_cache.get_package_dir(package), 'itn_tests', test_file), 'r') as fp:
+        tree = ast.parse(fp.read())
+    sentences = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(getattr(target, 'id', None) == 'data' for target in node.targets):
+            sentences.extend(ast.literal_eval(node.value))
+    return sentences
+
+
+class ExportedGrammarRoundTrip(unittest.TestCase):
+    package = 'mr'
+    test_file = 'tests_itn_mr.py'
+
+    @classmethod
+    def setUpClass(cls):
+        import pynini
+
+        from inverse_text_normalization.mr.inverse_normalize import _permute
+        from inverse_text_normalization.mr.token_parser import TokenParser
+
+        cls.pynini = pynini
+        cls.permute = _permute
+        cls.parser = TokenParser()
+        cls.grammars_dir = tempfile.mkdtemp()
+        exported = grammar_cache.export_package(cls.package, verbose=False, grammars_dir=cls.grammars_dir)
+        cls.exported = {
+            name: pynini.Far(path, mode="r", arc_type="standard", far_type="default").get_fst()
+            for name, path in exported.items()
+        }
+        with grammar_cache.ignore_exported(grammar_cache.get_package_dir(cls.package)):
+            cls.built = {grammar.name: grammar.fst for grammar in grammar_cache.build_final_grammars(cls.package)}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.grammars_dir)
+
+    def _normalize(self, grammars: dict, text: str):
+        pynini = self.pynini
+        tagged_text = pynini.shortestpath(
+            pynini.escape(text) @ grammars['tokenize_and_classify_final'], nshortest=1, unique=True
+        ).string()
+
+        def verbalize(serialized):
+            lattice = pynini.escape(serialized) @ grammars['verbalize_final']
+            if lattice.num_states() == 0:
+                return None
+            return pynini.shortestpath(lattice, nshortest=1, unique=True).string()
+
+        self.parser(tagged_text)
+        return tagged_text, TokenVerbalizer(verbalize, self.permute)(self.parser.parse())
+
+    def test_exports_every_final_grammar(self):
+        self.assertEqual(set(self.built), set(self.exported))
+        self.assertTrue(os.path.exists(os.path.join(self.grammars_dir, grammar_cache.CACHE_KEY_FILE)))
+
+    def test_exported_grammars_normalize_like_built_ones(self):
+        sentences = _test_sentences(self.package, self.test_file)
+        self.assertIn('त्याला कोटी द्या', sentences)
+        for sentence in sentences:
+            with self.subTest(sentence=sentence):
+                self.assertEqual(self._normalize(self.built, sentence), self._normalize(self.exported, sentence))
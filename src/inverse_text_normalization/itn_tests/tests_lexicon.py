@@ -0,0 +1,38 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+
+from inverse_text_normalization.lexicon import Lexicon, load_lexicon, split_chunks
+from inverse_text_normalization.spans import find_spans, normalize_spans
+
+
+class LexiconTrigger(unittest.TestCase):
+
+    def setUp(self):
+        self.lexicon = load_lexicon('hi')
+
+    def _grammars(self, text):
+        raise AssertionError(f'{text} was sent to the grammars')
+
+    def test_sentences_without_numbers_are_tokenized(self):
+        data = ['आज मौसम अच्छा है', 'वह घर गया,  फिर (आया)', 'ठीक है!']
+        expected_output = ['आज मौसम अच्छा है', 'वह घर गया , फिर ( आया )', 'ठीक है !']
+
+        self.assertEqual(expected_output, [normalize_spans(text, self.lexicon, self._grammars) for text in data])
+
+    def test_sentences_with_numbers_need_the_grammars(self):
+        data = ['दो सौ रुपये', 'चारसौ लोग', 'ढाईसो एकर', 'मेरे पास 5 रुपये', 'मेरे पास ₹ है', 'dr. साहब', '...']
+
+        for text in data:
+            self.assertTrue(find_spans(split_chunks(text), self.lexicon), text)
+
+    def test_words_glued_to_a_number(self):
+        lexicon = Lexicon(['two', 'hundred'], following_words=['pm'], suffix_rules=[('th', '')])
+
+        self.assertTrue(lexicon.is_trigger('twohundred'))
+        self.assertTrue(lexicon.is_trigger('twopm'))
+        self.assertTrue(lexicon.is_trigger('hundredth'))
+        self.assertFalse(lexicon.is_trigger('pm'))
+        self.assertFalse(lexicon.is_trigger('twos'))
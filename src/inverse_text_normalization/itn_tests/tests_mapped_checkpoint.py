@@ -0,0 +1,105 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import torch
+import torch.nn as nn
+
+from punctuate import mapped_checkpoint
+
+
+def small_model(seed):
+    torch.manual_seed(seed)
+    # parameters of several shapes and buffers, including an int64 one
+    return nn.Sequential(nn.Embedding(7, 5), nn.Linear(5, 3), nn.BatchNorm1d(3))
+
+
+class MappedCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir)
+        self.model_path = os.path.join(self.model_dir, 'hi.pt')
+        self.model = small_model(seed=0)
+        self.model[2].running_mean.add_(1.5)
+        self.model[2].num_batches_tracked.add_(3)
+        # saved from nn.DataParallel
+        state_dict = {'module.' + name: tensor for name, tensor in self.model.state_dict().items()}
+        torch.save({'state_dict': state_dict}, self.model_path)
+
+    def _assert_same_state(self, expected, actual):
+        self.assertEqual(set(expected), set(actual))
+        for name in expected:
+            self.assertEqual(expected[name].dtype, actual[name].dtype, name)
+            self.assertTrue(torch.equal(expected[name], actual[name]), name)
+
+    def test_strip_data_parallel_prefix(self):
+        state_dict = {'module.encoder.weight': 1, 'classifier.module.bias': 2}
+
+        self.assertEqual({'encoder.weight': 1, 'classifier.module.bias': 2},
+                         mapped_checkpoint.strip_data_parallel_prefix(state_dict))
+
+    def test_round_trip(self):
+        manifest_path = mapped_checkpoint.convert_checkpoint(self.model_path)
+        manifest = mapped_checkpoint.load_manifest(self.model_path)
+        model = small_model(seed=1)
+
+        mapped_checkpoint.load_mapped_weights(model, self.model_path, manifest)
+
+        self.assertEqual(mapped_checkpoint.mapped_checkpoint_paths(self.model_path)[1], manifest_path)
+        self._assert_same_state(self.model.state_dict(), model.state_dict())
+        self.model.eval()
+        model.eval()
+        input_ids = torch.tensor([1, 2, 3, 6])
+        self.assertTrue(torch.equal(self.model(input_ids), model(input_ids)))
+
+    def test_tensors_are_aligned(self):
+        mapped_checkpoint.convert_checkpoint(self.model_path)
+        manifest = mapped_checkpoint.load_manifest(self.model_path)
+
+        for tensor in manifest['tensors'].values():
+            self.assertEqual(0, tensor['offset'] % mapped_checkpoint.ALIGNMENT)
+
+    def test_writes_to_mapped_weights_do_not_change_the_file(self):
+        mapped_checkpoint.convert_checkpoint(self.model_path)
+        manifest = mapped_checkpoint.load_manifest(self.model_path)
+        model = small_model(seed=1)
+        mapped_checkpoint.load_mapped_weights(model, self.model_path, manifest)
+
+        with torch.no_grad():
+            model[1].weight.zero_()
+        weights_path = mapped_checkpoint.mapped_checkpoint_paths(self.model_path)[0]
+        state_dict = mapped_checkpoint.map_state_dict(weights_path, manifest)
+
+        self.assertTrue(torch.equal(self.model[1].weight, state_dict['1.weight']))
+
+    def test_manifest_of_a_changed_checkpoint_is_ignored(self):
+        mapped_checkpoint.convert_checkpoint(self.model_path)
+        stat = os.stat(self.model_path)
+        os.utime(self.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        self.assertIsNone(mapped_checkpoint.load_manifest(self.model_path))
+
+    def test_convert_checkpoints_of_a_store(self):
+        manifests = mapped_checkpoint.run_convert(['hi'], store=self.model_dir)
+
+        self.assertEqual([mapped_checkpoint.mapped_checkpoint_paths(self.model_path)[1]], manifests)
+        self.assertIsNotNone(mapped_checkpoint.load_manifest(self.model_path))
+
+    def test_unconverted_checkpoint_has_no_manifest(self):
+        self.assertIsNone(mapped_checkpoint.load_manifest(self.model_path))
+
+    def test_model_of_other_architecture_is_rejected(self):
+        mapped_checkpoint.convert_checkpoint(self.model_path)
+        manifest = mapped_checkpoint.load_manifest(self.model_path)
+
+        other_shapes = nn.Sequential(nn.Embedding(7, 5), nn.Linear(5, 4), nn.BatchNorm1d(4))
+        other_layers = nn.Sequential(nn.Embedding(7, 5), nn.Linear(5, 3))
+        for model in [other_shapes, other_layers]:
+            with self.assertRaises(ValueError):
+                mapped_checkpoint.load_mapped_weights(model, self.model_path, manifest)
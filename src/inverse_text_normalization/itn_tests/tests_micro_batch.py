@@ -0,0 +1,137 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+from inverse_text_normalization import run_predict
+from inverse_text_normalization.micro_batch import AsyncBatchRunner, MicroBatcher
+
+
+class MicroBatch(unittest.TestCase):
+
+    def test_concurrent_awaiters_are_batched(self):
+        batches = []
+
+        def normalize(lang, text_list):
+            batches.append((lang, list(text_list)))
+            return [text.replace('दो सौ', '200') for text in text_list]
+
+        runner = AsyncBatchRunner(normalize, max_delay=0.05)
+
+        async def run():
+            return await asyncio.gather(
+                runner.run('hi', ['दो सौ', 'एक']), runner.run('hi', ['कुल दो सौ']), runner.run('mr', ['दोनशे'])
+            )
+
+        results = asyncio.run(run())
+        runner.shutdown()
+
+        self.assertEqual([['200', 'एक'], ['कुल 200'], ['दोनशे']], results)
+        self.assertEqual([('hi', ['दो सौ', 'एक', 'कुल दो सौ']), ('mr', ['दोनशे'])], sorted(batches))
+
+    def test_full_batch_runs_without_delay(self):
+        runner = AsyncBatchRunner(lambda lang, text_list: text_list, max_batch_size=2, max_delay=10)
+
+        async def run():
+            return await asyncio.wait_for(runner.run('hi', ['एक', 'दो']), timeout=5)
+
+        self.assertEqual(['एक', 'दो'], asyncio.run(run()))
+        runner.shutdown()
+
+    def test_concurrency_limit(self):
+        in_flight = []
+        lock = threading.Lock()
+
+        def normalize(lang, text_list):
+            with lock:
+                in_flight.append(len(text_list))
+            time.sleep(0.01)
+            return text_list
+
+        runner = AsyncBatchRunner(normalize, max_concurrency=2, max_delay=0.01)
+
+        async def run():
+            return await asyncio.gather(*[runner.run('hi', [str(i)]) for i in range(6)])
+
+        results = asyncio.run(run())
+        runner.shutdown()
+
+        self.assertEqual([[str(i)] for i in range(6)], results)
+        self.assertLessEqual(max(in_flight), 2)
+
+    def test_errors_reach_only_the_failing_awaiter(self):
+        batches = []
+
+        def normalize(lang, text_list):
+            batches.append(list(text_list))
+            if 'खराब' in text_list:
+                raise ValueError('cannot normalize')
+            return text_list
+
+        runner = AsyncBatchRunner(normalize, max_delay=0.05)
+
+        async def run():
+            return await asyncio.gather(
+                runner.run('hi', ['एक']), runner.run('hi', ['खराब']), runner.run('hi', ['दो']),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        runner.shutdown()
+
+        self.assertEqual(['एक'], results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(['दो'], results[2])
+        self.assertEqual([['एक', 'खराब', 'दो'], ['एक'], ['खराब'], ['दो']], batches)
+
+    def test_drain(self):
+        async def process(lang, text_list):
+            return text_list
+
+        async def run():
+            batcher = MicroBatcher(process, max_delay=10)
+            pending = asyncio.ensure_future(batcher.submit('hi', ['एक']))
+            await asyncio.sleep(0)
+            await batcher.drain()
+            return await pending
+
+        self.assertEqual(['एक'], asyncio.run(run()))
+
+    def test_pending_calls_of_a_closed_runner_do_not_restart_its_executor(self):
+        runner = AsyncBatchRunner(lambda lang, text_list: text_list, max_delay=0.05)
+
+        async def run():
+            pending = asyncio.ensure_future(runner.run('hi', ['एक']))
+            await asyncio.sleep(0)
+            runner.close()
+            return await pending
+
+        self.assertEqual(['एक'], asyncio.run(run()))
+        self.assertIsNone(runner._executor)
+
+    def test_configure_async_while_a_call_is_in_flight(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            with mock.patch.object(run_predict, '_inverse_normalize_batch', lambda lang, text_list: text_list):
+                run_predict.configure_async(max_delay=0.5)
+                runner = run_predict._async_runner
+                call = asyncio.run_coroutine_threadsafe(run_predict.ainverse_normalize_text(['एक'], 'hi'), loop)
+                time.sleep(0.1)
+                run_predict.configure_async()
+                result = call.result(timeout=5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
+            run_predict.configure_async()
+
+        self.assertEqual(['एक'], result)
+        self.assertIsNone(runner._executor)
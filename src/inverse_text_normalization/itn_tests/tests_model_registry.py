@@ -0,0 +1,169 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import os
+import threading
+import unittest
+from unittest import mock
+
+from punctuate import model_registry
+from punctuate.model_registry import PunctuationRegistry
+
+MB = 2 ** 20
+SIZES = {'hi': 100 * MB, 'ta': 100 * MB, 'bn': 100 * MB, 'mr': 300 * MB}
+
+
+class FakePunctuation:
+
+    def __init__(self, language_code, quantize=False, backend='eager'):
+        self.language_code = language_code
+        self.quantize = quantize
+        self.backend = backend
+
+    def punctuate_text(self, text):
+        return [f'{self.language_code}: {sentence}.' for sentence in text]
+
+
+def fake_model_size(punctuation):
+    return SIZES[punctuation.language_code]
+
+
+class PunctuationRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        for target, fake in [('Punctuation', FakePunctuation), ('model_size', fake_model_size)]:
+            patcher = mock.patch.object(model_registry, target, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(os.environ, {'PUNCTUATION_QUANTIZE': ''})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _resident(self, registry):
+        return [model.lang for model in registry.report()]
+
+    def test_models_are_loaded_once(self):
+        registry = PunctuationRegistry()
+
+        first = registry.get('hi')
+
+        self.assertIs(first, registry.get('hi'))
+        self.assertEqual(1, registry.loads)
+        self.assertEqual(['hi: a.'], registry.punctuate_text('hi', ['a']))
+
+    def test_resident_models_are_served_while_another_loads(self):
+        registry = PunctuationRegistry()
+        hi = registry.get('hi')
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_punctuation(language_code, quantize=False, backend='eager'):
+            loading.set()
+            release.wait(5)
+            return FakePunctuation(language_code, quantize, backend)
+
+        loaded = []
+        with mock.patch.object(model_registry, 'Punctuation', slow_punctuation):
+            threads = [threading.Thread(target=lambda: loaded.append(registry.get('ta'))) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            loading.wait(5)
+            self.assertIs(hi, registry.get('hi'))
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertIs(loaded[0], loaded[1])
+        self.assertEqual(2, registry.loads)
+
+    def test_variants_are_separate_models(self):
+        registry = PunctuationRegistry()
+
+        self.assertIsNot(registry.get('hi'), registry.get('hi', quantize=True))
+        self.assertIsNot(registry.get('hi'), registry.get('hi', backend='torchscript'))
+        self.assertEqual(3, len(registry))
+
+    def test_unlimited_budget_keeps_every_model(self):
+        registry = PunctuationRegistry()
+        for lang in ['hi', 'ta', 'bn', 'mr']:
+            registry.get(lang)
+
+        self.assertEqual(600 * MB, registry.resident_bytes())
+        self.assertEqual(0, registry.evictions)
+
+    def test_least_recently_used_model_is_evicted(self):
+        registry = PunctuationRegistry(memory_budget=250 * MB)
+        registry.get('hi')
+        registry.get('ta')
+        registry.get('hi')
+        registry.get('bn')
+
+        self.assertEqual(['bn', 'hi'], self._resident(registry))
+        self.assertEqual(200 * MB, registry.resident_bytes())
+        self.assertEqual(1, registry.evictions)
+
+    def test_room_is_made_before_an_evicted_model_is_loaded_again(self):
+        registry = PunctuationRegistry(memory_budget=250 * MB)
+        for lang in ['hi', 'ta', 'bn']:
+            registry.get(lang)
+        self.assertEqual(['bn', 'ta'], self._resident(registry))
+
+        resident_at_load = []
+
+        def load(*args, **kwargs):
+            resident_at_load.append(registry.resident_bytes())
+            return FakePunctuation(*args, **kwargs)
+
+        with mock.patch.object(model_registry, 'Punctuation', load):
+            registry.get('hi')
+
+        # the size of hi is known, ta is evicted before hi is loaded
+        self.assertEqual([100 * MB], resident_at_load)
+        self.assertEqual(['hi', 'bn'], self._resident(registry))
+        self.assertEqual(4, registry.loads)
+        self.assertEqual(2, registry.evictions)
+
+    def test_model_larger_than_budget_still_loads(self):
+        registry = PunctuationRegistry(memory_budget=200 * MB)
+        registry.get('hi')
+
+        registry.get('mr')
+
+        self.assertEqual(['mr'], self._resident(registry))
+        self.assertEqual(300 * MB, registry.resident_bytes())
+
+    def test_configure_registry_evicts_to_the_new_budget(self):
+        registry = PunctuationRegistry()
+        for lang in ['hi', 'ta', 'bn']:
+            registry.get(lang)
+
+        with mock.patch.object(model_registry, '_registry', registry):
+            self.assertIs(registry, model_registry.configure_registry(150 * MB))
+
+        self.assertEqual(['bn'], self._resident(registry))
+        self.assertEqual(150 * MB, registry.memory_budget)
+
+    def test_budget_from_environment(self):
+        with mock.patch.object(model_registry, '_registry', None), \
+                mock.patch.dict(os.environ, {model_registry.MEMORY_BUDGET_ENV: '1.5'}):
+            self.assertEqual(int(1.5 * MB), model_registry.get_registry().memory_budget)
+
+    def test_report_lists_resident_models(self):
+        registry = PunctuationRegistry(memory_budget=250 * MB)
+        registry.get('hi')
+        registry.get('ta', quantize=True)
+
+        report = model_registry.format_report(registry)
+
+        self.assertIn('resident 200.0 MB of 250.0 MB, 2 loads, 0 evictions', report)
+        self.assertEqual(['ta', 'hi'], [line.split()[0] for line in report.splitlines()[1:3]])
+
+    def test_clear_drops_every_model(self):
+        registry = PunctuationRegistry()
+        registry.get('hi')
+
+        registry.clear()
+
+        self.assertEqual(0, len(registry))
+        self.assertEqual(0, registry.resident_bytes())
@@ -0,0 +1,175 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from punctuate import model_store
+
+
+def fake_download(url, path, bar=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if url.endswith('.zip'):
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('vocab.txt', 'hello\n')
+        return
+    with open(path, 'wb') as fp:
+        fp.write(url.encode('utf-8'))
+
+
+class ModelStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.store)
+        patcher = mock.patch.dict(os.environ, {model_store.OFFLINE_ENV: ''})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(model_store, '_download', side_effect=fake_download)
+        self.download = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _path(self, rel_path):
+        return os.path.join(self.store, rel_path)
+
+    def _corrupt(self, rel_path, keep_mtime=False):
+        # same size, different content
+        stat = os.stat(self._path(rel_path))
+        with open(self._path(rel_path), 'rb') as fp:
+            content = fp.read()
+        with open(self._path(rel_path), 'wb') as fp:
+            fp.write(bytes(255 - byte for byte in content))
+        mtime_ns = stat.st_mtime_ns if keep_mtime else stat.st_mtime_ns + 10 ** 9
+        os.utime(self._path(rel_path), ns=(stat.st_atime_ns, mtime_ns))
+
+    def test_prefetch_records_every_file_of_a_language(self):
+        paths = model_store.prefetch_language('hi', self.store)
+
+        self.assertEqual(len(model_store.remote_files('hi')), self.download.call_count)
+        entries = model_store.read_manifest(self.store)['languages']['hi']
+        self.assertEqual(sorted(paths), [entry['path'] for entry in entries])
+        for entry in entries:
+            self.assertEqual(model_store.file_checksum(self._path(entry['path'])), entry['sha256'])
+            self.assertEqual(os.path.getsize(self._path(entry['path'])), entry['size'])
+        self.assertTrue(model_store.check_language('hi', self.store))
+
+    def test_populated_store_is_not_downloaded_again(self):
+        model_store.prefetch_language('hi', self.store)
+        self.download.reset_mock()
+
+        model_store.prefetch_language('hi', self.store)
+
+        self.download.assert_not_called()
+
+    def test_language_missing_from_manifest_is_not_present(self):
+        model_store.prefetch_language('hi', self.store)
+
+        self.assertFalse(model_store.check_language('ta', self.store))
+
+    def test_file_of_other_size_is_not_present(self):
+        model_store.prefetch_language('hi', self.store)
+        with open(self._path('hi.pt'), 'ab') as fp:
+            fp.write(b'x')
+
+        self.assertFalse(model_store.check_language('hi', self.store))
+
+    def test_corrupted_file_of_same_size_is_not_present(self):
+        model_store.prefetch_language('hi', self.store)
+        self._corrupt('hi.pt')
+
+        self.assertFalse(model_store.check_language('hi', self.store))
+
+    def test_corrupted_file_of_same_size_is_downloaded_again(self):
+        model_store.prefetch_language('hi', self.store)
+        self._corrupt('hi.pt')
+        self.download.reset_mock()
+
+        model_store.prefetch_language('hi', self.store)
+
+        self.assertEqual([mock.call(model_store.BUCKET + 'hi/hi.pt', self._path('hi.pt'), None)],
+                         self.download.call_args_list)
+        self.assertTrue(model_store.check_language('hi', self.store))
+
+    def test_copied_store_is_checked_once(self):
+        model_store.prefetch_language('hi', self.store)
+        stat = os.stat(self._path('hi.pt'))
+        os.utime(self._path('hi.pt'), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        with mock.patch.object(model_store, 'file_checksum', wraps=model_store.file_checksum) as checksum:
+            self.assertTrue(model_store.check_language('hi', self.store))
+            self.assertEqual(1, checksum.call_count)
+            self.assertTrue(model_store.check_language('hi', self.store))
+            self.assertEqual(1, checksum.call_count)
+
+    def test_verify_reports_checksum_mismatch(self):
+        model_store.prefetch_language('hi', self.store)
+        self._corrupt('hi.json', keep_mtime=True)
+        os.remove(self._path('hi_dict.json'))
+
+        problems = model_store.verify_store(['hi', 'ta'], self.store)
+
+        self.assertEqual(['hi.json: checksum mismatch', 'hi_dict.json: missing'], problems['hi'])
+        self.assertEqual(['not in the manifest'], problems['ta'])
+
+    def test_existing_files_are_recorded_without_download(self):
+        for _, path in model_store.remote_files('hi'):
+            fake_download('old install', self._path(path))
+
+        model_store.prefetch_language('hi', self.store)
+
+        self.download.assert_not_called()
+        self.assertTrue(model_store.check_language('hi', self.store))
+
+    def test_english_records_transformers_files(self):
+        paths = model_store.prefetch_language('en', self.store)
+
+        self.assertIn(os.path.join(model_store.TRANSFORMERS_CACHE_DIR, 'vocab.txt'), paths)
+        self.assertFalse(os.path.exists(self._path(model_store.TRANSFORMERS_ARCHIVE)))
+        self.assertTrue(model_store.check_language('en', self.store))
+
+    def test_unsupported_manifest_format_fails(self):
+        with open(self._path(model_store.MANIFEST_FILE), 'w') as fp:
+            json.dump({'format': model_store.FORMAT_VERSION + 1, 'languages': {}}, fp)
+
+        with self.assertRaises(ValueError):
+            model_store.check_language('hi', self.store)
+
+
+class OfflineModelStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.store)
+        patcher = mock.patch.dict(os.environ, {model_store.OFFLINE_ENV: '1'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_missing_language_fails_without_download(self):
+        with self.assertRaises(FileNotFoundError):
+            model_store.prefetch_language('hi', self.store)
+        self.assertFalse(os.path.exists(os.path.join(self.store, 'hi.pt')))
+
+    def test_populated_store_starts_offline(self):
+        with mock.patch.object(model_store, 'is_offline', return_value=False), \
+                mock.patch.object(model_store, '_download', side_effect=fake_download):
+            model_store.prefetch_language('hi', self.store)
+
+        self.assertTrue(model_store.check_language('hi', self.store))
+        model_store.prefetch_language('hi', self.store)
+
+    def test_corrupted_file_fails_offline(self):
+        with mock.patch.object(model_store, 'is_offline', return_value=False), \
+                mock.patch.object(model_store, '_download', side_effect=fake_download):
+            model_store.prefetch_language('hi', self.store)
+        with open(os.path.join(self.store, 'hi.pt'), 'ab') as fp:
+            fp.write(b'x')
+
+        self.assertFalse(model_store.check_language('hi', self.store))
+        with self.assertRaises(FileNotFoundError):
+            model_store.prefetch_language('hi', self.store)
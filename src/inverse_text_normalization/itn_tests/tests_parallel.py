@@ -0,0 +1,79 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from inverse_text_normalization import parallel
+
+
+def _tag_with_pid(text_list, lang):
+    return [f'{text}|{os.getpid()}' for text in text_list]
+
+
+def _slow_tag_with_lang(text_list, lang):
+    time.sleep(0.05)
+    return [f'{text}|{lang}' for text in text_list]
+
+
+@unittest.skipUnless(parallel.fork_available(), 'fork is not available')
+class ParallelInverseTextNormalization(unittest.TestCase):
+
+    def setUp(self):
+        # grammars are not needed by the fake normalizer
+        patcher = mock.patch.object(parallel, 'preload')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(parallel.shutdown_workers)
+
+    def test_results_keep_input_order(self):
+        data = [str(i) for i in range(50)]
+
+        results = parallel.map_sentences(_tag_with_pid, data, 'hi', workers=3, chunk_size=4)
+
+        self.assertEqual(data, [result.split('|')[0] for result in results])
+
+    def test_chunks_run_in_worker_processes(self):
+        results = parallel.map_sentences(_tag_with_pid, ['a'] * 20, 'hi', workers=2, chunk_size=5)
+
+        self.assertNotIn(str(os.getpid()), {result.split('|')[1] for result in results})
+
+    def test_single_chunk_runs_in_calling_process(self):
+        results = parallel.map_sentences(_tag_with_pid, ['a', 'b'], 'hi', workers=4, chunk_size=5)
+
+        self.assertEqual([f'a|{os.getpid()}', f'b|{os.getpid()}'], results)
+
+    def test_pool_is_reused_for_served_language(self):
+        pool = parallel.start_workers(['hi'], 2)
+
+        self.assertIs(pool, parallel.start_workers(['hi'], 2))
+        self.assertIsNot(pool, parallel.start_workers(['hi', 'en'], 2))
+
+    def test_concurrent_calls_for_other_languages_do_not_terminate_a_running_map(self):
+        data = [str(i) for i in range(40)]
+        results = {}
+
+        def run(lang):
+            results[lang] = parallel.map_sentences(_slow_tag_with_lang, data, lang, workers=2, chunk_size=2)
+
+        first = threading.Thread(target=run, args=('hi',), daemon=True)
+        first.start()
+        # the second language replaces the pool while the first map is running on it
+        deadline = time.time() + 10
+        while not parallel._pool_users and time.time() < deadline:
+            time.sleep(0.01)
+        second = threading.Thread(target=run, args=('en',), daemon=True)
+        second.start()
+        first.join(timeout=30)
+        second.join(timeout=30)
+
+        self.assertFalse(first.is_alive() or second.is_alive())
+        self.assertEqual([f'{text}|hi' for text in data], results['hi'])
+        self.assertEqual([f'{text}|en' for text in data], results['en'])
+        # the replaced pool was terminated by its last user
+        self.assertEqual({}, parallel._pool_users)
+        self.assertEqual(['hi', 'en'], parallel._pool_langs)
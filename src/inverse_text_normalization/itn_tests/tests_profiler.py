@@ -0,0 +1,73 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+
+from inverse_text_normalization import profiler
+
+
+class Fst:
+    def num_states(self):
+        return 2
+
+    def states(self):
+        return range(2)
+
+    def num_arcs(self, state):
+        return 3
+
+
+class Grammar:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        profiler.instrument(cls)
+
+    def __init__(self, name):
+        self.name = name
+        self.fst = None
+
+    def far_exist(self):
+        return False
+
+
+class Cardinal(Grammar):
+    def __init__(self):
+        super().__init__(name="cardinal")
+        self.fst = Fst()
+
+
+class Money(Grammar):
+    def __init__(self):
+        super().__init__(name="money")
+        self.cardinal = Cardinal()
+        self.fst = Fst()
+
+
+class Profiler(unittest.TestCase):
+
+    def test_grammars_are_recorded_in_build_order(self):
+        with profiler.profiling() as profiles:
+            Money()
+
+        self.assertEqual(['Money', 'Cardinal'], [profile.grammar for profile in profiles])
+        self.assertEqual([0, 1], [profile.depth for profile in profiles])
+        self.assertEqual((2, 6), (profiles[0].num_states, profiles[0].num_arcs))
+        self.assertLessEqual(profiles[0].self_seconds, profiles[0].seconds - profiles[1].seconds)
+
+    def test_nothing_is_recorded_outside_profiling(self):
+        with profiler.profiling() as profiles:
+            pass
+        Money()
+
+        self.assertEqual([], profiles)
+
+    def test_compare_reports(self):
+        with profiler.profiling() as profiles:
+            Money()
+        old = {'package': 'hi', 'grammars': [dict(profile._asdict(), kind='taggers') for profile in profiles]}
+        new = {'package': 'hi', 'grammars': [dict(grammar) for grammar in old['grammars']]}
+        new['grammars'][1]['num_states'] = 5
+
+        self.assertEqual([], profiler.compare_reports(old, old))
+        self.assertEqual(['hi taggers.Cardinal: num_states 2 -> 5'], profiler.compare_reports(old, new))
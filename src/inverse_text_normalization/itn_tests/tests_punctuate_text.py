@@ -0,0 +1,298 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import torch
+
+from punctuate import punctuate_text
+from punctuate.punctuate_text import WINDOW_LENGTH, Punctuation
+
+BLANK = 0
+PERIOD = 1
+
+
+class FakeTokenizer:
+    """
+    Splits words into word pieces of up to 3 characters, the first one starting with ▁
+    """
+    pad_token_id = 0
+    cls_token = '[CLS]'
+    sep_token = '[SEP]'
+
+    def __init__(self):
+        self.tokens = ['[PAD]', '[CLS]', '[SEP]']
+        self.ids = {token: i for i, token in enumerate(self.tokens)}
+
+    def _id(self, token):
+        if token not in self.ids:
+            self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+        return self.ids[token]
+
+    def encode(self, text, add_special_tokens=True):
+        ids = []
+        for word in text.split():
+            pieces = [word[i:i + 3] for i in range(0, len(word), 3)]
+            ids.extend(self._id(('▁' if i == 0 else '') + piece) for i, piece in enumerate(pieces))
+        return self.build_inputs_with_special_tokens(ids) if add_special_tokens else ids
+
+    def build_inputs_with_special_tokens(self, ids):
+        return [self.ids[self.cls_token]] + list(ids) + [self.ids[self.sep_token]]
+
+    def convert_ids_to_tokens(self, ids):
+        return [self.tokens[i] for i in ids]
+
+
+def one_hot_logits(labels):
+    # logits of a window, with rows for [CLS] and [SEP]
+    logits = np.zeros((len(labels) + 2, 2), dtype=np.float32)
+    logits[np.arange(1, len(labels) + 1), labels] = 5.0
+    return logits
+
+
+def fake_punctuation():
+    punctuation = Punctuation.__new__(Punctuation)
+    punctuation.language_code = 'hi'
+    punctuation.tokenizer = FakeTokenizer()
+    punctuation.train_encoder = {'blank': BLANK, 'period': PERIOD}
+    punctuation.punctuation_dict = {'blank': ' ', 'period': '. '}
+    punctuation.index_to_label = punctuation.get_index_to_label()
+    punctuation.sentence_end_labels = punctuation.get_sentence_end_labels()
+    punctuation.batch_shapes = []
+
+    def forward(input_ids, attention_mask):
+        # every word 'end' ends a sentence
+        punctuation.batch_shapes.append(tuple(input_ids.shape))
+        ids = input_ids.numpy()
+        logits = np.zeros(ids.shape + (2,), dtype=np.float32)
+        logits[..., BLANK] = 1.0
+        logits[..., PERIOD] = np.where(ids == punctuation.tokenizer.ids.get('▁end', -1), 5.0, 0.0)
+        return logits
+
+    punctuation.forward = forward
+    return punctuation
+
+
+class LogitsFromEncoded(unittest.TestCase):
+
+    def setUp(self):
+        self.punctuation = fake_punctuation()
+        self.batches = []
+
+        def forward(input_ids, attention_mask):
+            # the logits of a token are its id and whether it is attended to
+            self.batches.append((input_ids.numpy().copy(), attention_mask.numpy().copy()))
+            return np.stack([input_ids.numpy(), attention_mask.numpy()], axis=2).astype(np.float32)
+
+        self.punctuation.forward = forward
+
+    def test_results_keep_input_order(self):
+        encoded = [[1, 11, 12, 13, 2], [1, 2], [1, 11, 12, 13, 14, 15, 2], [1, 14, 2]]
+
+        logits = self.punctuation.get_logits_from_encoded(encoded, batch_size=2)
+
+        self.assertEqual(len(encoded), len(logits))
+        for ids, sentence_logits in zip(encoded, logits):
+            self.assertEqual(ids, sentence_logits[:, 0].astype(int).tolist())
+            self.assertEqual([1] * len(ids), sentence_logits[:, 1].astype(int).tolist())
+
+    def test_batches_hold_sentences_of_similar_length(self):
+        encoded = [[1, 11, 12, 13, 2], [1, 2], [1, 11, 12, 13, 14, 15, 2], [1, 14, 2]]
+
+        self.punctuation.get_logits_from_encoded(encoded, batch_size=2)
+
+        self.assertEqual([(2, 3), (2, 7)], [input_ids.shape for input_ids, _ in self.batches])
+        input_ids, attention_mask = self.batches[1]
+        self.assertEqual([1, 11, 12, 13, 2, 0, 0], input_ids[0].tolist())
+        self.assertEqual([1, 1, 1, 1, 1, 0, 0], attention_mask[0].tolist())
+
+    def test_no_sentences(self):
+        self.assertEqual([], self.punctuation.get_logits_from_encoded([]))
+        self.assertEqual([], self.batches)
+
+
+class DecodeSentence(unittest.TestCase):
+
+    def setUp(self):
+        self.punctuation = fake_punctuation()
+        self.punctuation.train_encoder = {'blank': 0, 'PAD': 1, 'period': 2}
+        self.punctuation.index_to_label = self.punctuation.get_index_to_label()
+
+    def test_pad_is_decoded_as_blank(self):
+        self.assertEqual(['blank', 'blank', 'period'], self.punctuation.index_to_label.tolist())
+
+    def test_labels_of_word_starts_follow_the_words(self):
+        tokens = ['[CLS]', '▁ab', 'c', '▁d', '▁e', '[SEP]']
+        label_indices = np.array([0, 2, 2, 1, 2, 0])
+
+        self.assertEqual('abc. d e. ', self.punctuation.decode_sentence('abc d e', tokens, label_indices))
+
+    def test_words_of_the_tokenizer_are_used_when_the_words_differ(self):
+        tokens = ['[CLS]', '▁ab', 'c', '▁d', '[SEP]']
+        label_indices = np.array([0, 0, 0, 2, 0])
+
+        # three words of the sentence but only two of the tokenizer
+        self.assertEqual('abc d. ', self.punctuation.decode_sentence('ab c d', tokens, label_indices))
+
+    def test_sentence_without_words(self):
+        self.assertEqual('', self.punctuation.decode_sentence('', ['[CLS]', '[SEP]'], np.array([0, 0])))
+
+
+class MergeWindowLabels(unittest.TestCase):
+
+    def setUp(self):
+        self.punctuation = fake_punctuation()
+
+    def test_single_window_labels_every_token(self):
+        word_starts = np.array([True, True, False, True])
+        labels = self.punctuation.merge_window_labels(word_starts, [0], [one_hot_logits([0, 1, 0, 1])])
+        self.assertEqual([0, 1, 0, 1], labels.tolist())
+
+    def test_next_window_takes_over_after_the_likeliest_sentence_end_of_the_overlap(self):
+        # windows of 6 tokens starting every 4 tokens overlap on tokens 4 and 5
+        word_starts = np.ones(10, dtype=bool)
+        first = one_hot_logits([0, 0, 0, 0, 0, 1])
+        second = one_hot_logits([1, 0, 0, 0, 0, 1])
+        labels = self.punctuation.merge_window_labels(word_starts, [0, 4], [first, second])
+        # token 5 ends a sentence in the first window, the second one labels from token 6 on
+        self.assertEqual([0, 0, 0, 0, 0, 1, 0, 0, 0, 1], labels.tolist())
+
+    def test_overlap_is_cut_after_a_word_start_only(self):
+        word_starts = np.array([True, True, True, True, True, False, True, True, True, True])
+        first = one_hot_logits([0, 0, 0, 0, 0, 1])
+        second = one_hot_logits([0, 1, 0, 0, 0, 0])
+        labels = self.punctuation.merge_window_labels(word_starts, [0, 4], [first, second])
+        # token 5 continues the word of token 4, the first window keeps token 4 and the second labels token 5
+        self.assertEqual([0, 0, 0, 0, 0, 1, 0, 0, 0, 0], labels.tolist())
+
+    def test_labels_of_one_window_per_token(self):
+        word_starts = np.ones(14, dtype=bool)
+        windows = [one_hot_logits([0] * 6) for _ in range(3)]
+        labels = self.punctuation.merge_window_labels(word_starts, [0, 4, 8], windows)
+        self.assertEqual(14, len(labels))
+
+
+class DocumentWindows(unittest.TestCase):
+
+    def setUp(self):
+        self.punctuation = fake_punctuation()
+
+    def test_document_of_exactly_one_window(self):
+        document = 'a b c end d end'
+        punctuated = self.punctuation.punctuate_text_others_documents([document], window_length=8, stride=4)
+        self.assertEqual([(1, 8)], self.punctuation.batch_shapes)
+        self.assertEqual(self.punctuation.punctuate_text_others_sentences([document]), punctuated)
+        self.assertEqual('a b c end. d end. ', punctuated[0])
+
+    def test_document_one_token_longer_than_a_window_is_split(self):
+        document = 'a b c end d e end'
+        punctuated = self.punctuation.punctuate_text_others_documents([document], window_length=8, stride=4)
+        self.assertEqual([(2, 8)], self.punctuation.batch_shapes)
+        self.assertEqual(['a b c end. d e end. '], punctuated)
+
+    def test_stride_must_fit_in_a_window(self):
+        with self.assertRaises(ValueError):
+            self.punctuation.punctuate_text_others_documents(['a b'], window_length=8, stride=7)
+
+    def test_stride_must_leave_an_overlap(self):
+        with self.assertRaises(ValueError):
+            self.punctuation.punctuate_text_others_documents(['a b c d e f g h'], window_length=8, stride=6)
+
+
+class SentenceRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.punctuation = fake_punctuation()
+
+    def test_sentences_longer_than_a_window_of_tokens_are_punctuated_in_windows(self):
+        # far fewer words than the word buffer, but 4 word pieces per word
+        long_sentence = ' '.join(['abcdefghijkl'] * 70 + ['end'])
+        sentences = ['a b end', long_sentence]
+        with mock.patch.object(self.punctuation, 'punctuate_text_others_documents',
+                               wraps=self.punctuation.punctuate_text_others_documents) as documents:
+            punctuated = self.punctuation.punctuate_text_others(sentences)
+
+        documents.assert_called_once_with([long_sentence], mock.ANY)
+        self.assertTrue(all(length <= WINDOW_LENGTH for _, length in self.punctuation.batch_shapes))
+        self.assertEqual('a b end. ', punctuated[0])
+        self.assertEqual(71, len(punctuated[1].split()))
+        self.assertTrue(punctuated[1].endswith('end. '))
+
+    def test_sentence_filling_a_window_is_punctuated_whole(self):
+        sentence = ' '.join(['a'] * (WINDOW_LENGTH - 3) + ['end'])
+        with mock.patch.object(self.punctuation, 'punctuate_text_others_documents',
+                               wraps=self.punctuation.punctuate_text_others_documents) as documents:
+            punctuated = self.punctuation.punctuate_text_others([sentence])
+
+        documents.assert_called_once_with([], mock.ANY)
+        self.assertIn((1, WINDOW_LENGTH), self.punctuation.batch_shapes)
+        self.assertTrue(punctuated[0].endswith('end. '))
+
+
+class QuantizedModelCache(unittest.TestCase):
+
+    def setUp(self):
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir)
+        self.punctuation = fake_punctuation()
+        self.punctuation.model_path = os.path.join(model_dir, 'hi.pt')
+        self.punctuation.quantized_model_path = os.path.join(model_dir, 'hi.int8.pt')
+        with open(self.punctuation.model_path, 'wb') as fp:
+            fp.write(b'checkpoint')
+        # the quantized model is built and loaded without a checkpoint or albert metadata
+        self.punctuation.albert_config = mock.Mock()
+        self.punctuation.quantize_model = mock.Mock(side_effect=lambda model: model)
+        patcher = mock.patch.object(punctuate_text, 'AlbertForTokenClassification')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        model = mock.Mock()
+        model.state_dict.return_value = {'weight': torch.ones(2)}
+        self.punctuation.save_quantized_model(model)
+
+    def _touch_checkpoint(self):
+        stat = os.stat(self.punctuation.model_path)
+        os.utime(self.punctuation.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_saved_model_is_loaded(self):
+        model = self.punctuation.load_quantized_model(2)
+
+        self.assertIsNotNone(model)
+        state_dict = model.load_state_dict.call_args[0][0]
+        self.assertTrue(torch.equal(torch.ones(2), state_dict['weight']))
+
+    def test_key_changes_with_the_checkpoint(self):
+        key = self.punctuation.quantized_model_key()
+        self._touch_checkpoint()
+
+        self.assertNotEqual(key, self.punctuation.quantized_model_key())
+        self.assertIsNone(self.punctuation.load_quantized_model(2))
+
+    def test_key_changes_with_the_torch_version(self):
+        key = self.punctuation.quantized_model_key()
+        with mock.patch.object(torch, '__version__', torch.__version__ + '.post1'):
+            self.assertNotEqual(key, self.punctuation.quantized_model_key())
+            self.assertIsNone(self.punctuation.load_quantized_model(2))
+
+    def test_missing_cache(self):
+        os.remove(self.punctuation.quantized_model_path)
+
+        self.assertIsNone(self.punctuation.load_quantized_model(2))
+
+    def test_unwritable_cache_is_skipped(self):
+        os.remove(self.punctuation.quantized_model_path)
+        model = mock.Mock()
+        model.state_dict.return_value = {'weight': torch.ones(2)}
+
+        with mock.patch.object(punctuate_text.os, 'replace', side_effect=PermissionError):
+            self.punctuation.save_quantized_model(model)
+
+        self.assertFalse(os.path.exists(self.punctuation.quantized_model_path + '.tmp'))
+        self.assertIsNone(self.punctuation.load_quantized_model(2))
@@ -0,0 +1,86 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import copy
+import unittest
+from types import SimpleNamespace
+
+import torch
+from transformers import AlbertConfig, AlbertForTokenClassification
+
+from punctuate.export import LogitsModel, sample_inputs, verify_export
+from punctuate.punctuate_text import Punctuation
+
+VOCAB_SIZE = 50
+
+
+def tiny_model(seed=0):
+    torch.manual_seed(seed)
+    config = AlbertConfig(vocab_size=VOCAB_SIZE, embedding_size=8, hidden_size=16, num_hidden_layers=1,
+                          num_attention_heads=2, intermediate_size=32, num_labels=3)
+    return AlbertForTokenClassification(config).eval()
+
+
+def punctuation_with(model, backend='eager'):
+    punctuation = Punctuation.__new__(Punctuation)
+    punctuation.language_code = 'hi'
+    punctuation.backend = backend
+    punctuation.device = 'cpu'
+    punctuation.tokenizer = SimpleNamespace(vocab_size=VOCAB_SIZE)
+    punctuation.model = model
+    return punctuation
+
+
+class PunctuationExport(unittest.TestCase):
+
+    def test_logits_model_returns_the_logits(self):
+        model = tiny_model()
+        input_ids, attention_mask = sample_inputs(VOCAB_SIZE, 3, 10)
+
+        with torch.no_grad():
+            output = LogitsModel(model)(input_ids, attention_mask)
+            expected = model(input_ids, attention_mask=attention_mask).logits
+
+        self.assertIsInstance(output, tuple)
+        self.assertEqual(1, len(output))
+        self.assertTrue(torch.equal(expected, output[0]))
+
+    def test_sample_inputs_pad_every_row_but_the_first(self):
+        input_ids, attention_mask = sample_inputs(VOCAB_SIZE, 4, 16, seed=3)
+
+        self.assertEqual((4, 16), tuple(input_ids.shape))
+        self.assertTrue(bool(attention_mask[0].all()))
+        for row in range(1, 4):
+            self.assertEqual(0, int(attention_mask[row, -1]))
+        self.assertTrue(torch.equal(input_ids, sample_inputs(VOCAB_SIZE, 4, 16, seed=3)[0]))
+
+    def test_traced_model_is_accepted(self):
+        model = tiny_model()
+        example = sample_inputs(VOCAB_SIZE, 2, 16)
+        with torch.no_grad():
+            traced = torch.jit.trace(LogitsModel(model).eval(), example)
+
+        difference = verify_export(punctuation_with(model), punctuation_with(traced, backend='torchscript'))
+
+        self.assertLessEqual(difference, 1e-4)
+
+    def test_model_with_other_weights_is_rejected(self):
+        model = tiny_model(seed=0)
+        changed = copy.deepcopy(model)
+        with torch.no_grad():
+            # favours the first label at every position
+            changed.classifier.bias[0] += 10.0
+
+        with self.assertRaises(ValueError):
+            verify_export(punctuation_with(model), punctuation_with(changed))
+
+    def test_tolerance_is_applied(self):
+        model = tiny_model(seed=0)
+        changed = copy.deepcopy(model)
+        with torch.no_grad():
+            changed.classifier.bias.add_(1e-3)
+
+        self.assertLessEqual(verify_export(punctuation_with(model), punctuation_with(changed), atol=1e-2), 1e-2)
+        with self.assertRaises(ValueError):
+            verify_export(punctuation_with(model), punctuation_with(changed), atol=1e-5)
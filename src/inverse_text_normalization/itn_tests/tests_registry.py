@@ -0,0 +1,24 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+
+from inverse_text_normalization import registry
+from inverse_text_normalization.run_predict import inverse_normalize_text
+
+
+class LanguageRegistry(unittest.TestCase):
+
+    def test_importing_dispatcher_does_not_build_grammars(self):
+        self.assertEqual([], registry.loaded_languages())
+
+    def test_language_codes_are_mapped_to_packages(self):
+        self.assertEqual('ori', registry.get_package('or'))
+        self.assertEqual('asm', registry.get_package('as'))
+        self.assertEqual('en', registry.get_package('en_bio'))
+        self.assertEqual('hi', registry.get_package('hi'))
+
+    def test_unsupported_language_raises(self):
+        with self.assertRaises(ValueError):
+            inverse_normalize_text(['दो सौ'], lang='xx')
@@ -0,0 +1,116 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import itertools
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from inverse_text_normalization import result_cache
+from inverse_text_normalization.lexicon import Lexicon
+from inverse_text_normalization.result_cache import CacheStats, DiskCache, LRUCache
+from inverse_text_normalization.spans import normalize_spans
+
+
+class ResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'itn.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lru_cache_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('एक लाख', '100000')
+        cache.put('दो सौ', '200')
+        cache.get('एक लाख')
+        cache.put('पांच', '5')
+
+        self.assertEqual('100000', cache.get('एक लाख'))
+        self.assertIsNone(cache.get('दो सौ'))
+        self.assertEqual(CacheStats(hits=2, misses=1, evictions=1, size=2), cache.stats())
+
+    def test_disk_cache_is_shared(self):
+        DiskCache(self.path, 'hi', 'key').put('दो सौ', '200')
+
+        cache = DiskCache(self.path, 'hi', 'key')
+
+        self.assertEqual('200', cache.get('दो सौ'))
+        self.assertIsNone(DiskCache(self.path, 'mr', 'key').get('दो सौ'))
+
+    def test_disk_cache_drops_entries_of_other_grammars(self):
+        DiskCache(self.path, 'hi', 'old key').put('दो सौ', '200')
+
+        cache = DiskCache(self.path, 'hi', 'new key')
+
+        self.assertIsNone(cache.get('दो सौ'))
+        self.assertEqual(0, cache.stats().size)
+
+    def _clock(self):
+        # every call to time.time is one second later
+        clock = itertools.count(1)
+        return mock.patch.object(result_cache, 'time', SimpleNamespace(time=lambda: next(clock)))
+
+    def _used(self, key):
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute("SELECT used FROM results WHERE text = ?", (key,)).fetchone()[0]
+
+    def test_disk_cache_hits_do_not_write(self):
+        with self._clock():
+            cache = DiskCache(self.path, 'hi', 'key')
+            cache.put('दो सौ', '200')
+            connection = cache._connect()
+            changes = connection.total_changes
+
+            for _ in range(5):
+                self.assertEqual('200', cache.get('दो सौ'))
+
+            self.assertEqual(changes, connection.total_changes)
+            self.assertEqual(1, self._used('दो सौ'))
+            cache.close()
+
+        self.assertEqual(6, self._used('दो सौ'))
+
+    def test_disk_cache_writes_recency_every_interval(self):
+        with self._clock(), mock.patch.object(result_cache, 'DISK_RECENCY_INTERVAL', 3):
+            cache = DiskCache(self.path, 'hi', 'key')
+            for i in range(3):
+                cache.put(str(i), str(i))
+            for i in range(3):
+                cache.get(str(i))
+
+        self.assertEqual([4, 5, 6], [self._used(str(i)) for i in range(3)])
+        self.assertEqual({}, cache._used)
+
+    def test_disk_cache_evicts_least_recently_hit(self):
+        with self._clock(), mock.patch.object(result_cache, 'DISK_EVICTION_INTERVAL', 1):
+            cache = DiskCache(self.path, 'hi', 'key', maxsize=2)
+            cache.put('एक लाख', '100000')
+            cache.put('दो सौ', '200')
+            cache.get('एक लाख')
+            cache.put('पांच', '5')
+
+        self.assertEqual('100000', cache.get('एक लाख'))
+        self.assertIsNone(cache.get('दो सौ'))
+        self.assertEqual(1, cache.stats().evictions)
+
+    def test_repeated_spans_are_normalized_once(self):
+        calls = []
+
+        def normalize(text):
+            calls.append(text)
+            return text.replace('दो सौ', '200')
+
+        lexicon = Lexicon(['दो', 'सौ'])
+        cache = LRUCache()
+        outputs = [normalize_spans(text, lexicon, normalize, cache=cache) for text in ['दो सौ', 'कुल  दो सौ']]
+
+        self.assertEqual(['200', 'कुल 200'], outputs)
+        self.assertEqual(['दो सौ'], calls)
@@ -0,0 +1,178 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import asyncio
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from inverse_text_normalization.server import (
+    ITN_ENDPOINT,
+    MAX_BODY_BYTES,
+    MAX_HEADER_LINES,
+    PUNCTUATE_ENDPOINT,
+    InferenceServer,
+    percentile,
+)
+
+batches = []
+
+
+def itn(lang, text_list):
+    batches.append(list(text_list))
+    return [text.replace('दो सौ', '200') for text in text_list]
+
+
+def punctuate(lang, text_list):
+    return [text + '।' for text in text_list]
+
+
+async def post(port, path, payload):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body.decode('utf-8'))
+
+
+async def send(port, request):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split()[1])
+
+
+async def get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body.decode('utf-8'))
+
+
+class Server(unittest.TestCase):
+
+    def setUp(self):
+        batches.clear()
+
+    def run_with_server(self, test):
+        async def run():
+            server = InferenceServer(
+                itn_langs=['hi'],
+                punctuation_langs=['hi'],
+                max_batch_size=8,
+                max_delay=0.05,
+                tasks={ITN_ENDPOINT: itn, PUNCTUATE_ENDPOINT: punctuate},
+                executor=ThreadPoolExecutor(max_workers=1),
+            )
+            _, port = await server.start('127.0.0.1', 0)
+            try:
+                return await test(port)
+            finally:
+                await server.stop()
+
+        return asyncio.run(run())
+
+    def test_concurrent_requests_are_batched(self):
+        async def test(port):
+            return await asyncio.gather(
+                post(port, ITN_ENDPOINT, {'lang': 'hi', 'text': ['दो सौ रुपये', 'एक']}),
+                post(port, ITN_ENDPOINT, {'lang': 'hi', 'text': 'कुल दो सौ'}),
+            )
+
+        responses = self.run_with_server(test)
+
+        self.assertEqual((200, {'text': ['200 रुपये', 'एक']}), responses[0])
+        self.assertEqual((200, {'text': 'कुल 200'}), responses[1])
+        self.assertEqual(1, len(batches))
+        self.assertEqual(3, len(batches[0]))
+
+    def test_punctuate(self):
+        async def test(port):
+            return await post(port, PUNCTUATE_ENDPOINT, {'lang': 'hi', 'text': ['मैं घर जा रहा हूँ']})
+
+        self.assertEqual((200, {'text': ['मैं घर जा रहा हूँ।']}), self.run_with_server(test))
+
+    def test_invalid_requests(self):
+        async def test(port):
+            return await asyncio.gather(
+                post(port, ITN_ENDPOINT, {'lang': 'ta', 'text': ['நூறு']}),
+                post(port, ITN_ENDPOINT, {'lang': 'hi', 'text': [1]}),
+                post(port, '/normalize', {'lang': 'hi', 'text': ['दो सौ']}),
+                get(port, ITN_ENDPOINT),
+            )
+
+        statuses = [status for status, _ in self.run_with_server(test)]
+
+        self.assertEqual([400, 400, 404, 405], statuses)
+
+    def test_oversized_body_is_rejected(self):
+        async def test(port):
+            return await send(port, f"POST {ITN_ENDPOINT} HTTP/1.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode())
+
+        self.assertEqual(413, self.run_with_server(test))
+
+    def test_oversized_header_is_rejected(self):
+        async def test(port):
+            return await send(port, f"GET /health HTTP/1.1\r\nX-Long: {'a' * 70000}\r\n\r\n".encode())
+
+        self.assertEqual(431, self.run_with_server(test))
+
+    def test_too_many_headers_are_rejected(self):
+        async def test(port):
+            headers = ''.join(f"X-{i}: {i}\r\n" for i in range(MAX_HEADER_LINES + 1))
+            return await send(port, f"GET /health HTTP/1.1\r\n{headers}\r\n".encode())
+
+        self.assertEqual(431, self.run_with_server(test))
+
+    def test_metrics(self):
+        async def test(port):
+            await post(port, ITN_ENDPOINT, {'lang': 'hi', 'text': ['दो सौ']})
+            await post(port, ITN_ENDPOINT, {'lang': 'ta', 'text': ['நூறு']})
+            return await get(port, '/metrics')
+
+        status, metrics = self.run_with_server(test)
+
+        self.assertEqual(200, status)
+        self.assertEqual(2, metrics[ITN_ENDPOINT]['requests'])
+        self.assertEqual(1, metrics[ITN_ENDPOINT]['errors'])
+        self.assertLessEqual(metrics[ITN_ENDPOINT]['p50_ms'], metrics[ITN_ENDPOINT]['p99_ms'])
+
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(2, percentile([3, 1, 2], 50))
+        self.assertEqual(99, percentile(range(1, 101), 99))
+
+
+class ServerLanguages(unittest.TestCase):
+
+    def test_unsupported_punctuation_language_fails_up_front(self):
+        with self.assertRaises(ValueError):
+            InferenceServer(punctuation_langs=['hi', 'xx'], workers=0)
+
+    def test_english_punctuation_languages_are_supported(self):
+        server = InferenceServer(punctuation_langs=['en', 'en_bio'], workers=0)
+
+        self.assertEqual(['en', 'en_bio'], server.punctuation_langs)
+
+    def test_memory_budget_is_configured_in_each_worker(self):
+        server = InferenceServer(punctuation_langs=['hi'], workers=0, punctuation_memory_budget=600 * 2 ** 20)
+
+        with mock.patch('punctuate.model_registry.configure_registry') as configure_registry, \
+                mock.patch('punctuate.model_registry.get_registry') as get_registry:
+            server._create_executor().shutdown()
+
+        configure_registry.assert_called_once_with(600 * 2 ** 20)
+        get_registry.return_value.get.assert_called_once_with('hi')
@@ -0,0 +1,43 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+
+from inverse_text_normalization.lexicon import Lexicon
+from inverse_text_normalization.spans import Span, find_spans, normalize_spans
+
+
+class SpanInverseTextNormalization(unittest.TestCase):
+
+    def setUp(self):
+        self.lexicon = Lexicon(['दो', 'सौ', 'पांच'], tail_length=1)
+        self.calls = []
+
+    def _normalize(self, text):
+        self.calls.append(text)
+        return text.replace('दो सौ', '200').replace('पांच', '5')
+
+    def test_spans_cover_lexicon_chunks_and_their_tail(self):
+        chunks = 'मेरे पास दो सौ रुपये हैं और पांच किलो आम'.split()
+
+        self.assertEqual([Span(2, 5), Span(7, 9)], find_spans(chunks, self.lexicon))
+
+    def test_adjacent_lexicon_chunks_share_a_span(self):
+        lexicon = Lexicon(['दो', 'सौ'])
+
+        self.assertEqual([Span(0, 2)], find_spans(['दो', 'सौ', 'रुपये'], lexicon))
+
+    def test_only_spans_are_normalized(self):
+        text = 'मेरे पास,  दो सौ रुपये हैं और पांच किलो आम!'
+
+        output = normalize_spans(text, self.lexicon, self._normalize)
+
+        self.assertEqual('मेरे पास , 200 रुपये हैं और 5 किलो आम !', output)
+        self.assertEqual(['दो सौ रुपये', 'पांच किलो'], self.calls)
+
+    def test_sentence_without_spans_is_not_normalized(self):
+        output = normalize_spans('वह घर गया, फिर (आया)', self.lexicon, self._normalize)
+
+        self.assertEqual('वह घर गया , फिर ( आया )', output)
+        self.assertEqual([], self.calls)
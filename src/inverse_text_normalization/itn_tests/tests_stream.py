@@ -0,0 +1,60 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from inverse_text_normalization.batch import BatchReport
+from inverse_text_normalization.stream import StreamReport, add_batch, micro_batches, open_text, read_lines, write_lines
+
+
+class Stream(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_micro_batches_are_lazy(self):
+        read = []
+
+        def lines():
+            for line in ['एक', 'दो', 'तीन']:
+                read.append(line)
+                yield line
+
+        batches = micro_batches(lines(), batch_size=2)
+
+        self.assertEqual(['एक', 'दो'], next(batches))
+        self.assertEqual(['एक', 'दो'], read)
+
+    def test_micro_batches(self):
+        self.assertEqual([['एक', 'दो'], ['तीन']], list(micro_batches(['एक', 'दो', 'तीन'], batch_size=2)))
+        self.assertEqual([], list(micro_batches([], batch_size=2)))
+        with self.assertRaises(ValueError):
+            list(micro_batches(['एक'], batch_size=0))
+
+    def test_gzip_round_trip(self):
+        path = os.path.join(self.tmp_dir, 'out.txt.gz')
+
+        with open_text(path, 'w') as fp:
+            write_lines(fp, ['दो सौ', '', 'एक लाख'])
+        with open_text(path, 'r') as fp:
+            lines = list(read_lines(fp))
+
+        self.assertEqual(['दो सौ', '', 'एक लाख'], lines)
+        with gzip.open(path, 'rt', encoding='utf-8') as fp:
+            self.assertEqual('दो सौ\n\nएक लाख\n', fp.read())
+
+    def test_add_batch(self):
+        report = StreamReport(lang='hi', sentences=0, batches=0, unique=0, skipped=0, seconds=0.0)
+
+        report = add_batch(report, BatchReport(lang='hi', sentences=4, unique=2, skipped=1, seconds=0.1), 0.5)
+        report = add_batch(report, BatchReport(lang='hi', sentences=3, unique=3, skipped=0, seconds=0.1), 1.0)
+
+        self.assertEqual(StreamReport(lang='hi', sentences=7, batches=2, unique=5, skipped=1, seconds=1.0), report)
@@ -0,0 +1,46 @@
+'''
+Please move this file to src/ before running the tests
+'''
+
+import unittest
+from collections import OrderedDict
+
+from inverse_text_normalization.token_verbalizer import TokenVerbalizer
+
+
+def _token(name, **fields):
+    return OrderedDict(tokens=OrderedDict([(name, OrderedDict(fields))]))
+
+
+def _name(name, **fields):
+    return OrderedDict(tokens=OrderedDict(name=name, **fields))
+
+
+class TokenVerbalization(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.verbalizer = TokenVerbalizer(self._verbalize, permute=lambda token: [])
+
+    def _verbalize(self, tagged_text):
+        self.calls.append(tagged_text)
+        if 'money' not in tagged_text:
+            return None
+        return '₹200'
+
+    def test_words_and_punctuation_skip_the_verbalizer(self):
+        tokens = [_name('मेरे'), _name('for\u00A0example'), _name(',', pause_length='PAUSE_MEDIUM')]
+
+        self.assertEqual('मेरे for example ,', self.verbalizer(tokens))
+        self.assertEqual([], self.calls)
+
+    def test_semiotic_tokens_are_memoized(self):
+        money = _token('money', integer_part='200', currency='₹')
+        tokens = [_name('कुल'), money, _name('और'), money]
+
+        self.assertEqual('कुल ₹200 और ₹200', self.verbalizer(tokens))
+        self.assertEqual([' tokens {  money { currency: "₹" integer_part: "200"  }  } '], self.calls)
+
+    def test_unknown_token_raises(self):
+        with self.assertRaises(ValueError):
+            self.verbalizer([_token('cardinal', integer='5')])
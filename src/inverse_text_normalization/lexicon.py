@@ -0,0 +1,300 @@
+'''
+Lexicon trigger for inverse text normalization.
+
+A semiotic class grammar only accepts a span of tokens starting with a word of the data files of
+its language (numbers, order/special words, months, whitelist, ...) or a literal of the tagger
+sources, e.g. "minus" or "point". Units and currencies never start a span, they always follow a
+number. A sentence none of whose tokens can start a span, and which has no digit or currency
+symbol, is only tokenized by the grammars: punctuation is split off and whitespace is collapsed.
+`Lexicon.needs_grammars` tells such tokens apart, so spans.py tokenizes them without running the fsts.
+
+Number words may be glued together without a space ("चारसौ"), so a token triggers if it can be
+segmented into lexicon words, not only if it is one.
+'''
+
+import ast
+import json
+import os
+import re
+import threading
+from typing import Iterable, List, Set
+
+from inverse_text_normalization.grammar_cache import DATA_EXTENSIONS, get_package_dir
+
+# characters split off words by the tokenizer, see taggers/punctuation.py
+PUNCTUATION = ',;().!?:'
+WHITE_SPACE = ' \t\n\r\u00A0'
+# characters that need the grammars or the post-processing of run_predict
+SPECIAL_CHARACTERS = set('"{}[]\\$₹£€')
+# (suffix, replacement) of words rewritten before cardinal lookup, see taggers/ordinal.py and taggers/date.py
+SUFFIX_RULES = (('tieth', 'ty'), ('th', ''), ('ties', 'ty'))
+SENTENCE_BOUNDARY_EXCEPTIONS = 'sentence_boundary_exceptions.txt'
+# data files whose words only occur right after a number, possibly glued to it, e.g. "p.m." in "दोp.m."
+FOLLOWING_DATA_FILES = ('time_suffix.tsv', 'time_zone.tsv')
+# data files of units, always separated from the number before them by a space, e.g. "किलो" in "पांच किलो"
+UNIT_DATA_FILES = ('currency.tsv', 'magnitudes.tsv', 'measurements.tsv', 'suppletive.tsv')
+# data files whose entries are matched as a whole, never glued to other words
+WHOLE_DATA_FILES = ('whitelist.tsv',)
+# calls whose string arguments are output or file names, never grammar input
+OUTPUT_CALLS = ('insert', 'get_abs_path', 'open', 'string_file', 'print', 'add_tokens', 'exec')
+ORDINALS_DIR = 'ordinals'
+
+_white_space_regex = re.compile(f'[{WHITE_SPACE}]+')
+
+_lexicons = {}
+_lock = threading.Lock()
+
+
+def split_chunks(text: str) -> List[str]:
+    """
+    Splits a sentence at whitespace the way the tokenizer does
+    """
+    return [chunk for chunk in _white_space_regex.split(text) if chunk]
+
+
+def tokenize_chunk(chunk: str) -> List[str]:
+    """
+    Splits off the punctuation of a chunk the grammars do not rewrite, e.g. "(आया)," -> ["(", "आया", ")", ","]
+    """
+    start = len(chunk) - len(chunk.lstrip(PUNCTUATION))
+    end = len(chunk.rstrip(PUNCTUATION))
+    return list(chunk[:start]) + [chunk[start:end]] + list(chunk[end:])
+
+
+def _data_files(package_dir: str) -> List[str]:
+    files = []
+    for root, _, names in os.walk(os.path.join(package_dir, 'data')):
+        for name in sorted(names):
+            if name.endswith(DATA_EXTENSIONS) and name not in UNIT_DATA_FILES + (SENTENCE_BOUNDARY_EXCEPTIONS,):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def _json_strings(obj) -> Iterable[str]:
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            yield key
+            yield from _json_strings(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _json_strings(value)
+
+
+def _read_entries(path: str) -> Iterable[str]:
+    """
+    Reads all fields of a tsv/txt file or all strings of a json file
+
+    Args:
+        path: data file path
+
+    Returns: entries, on input and output side alike
+    """
+    with open(path, 'r', encoding='utf-8') as fp:
+        if path.endswith('.json'):
+            yield from _json_strings(json.load(fp))
+            return
+        for line in fp:
+            yield from line.rstrip('\n').split('\t')
+
+
+def _source_literals(package_dir: str) -> Iterable[str]:
+    """
+    Collects the input side string literals of the tagger sources, e.g. "minus" of pynini.cross("minus", "\"-\""),
+    leaving out docstrings, file paths and inserted markup
+    """
+    taggers_dir = os.path.join(package_dir, 'taggers')
+    for name in sorted(os.listdir(taggers_dir)):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(taggers_dir, name), 'r', encoding='utf-8') as fp:
+            tree = ast.parse(fp.read())
+
+        skipped = set()
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Expr, ast.JoinedStr)):
+                skipped.update(id(child) for child in ast.walk(node))
+            elif isinstance(node, ast.Call):
+                func = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, 'id', '')
+                if func in OUTPUT_CALLS:
+                    skipped.update(id(arg) for arg in ast.walk(node))
+                elif func == 'cross' and len(node.args) == 2:
+                    skipped.update(id(arg) for arg in ast.walk(node.args[1]))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in skipped:
+                yield node.value
+
+
+def _max_entry_length(path: str) -> int:
+    """
+    Returns the largest number of words of an entry of a data file, 0 if the file does not exist
+    """
+    if not os.path.exists(path):
+        return 0
+    return max((len(entry.split()) for entry in _read_entries(path)), default=0)
+
+
+def _ordinal_rules(package_dir: str) -> Set[tuple]:
+    rules = set(SUFFIX_RULES)
+    ordinals_dir = os.path.join(package_dir, 'data', ORDINALS_DIR)
+    if os.path.isdir(ordinals_dir):
+        for name in os.listdir(ordinals_dir):
+            if not name.endswith('.tsv'):
+                continue
+            with open(os.path.join(ordinals_dir, name), 'r', encoding='utf-8') as fp:
+                for line in fp:
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) == 2 and fields[0]:
+                        rules.add((fields[0], fields[1]))
+    return rules
+
+
+def _words(words: Iterable[str]) -> Set[str]:
+    # punctuation is split off by the tokenizer before any grammar sees it
+    return {word for word in words if word.strip(PUNCTUATION)}
+
+
+class Lexicon:
+    """
+    Words the grammars of a language package can rewrite
+
+    Args:
+        leading_words: words a semiotic class can start with, e.g. number words, months or "minus"
+        following_words: words that only occur after a leading word, e.g. "p.m." after an hour
+        whole_words: words only rewritten as a whole token, e.g. whitelisted words
+        suffix_rules: (suffix, replacement) pairs, a word ending in suffix triggers if the word
+            with the suffix replaced does
+        exceptions: sentence boundary exceptions, kept attached to their punctuation by the tokenizer
+        tail_length: number of chunks of units, suffixes or time zones a semiotic class can end with,
+            after its last word of the lexicon
+    """
+
+    def __init__(
+        self,
+        leading_words: Iterable[str],
+        following_words: Iterable[str] = (),
+        whole_words: Iterable[str] = (),
+        suffix_rules: Iterable[tuple] = (),
+        exceptions: Iterable[str] = (),
+        tail_length: int = 0,
+    ):
+        self.leading_words = _words(leading_words)
+        self.words = self.leading_words | _words(following_words)
+        self.whole_words = _words(whole_words)
+        self.max_word_length = max((len(word) for word in self.words), default=0)
+        self.suffix_rules = sorted(suffix_rules)
+        self.exceptions = [exception for exception in exceptions if exception]
+        self.tail_length = tail_length
+
+    @classmethod
+    def from_package(cls, package_dir: str) -> 'Lexicon':
+        """
+        Builds the lexicon of a language package from its data files and tagger sources
+
+        Args:
+            package_dir: language package directory
+
+        Returns: Lexicon
+        """
+        leading_words = set()
+        following_words = set()
+        whole_words = set()
+        for path in _data_files(package_dir):
+            name = os.path.basename(path)
+            if name in FOLLOWING_DATA_FILES:
+                words = following_words
+            elif name in WHOLE_DATA_FILES:
+                words = whole_words
+            else:
+                words = leading_words
+            for entry in _read_entries(path):
+                words.update(entry.split())
+        for literal in _source_literals(package_dir):
+            leading_words.update(literal.split())
+
+        exceptions = []
+        exceptions_path = os.path.join(package_dir, 'data', SENTENCE_BOUNDARY_EXCEPTIONS)
+        if os.path.exists(exceptions_path):
+            with open(exceptions_path, 'r', encoding='utf-8') as fp:
+                exceptions = [line.strip() for line in fp]
+        # "पांच किलो मीटर" or "दो बजे p m e s t"
+        data_dir = os.path.join(package_dir, 'data')
+        tail_length = max(
+            max(_max_entry_length(os.path.join(data_dir, name)) for name in UNIT_DATA_FILES),
+            sum(_max_entry_length(os.path.join(data_dir, name)) for name in FOLLOWING_DATA_FILES),
+        )
+        return cls(
+            leading_words, following_words, whole_words, _ordinal_rules(package_dir), exceptions, tail_length
+        )
+
+    def is_segmentable(self, token: str) -> bool:
+        """
+        Returns true if token is a leading word followed by any number of lexicon words, e.g. "चारसौ"
+        """
+        if token in self.leading_words:
+            return True
+        # reachable[i]: token[:i] is a leading word followed by lexicon words
+        reachable = [False] * (len(token) + 1)
+        for end in range(1, min(len(token), self.max_word_length) + 1):
+            reachable[end] = token[:end] in self.leading_words
+        for start in range(1, len(token)):
+            if not reachable[start]:
+                continue
+            for end in range(start + 1, min(len(token), start + self.max_word_length) + 1):
+                if not reachable[end] and token[start:end] in self.words:
+                    reachable[end] = True
+        return reachable[-1]
+
+    def is_trigger(self, token: str) -> bool:
+        """
+        Returns true if a grammar could rewrite a token, or a span of tokens starting with it
+
+        Args:
+            token: whitespace separated token
+        """
+        if any(char.isdigit() or char in SPECIAL_CHARACTERS for char in token):
+            return True
+        if token in self.whole_words or self.is_segmentable(token):
+            return True
+        for suffix, replacement in self.suffix_rules:
+            if token.endswith(suffix) and self.is_segmentable(token[: len(token) - len(suffix)] + replacement):
+                return True
+        return False
+
+    def needs_grammars(self, chunk: str) -> bool:
+        """
+        Returns true if the grammars could do more with a whitespace separated chunk than splitting off its punctuation
+
+        Args:
+            chunk: whitespace separated chunk of a sentence, e.g. "(चारसौ,"
+        """
+        start = len(chunk) - len(chunk.lstrip(PUNCTUATION))
+        end = len(chunk.rstrip(PUNCTUATION))
+        # a chunk of punctuation only can be split in several ways, leave it to the grammars
+        if start >= end:
+            return True
+        if any(exception in chunk for exception in self.exceptions):
+            return True
+        # any of the surrounding punctuation may belong to a whitelisted word, e.g. "e.g."
+        for i in range(start + 1):
+            for j in range(end, len(chunk) + 1):
+                if self.is_trigger(chunk[i:j]):
+                    return True
+        return False
+
+
+def load_lexicon(package: str) -> Lexicon:
+    """
+    Returns the lexicon of a language package, built on first call
+
+    Args:
+        package: language package name, e.g. 'hi'
+    """
+    lexicon = _lexicons.get(package)
+    if lexicon is None:
+        with _lock:
+            if package not in _lexicons:
+                _lexicons[package] = Lexicon.from_package(get_package_dir(package))
+            lexicon = _lexicons[package]
+    return lexicon
@@ -0,0 +1,214 @@
+'''
+Micro batching of concurrent requests.
+
+Sentences of concurrent requests for the same language are coalesced into a single batch, which
+is processed as soon as it holds max_batch_size sentences or the oldest request waited
+max_delay seconds, whichever comes first. Every request gets back the results of its own
+sentences, in order. If a batch fails, its requests are retried one by one, so only the requests
+that fail on their own get an error. A MicroBatcher must be used from a single event loop.
+
+AsyncBatchRunner builds the async apis on top of it: it runs the batches of every event loop on
+a managed executor and bounds the number of requests in flight. Once a runner is closed, the
+batches still pending in its event loops run on the default executor of their loop.
+'''
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_DELAY = 0.005
+# requests of an event loop in flight at once, further requests wait for a free slot
+DEFAULT_MAX_CONCURRENCY = 256
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests per language into batches
+
+    Args:
+        process: coroutine function mapping a language code and list of sentences to results in the same order
+        max_batch_size: number of sentences that triggers processing a batch right away
+        max_delay: seconds the oldest request of a batch waits for more requests
+    """
+
+    def __init__(
+        self,
+        process: Callable[[str, List[str]], Awaitable[List[str]]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+    ):
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        # lang -> [(sentences, future)] waiting for the next batch
+        self._pending: Dict[str, List[Tuple[List[str], asyncio.Future]]] = {}
+        self._pending_sentences: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # batches being processed, referenced so they are not garbage collected
+        self._running = set()
+
+    async def submit(self, lang: str, text_list: List[str]) -> List[str]:
+        """
+        Adds sentences to the next batch of a language and waits for their results
+
+        Args:
+            lang: language code
+            text_list: list of sentences
+
+        Returns: results of the sentences, in order
+        """
+        if not text_list:
+            return []
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(lang, []).append((list(text_list), future))
+        self._pending_sentences[lang] = self._pending_sentences.get(lang, 0) + len(text_list)
+
+        if self._pending_sentences[lang] >= self.max_batch_size:
+            self._flush(lang)
+        elif lang not in self._timers:
+            self._timers[lang] = loop.call_later(self.max_delay, self._flush, lang)
+        return await future
+
+    def _flush(self, lang: str):
+        timer = self._timers.pop(lang, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(lang, [])
+        self._pending_sentences.pop(lang, None)
+        if requests:
+            task = asyncio.ensure_future(self._run(lang, requests))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _process_checked(self, lang: str, text_list: List[str]) -> List[str]:
+        results = await self.process(lang, text_list)
+        if len(results) != len(text_list):
+            raise ValueError(f"Expected {len(text_list)} results, got {len(results)}")
+        return results
+
+    async def _run(self, lang: str, requests: List[Tuple[List[str], asyncio.Future]]):
+        text_list = [text for texts, _ in requests for text in texts]
+        try:
+            results = await self._process_checked(lang, text_list)
+        except Exception as e:
+            if len(requests) == 1:
+                _, future = requests[0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # requests are retried one by one, so only the ones that fail on their own get the error
+            for texts, future in requests:
+                if future.done():
+                    continue
+                try:
+                    request_results = await self._process_checked(lang, texts)
+                except Exception as request_error:
+                    if not future.done():
+                        future.set_exception(request_error)
+                else:
+                    if not future.done():
+                        future.set_result(request_results)
+            return
+
+        start = 0
+        for texts, future in requests:
+            # the awaiting request may have been cancelled
+            if not future.done():
+                future.set_result(results[start:start + len(texts)])
+            start += len(texts)
+
+    async def drain(self):
+        """
+        Processes the pending requests right away and waits for all batches to finish
+        """
+        for lang in list(self._pending):
+            self._flush(lang)
+        while self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+
+class AsyncBatchRunner:
+    """
+    Runs a blocking batch function for asyncio callers: concurrent calls are coalesced into micro batches,
+    which run on a managed thread pool, so the event loop is never blocked
+
+    Args:
+        process: blocking function mapping a language code and list of sentences to results in the same order
+        max_concurrency: calls of an event loop in flight at once, further calls wait for a free slot
+        max_batch_size: number of sentences that triggers processing a batch right away
+        max_delay: seconds the oldest call of a batch waits for more calls
+        executor_workers: threads of the executor running the batches
+    """
+
+    def __init__(
+        self,
+        process: Callable[[str, List[str]], List[str]],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        executor_workers: int = 1,
+    ):
+        self.process = process
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.executor_workers = executor_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        # event loop -> (MicroBatcher, Semaphore), dropped with the loop
+        self._loops = weakref.WeakKeyDictionary()
+
+    def _get_executor(self) -> Optional[ThreadPoolExecutor]:
+        # None runs on the default executor of the event loop, which the loop shuts down itself
+        with self._lock:
+            if self._executor is None and not self._closed:
+                self._executor = ThreadPoolExecutor(max_workers=self.executor_workers)
+            return self._executor
+
+    async def _process(self, lang: str, text_list: List[str]) -> List[str]:
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), self.process, lang, text_list)
+
+    def _for_loop(self) -> Tuple[MicroBatcher, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            batcher = MicroBatcher(self._process, max_batch_size=self.max_batch_size, max_delay=self.max_delay)
+            state = self._loops[loop] = (batcher, asyncio.Semaphore(self.max_concurrency))
+        return state
+
+    async def run(self, lang: str, text_list: List[str]) -> List[str]:
+        """
+        Processes sentences together with the concurrent calls for the same language
+
+        Args:
+            lang: language code
+            text_list: list of sentences
+
+        Returns: results of the sentences, in order
+        """
+        batcher, semaphore = self._for_loop()
+        async with semaphore:
+            return await batcher.submit(lang, text_list)
+
+    def shutdown(self):
+        """
+        Waits for the running batches and stops the executor, it is restarted by the next call
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def close(self):
+        """
+        Waits for the running batches and stops the executor for good, batches still pending in the
+        event loops run on the default executor of their loop
+        """
+        with self._lock:
+            self._closed = True
+        self.shutdown()
@@ -49,17 +49,21 @@ class TimeFst(GraphFst):
         e.g. twelve thirty -> time { hours: "12" minutes: "30" }
         e.g. twelve past one -> time { minutes: "12" hours: "1" }
         e.g. two o clock a m -> time { hours: "2" suffix: "a.m." }
+
+    cardinal: Cardinal GraphFst, a new one is built if None
     """
 
-    def __init__(self):
+    def __init__(self, cardinal: GraphFst = None):
         super().__init__(name="time", kind="classify")
         # hours, minutes, seconds, suffix, zone, style, speak_period
 
         suffix_graph = pynini.string_file(get_abs_path(lang_data_path+"time_suffix.tsv"))
         time_zone_graph = pynini.invert(pynini.string_file(get_abs_path(lang_data_path+"time_zone.tsv")))
 
+        if cardinal is None:
+            cardinal = CardinalFst()
         # only used for < 1000 thousand -> 0 weight
-        cardinal = pynutil.add_weight(CardinalFst().graph_no_exception, weight=-0.7)
+        cardinal = pynutil.add_weight(cardinal.graph_no_exception, weight=-0.7)
 
         labels_hour = [num_to_word(x) for x in range(0, 24)]
         labels_minute_single = [num_to_word(x) for x in range(1, 10)]
@@ -0,0 +1,150 @@
+'''
+Process pool for inverse text normalization.
+
+pynini composition holds the GIL, so a single process only uses one core. The pool is forked
+after the grammars of the requested languages are built: workers share the compiled fsts with
+the parent copy-on-write instead of building them again.
+'''
+
+import atexit
+import multiprocessing
+import threading
+import warnings
+from typing import Callable, Iterable, List, Optional
+
+from inverse_text_normalization.registry import get_package, preload
+
+DEFAULT_CHUNK_SIZE = 64
+
+_pool = None
+_pool_workers = 0
+_pool_langs = []
+# pool -> number of map_sentences calls running on it, a replaced pool is terminated by its last one
+_pool_users = {}
+_lock = threading.Lock()
+
+
+def fork_available() -> bool:
+    """
+    Returns true if worker processes can be forked on this platform
+    """
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def _normalize_chunk(task):
+    normalize, chunk, lang = task
+    return normalize(chunk, lang)
+
+
+def start_workers(langs: Iterable[str], workers: int):
+    """
+    Builds the grammars of the given languages and forks a pool of warm workers.
+    A running pool is reused if it has as many workers and already serves the languages.
+
+    Args:
+        langs: language codes the workers serve
+        workers: number of worker processes
+
+    Returns: multiprocessing pool
+    """
+    with _lock:
+        return _start_workers(list(langs), workers)
+
+
+def _start_workers(langs: List[str], workers: int):
+    global _pool, _pool_workers, _pool_langs
+
+    served_packages = {get_package(lang) for lang in _pool_langs}
+    if (
+        _pool is not None
+        and _pool_workers == workers
+        and all(get_package(lang) in served_packages for lang in langs)
+    ):
+        return _pool
+
+    # also keep serving the languages of the pool being replaced
+    langs = _pool_langs + [lang for lang in langs if lang not in _pool_langs]
+    _shutdown()
+    preload(langs)
+    _pool = multiprocessing.get_context('fork').Pool(processes=workers)
+    _pool_workers = workers
+    _pool_langs = langs
+    return _pool
+
+
+def _shutdown():
+    global _pool, _pool_workers, _pool_langs
+
+    # a pool still mapping sentences is left to its last user, see _release
+    if _pool is not None and not _pool_users.get(_pool):
+        _pool.terminate()
+        _pool.join()
+    _pool = None
+    _pool_workers = 0
+    _pool_langs = []
+
+
+def _acquire(lang: str, workers: int):
+    with _lock:
+        pool = _start_workers([lang], workers)
+        _pool_users[pool] = _pool_users.get(pool, 0) + 1
+        return pool
+
+
+def _release(pool):
+    with _lock:
+        _pool_users[pool] -= 1
+        if _pool_users[pool] == 0:
+            del _pool_users[pool]
+            if pool is not _pool:
+                pool.terminate()
+                pool.join()
+
+
+def shutdown_workers():
+    """
+    Terminates the worker pool, if any, once no sentences are mapped on it any more
+    """
+    with _lock:
+        _shutdown()
+
+
+atexit.register(shutdown_workers)
+
+
+def map_sentences(
+    normalize: Callable[[List[str], str], List[str]],
+    text_list: List[str],
+    lang: str,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> List[str]:
+    """
+    Normalizes sentences in chunks on the worker pool and returns the results in input order.
+    Runs in the calling process for a single worker, a single chunk or if fork is unavailable.
+
+    Args:
+        normalize: module level function mapping a list of sentences and language code to normalized sentences
+        text_list: list of sentences
+        lang: language code
+        workers: number of worker processes
+        chunk_size: number of sentences sent to a worker at once
+
+    Returns: list of normalized sentences
+    """
+    if not workers or workers <= 1 or len(text_list) <= chunk_size:
+        return normalize(text_list, lang)
+    if not fork_available():
+        warnings.warn("Forking worker processes is not supported on this platform, normalizing in a single process")
+        return normalize(text_list, lang)
+
+    # concurrent calls may replace the pool, it is only terminated once this map is done
+    pool = _acquire(lang, workers)
+    try:
+        tasks = [(normalize, text_list[i:i + chunk_size], lang) for i in range(0, len(text_list), chunk_size)]
+        results = []
+        for chunk_result in pool.map(_normalize_chunk, tasks):
+            results.extend(chunk_result)
+    finally:
+        _release(pool)
+    return results
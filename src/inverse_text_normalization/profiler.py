@@ -0,0 +1,278 @@
+'''
+Startup profiler of the grammars.
+
+Every GraphFst subclass (CardinalFst, MoneyFst, DateFst, ... of the taggers and verbalizers of
+every language) is instrumented by `GraphFst.__init_subclass__`. While profiling, each grammar
+built or loaded from a FAR archive records:
+    - seconds: wall time of its constructor, including the grammars it builds
+    - self_seconds: the same without the grammars it builds
+    - num_states, num_arcs: size of its fst
+    - rss_bytes: growth of the resident memory of the process during its constructor, including
+      the grammars it builds; approximate, memory freed by python or openfst may be reused
+
+Outside of `profiling()` the instrumentation only costs a check per grammar.
+
+Usage:
+    python -m inverse_text_normalization.profiler --langs hi en [--rebuild] [--json report.json] [--compare old.json]
+
+--rebuild ignores exported FAR archives, so the compilation of every sub grammar is measured.
+--compare lists the grammars whose size changed or which got slower than in an earlier report,
+e.g. after editing a data file.
+'''
+
+import functools
+import json
+import os
+import time
+from argparse import ArgumentParser
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from inverse_text_normalization.grammar_cache import build_final_grammars, get_package_dir, ignore_exported
+from inverse_text_normalization.registry import LANGUAGE_PACKAGES, get_package
+
+# relative slowdown of a grammar reported by --compare
+DEFAULT_TOLERANCE = 0.2
+
+GrammarProfile = namedtuple(
+    'GrammarProfile', 'package kind grammar name depth seconds self_seconds num_states num_arcs rss_bytes loaded'
+)
+
+# profiles of the current profiling() block, None while not profiling
+_profiles = None
+# [grammar, seconds of the grammars it built] of the constructors running
+_stack = []
+
+
+def _rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # peak instead of current resident memory where /proc is not available
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _fst_size(fst) -> Tuple[int, int]:
+    if fst is None:
+        return 0, 0
+    return fst.num_states(), sum(fst.num_arcs(state) for state in fst.states())
+
+
+def instrument(cls):
+    """
+    Wraps the constructor of a GraphFst subclass to record its profile while profiling
+
+    Args:
+        cls: GraphFst subclass
+    """
+    init = cls.__dict__.get('__init__')
+    if init is None:
+        return
+
+    @functools.wraps(init)
+    def profiled_init(self, *args, **kwargs):
+        # not profiling, or the constructor of a parent class of a profiled grammar
+        if _profiles is None or (_stack and _stack[-1][0] is self):
+            return init(self, *args, **kwargs)
+
+        profiles = _profiles
+        index = len(profiles)
+        # reserve the slot, so grammars are listed in the order they were started
+        profiles.append(None)
+        frame = [self, 0.0]
+        _stack.append(frame)
+        rss = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            init(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _stack.pop()
+        rss_bytes = _rss_bytes() - rss
+
+        module = type(self).__module__.split('.')
+        num_states, num_arcs = _fst_size(self.fst)
+        profiles[index] = GrammarProfile(
+            package=module[1] if len(module) > 1 else '',
+            kind=module[2] if len(module) > 2 else '',
+            grammar=type(self).__name__,
+            name=self.name,
+            depth=len(_stack),
+            seconds=seconds,
+            self_seconds=seconds - frame[1],
+            num_states=num_states,
+            num_arcs=num_arcs,
+            rss_bytes=rss_bytes,
+            loaded=self.far_exist(),
+        )
+        if _stack:
+            # counting the arcs is not part of the own time of the grammar building this one
+            _stack[-1][1] += time.perf_counter() - start
+
+    cls.__init__ = profiled_init
+
+
+@contextmanager
+def profiling() -> Iterator[List[GrammarProfile]]:
+    """
+    Records the profile of every grammar built inside the block, in the order they were started.
+    Grammars must be built by a single thread while profiling.
+
+    Returns: list of GrammarProfile, filled when the block exits
+    """
+    global _profiles
+
+    profiles = []
+    _profiles = profiles
+    try:
+        yield profiles
+    finally:
+        _profiles = None
+        _stack.clear()
+        # slots of grammars whose constructor raised
+        profiles[:] = [profile for profile in profiles if profile is not None]
+
+
+def profile_package(package: str, rebuild: bool = False) -> Dict:
+    """
+    Builds the final taggers and verbalizer of a language package and profiles every grammar
+
+    Args:
+        package: language package name, e.g. 'hi'
+        rebuild: ignore exported FAR archives and compile every grammar
+
+    Returns: report of the package, json serializable
+    """
+    rss = _rss_bytes()
+    start = time.perf_counter()
+    with profiling() as profiles:
+        if rebuild:
+            with ignore_exported(get_package_dir(package)):
+                build_final_grammars(package)
+        else:
+            build_final_grammars(package)
+    return {
+        'package': package,
+        'seconds': time.perf_counter() - start,
+        'rss_bytes': _rss_bytes() - rss,
+        'grammars': [profile._asdict() for profile in profiles],
+    }
+
+
+def _keys(grammars: List[Dict]) -> List[str]:
+    # the same grammar class may be built several times, e.g. by different classifiers
+    keys = []
+    seen = {}
+    for grammar in grammars:
+        key = f"{grammar['kind']}.{grammar['grammar']}"
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+def compare_reports(old: Dict, new: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Lists the grammars of a package whose size changed or which got slower between two reports
+
+    Args:
+        old: earlier report of profile_package
+        new: current report of the same package
+        tolerance: relative slowdown of the own time of a grammar which is still accepted
+
+    Returns: list of human readable differences
+    """
+    old_grammars = dict(zip(_keys(old['grammars']), old['grammars']))
+    differences = []
+    for key, grammar in zip(_keys(new['grammars']), new['grammars']):
+        previous = old_grammars.pop(key, None)
+        if previous is None:
+            differences.append(f"{new['package']} {key}: new grammar")
+            continue
+        for field in ('num_states', 'num_arcs'):
+            if grammar[field] != previous[field]:
+                differences.append(f"{new['package']} {key}: {field} {previous[field]} -> {grammar[field]}")
+        if grammar['self_seconds'] > previous['self_seconds'] * (1 + tolerance):
+            differences.append(
+                f"{new['package']} {key}: self seconds {previous['self_seconds']:.2f} -> {grammar['self_seconds']:.2f}"
+            )
+    differences.extend(f"{new['package']} {key}: grammar removed" for key in old_grammars)
+    return differences
+
+
+def format_report(report: Dict) -> str:
+    """
+    Formats the report of a package as a table, sub grammars indented below the grammar building them
+    """
+    lines = [
+        f"{report['package']}: {report['seconds']:.2f}s, {report['rss_bytes'] / 2 ** 20:.1f} MB",
+        f"{'grammar':<40}{'seconds':>9}{'self':>9}{'states':>10}{'arcs':>11}{'MB':>8}  far",
+    ]
+    for grammar in report['grammars']:
+        label = '  ' * grammar['depth'] + f"{grammar['kind']}.{grammar['grammar']}"
+        lines.append(
+            f"{label:<40}{grammar['seconds']:>9.2f}{grammar['self_seconds']:>9.2f}{grammar['num_states']:>10}"
+            f"{grammar['num_arcs']:>11}{grammar['rss_bytes'] / 2 ** 20:>8.1f}  {'yes' if grammar['loaded'] else ''}"
+        )
+    return '\n'.join(lines)
+
+
+def run_profiler(
+    langs: Optional[Iterable[str]] = None,
+    rebuild: bool = False,
+    json_path: Optional[str] = None,
+    compare_path: Optional[str] = None,
+) -> Dict[str, Dict]:
+    """
+    Profiles the grammars of the given languages and prints a table per language
+
+    Args:
+        langs: language codes, all languages if None
+        rebuild: ignore exported FAR archives and compile every grammar
+        json_path: file the reports are written to
+        compare_path: reports of an earlier run to compare with
+
+    Returns: dictionary of package -> report
+    """
+    langs = LANGUAGE_PACKAGES if langs is None else langs
+    # languages sharing a package, e.g. en and en_bio, share their grammars
+    packages = list(dict.fromkeys(get_package(lang) for lang in langs))
+
+    reports = {}
+    for package in packages:
+        reports[package] = profile_package(package, rebuild=rebuild)
+        print(format_report(reports[package]) + '\n')
+
+    if json_path is not None:
+        with open(json_path, 'w') as fp:
+            json.dump(reports, fp, indent=2, ensure_ascii=False)
+
+    if compare_path is not None:
+        with open(compare_path, 'r') as fp:
+            old_reports = json.load(fp)
+        differences = []
+        for package, report in reports.items():
+            if package in old_reports:
+                differences.extend(compare_reports(old_reports[package], report))
+        print('\n'.join(differences) if differences else "no differences")
+    return reports
+
+
+def parse_args():
+    parser = ArgumentParser(description="Profiles build time and size of the inverse text normalization grammars")
+    parser.add_argument("--langs", help="language codes, default all", nargs='+', required=False, type=str)
+    parser.add_argument("--rebuild", help="ignore exported FAR archives", action='store_true')
+    parser.add_argument("--json", help="write the reports to this file", required=False, type=str)
+    parser.add_argument("--compare", help="report of an earlier run to compare with", required=False, type=str)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # the grammars report to the imported module, not to __main__
+    from inverse_text_normalization import profiler
+
+    args = parse_args()
+    profiler.run_profiler(args.langs, rebuild=args.rebuild, json_path=args.json, compare_path=args.compare)
@@ -0,0 +1,97 @@
+'''
+Registry of the languages supported by inverse text normalization.
+
+Every language package builds its tagger and verbalizer grammars when its
+`run_predict` module is imported, so the packages are only imported on first
+use of a language (or explicitly through `preload`).
+'''
+
+import importlib
+import threading
+from typing import Iterable, List, Optional
+
+# language code used by the public api -> package under inverse_text_normalization
+LANGUAGE_PACKAGES = {
+    'hi': 'hi',
+    'en': 'en',
+    'en_bio': 'en',
+    'gu': 'gu',
+    'te': 'te',
+    'mr': 'mr',
+    'pa': 'pa',
+    'ta': 'ta',
+    'bn': 'bn',
+    'ml': 'ml',
+    'or': 'ori',
+    'as': 'asm',
+    'kn': 'kn',
+}
+
+_loaded_modules = {}
+_lock = threading.RLock()
+
+
+def get_package(lang: str) -> str:
+    """
+    Returns the package name implementing the given language
+
+    Args:
+        lang: language code, e.g. 'hi'
+
+    Returns: package name, e.g. 'ori' for 'or'
+    """
+    try:
+        return LANGUAGE_PACKAGES[lang]
+    except KeyError:
+        raise ValueError(f"Unsupported language '{lang}'. Supported languages: {sorted(LANGUAGE_PACKAGES)}")
+
+
+def load_language(lang: str):
+    """
+    Returns the `run_predict` module of the given language, building its grammars on first call
+
+    Args:
+        lang: language code
+
+    Returns: `inverse_text_normalization.<package>.run_predict` module
+    """
+    package = get_package(lang)
+    module = _loaded_modules.get(package)
+    if module is not None:
+        return module
+    with _lock:
+        # another thread may have finished the import while we were waiting
+        if package not in _loaded_modules:
+            _loaded_modules[package] = importlib.import_module(f'inverse_text_normalization.{package}.run_predict')
+        return _loaded_modules[package]
+
+
+def preload(langs: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Builds the grammars of the given languages ahead of the first request, e.g. for worker warm-up
+
+    Args:
+        langs: language codes, all supported languages if None
+
+    Returns: list of loaded language codes
+    """
+    if langs is None:
+        langs = list(LANGUAGE_PACKAGES)
+    langs = list(langs)
+    for lang in langs:
+        load_language(lang)
+    return langs
+
+
+def is_loaded(lang: str) -> bool:
+    """
+    Returns true if the grammars of the given language are already built
+    """
+    return get_package(lang) in _loaded_modules
+
+
+def loaded_languages() -> List[str]:
+    """
+    Returns language codes whose grammars are built
+    """
+    return [lang for lang, package in LANGUAGE_PACKAGES.items() if package in _loaded_modules]
@@ -0,0 +1,294 @@
+'''
+Result cache for inverse text normalization.
+
+Voice bot traffic repeats the same utterances ("दो सौ रुपये", "एक लाख", menu options) over and
+over. When enabled, the output of the grammars for every span of a sentence (see spans.py) is
+cached per language, keyed by the span with its whitespace collapsed, so repeated utterances and
+repeated numbers inside different utterances skip the fsts.
+
+Two backends are available:
+    - in memory (default): a bounded LRU cache per language and process
+    - on disk: a bounded sqlite database, shared by all processes using the same path, e.g. the
+      workers of parallel.py
+
+Entries are stored with the grammar hash of their language (see grammar_cache.py) and dropped
+when the data files or grammars of the language change.
+
+Usage:
+    enable_cache(maxsize=100000)                           # in memory
+    enable_cache(maxsize=100000, path='/dev/shm/itn.db')   # shared by all workers
+    cache_stats('hi')
+'''
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Optional
+
+from inverse_text_normalization.grammar_cache import compute_cache_key, get_package_dir
+from inverse_text_normalization.registry import get_package
+
+DEFAULT_MAXSIZE = 100000
+# the disk backend trims itself back to maxsize after this many insertions
+DISK_EVICTION_INTERVAL = 100
+# the disk backend writes the last use of the entries it returned after this many hits, or with the next insertion
+DISK_RECENCY_INTERVAL = 100
+
+CacheStats = namedtuple('CacheStats', 'hits misses evictions size')
+
+
+class LRUCache:
+    """
+    Bounded in memory cache evicting the least recently used entry
+
+    Args:
+        maxsize: maximum number of entries
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> CacheStats:
+        return CacheStats(hits=self.hits, misses=self.misses, evictions=self.evictions, size=len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache:
+    """
+    Bounded sqlite cache evicting the least recently used entries, shared by all processes opening the same path.
+    Hit, miss and eviction counters are kept per process. Hits do not write to the database, their recency is
+    buffered until the next insertion, DISK_RECENCY_INTERVAL hits or close().
+
+    Args:
+        path: database file
+        package: language package the entries belong to
+        grammar_key: hash of the grammars of the package, entries of other grammars are dropped
+        maxsize: maximum number of entries of the package, exceeded by at most DISK_EVICTION_INTERVAL
+    """
+
+    def __init__(self, path: str, package: str, grammar_key: str, maxsize: int = DEFAULT_MAXSIZE):
+        self.path = path
+        self.package = package
+        self.grammar_key = grammar_key
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._insertions = 0
+        # key -> time of its last hit, not written yet
+        self._used = {}
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "DELETE FROM results WHERE package = ? AND grammar != ?", (self.package, self.grammar_key)
+            )
+            connection.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite connections must not be used across fork, every worker opens its own
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "package TEXT, text TEXT, grammar TEXT, output TEXT, used REAL, PRIMARY KEY (package, text))"
+            )
+            self._pid = os.getpid()
+            # hits of the parent process are written by the parent
+            self._used = {}
+        return self._connection
+
+    def _flush_used(self, connection: sqlite3.Connection):
+        if self._used:
+            connection.executemany(
+                "UPDATE results SET used = ? WHERE package = ? AND text = ?",
+                [(used, self.package, key) for key, used in self._used.items()],
+            )
+            self._used = {}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT output FROM results WHERE package = ? AND text = ? AND grammar = ?",
+                (self.package, key, self.grammar_key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._used[key] = time.time()
+            if len(self._used) >= DISK_RECENCY_INTERVAL:
+                self._flush_used(connection)
+                connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            connection = self._connect()
+            # evictions must see the recent hits
+            self._flush_used(connection)
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (self.package, key, self.grammar_key, value, time.time()),
+            )
+            self._insertions += 1
+            if self._insertions % DISK_EVICTION_INTERVAL == 0:
+                cursor = connection.execute(
+                    "DELETE FROM results WHERE package = ? AND text IN ("
+                    "SELECT text FROM results WHERE package = ? ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.package, self.package, self.maxsize),
+                )
+                self.evictions += max(cursor.rowcount, 0)
+            connection.commit()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            (size,) = self._connect().execute(
+                "SELECT COUNT(*) FROM results WHERE package = ?", (self.package,)
+            ).fetchone()
+        return CacheStats(hits=self.hits, misses=self.misses, evictions=self.evictions, size=size)
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            self._used = {}
+            connection.execute("DELETE FROM results WHERE package = ?", (self.package,))
+            connection.commit()
+
+    def close(self):
+        """
+        Writes the buffered recency of the hits and closes the connection of this process
+        """
+        with self._lock:
+            if self._connection is None or self._pid != os.getpid():
+                return
+            self._flush_used(self._connection)
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+
+
+# (maxsize, path) of enable_cache, None while caching is disabled
+_settings = None
+# package -> cache
+_caches = {}
+_lock = threading.Lock()
+
+
+def _close_disk_caches():
+    # caller holds _lock
+    for cache in _caches.values():
+        if isinstance(cache, DiskCache):
+            cache.close()
+
+
+def enable_cache(maxsize: int = DEFAULT_MAXSIZE, path: Optional[str] = None):
+    """
+    Caches the output of the grammars of every language
+
+    Args:
+        maxsize: maximum number of cached spans per language
+        path: sqlite database shared by processes, in memory cache per process if None
+    """
+    global _settings
+
+    with _lock:
+        _settings = (maxsize, path)
+        _close_disk_caches()
+        _caches.clear()
+
+
+def disable_cache():
+    """
+    Stops caching and drops the in memory caches, a database file is kept
+    """
+    global _settings
+
+    with _lock:
+        _settings = None
+        _close_disk_caches()
+        _caches.clear()
+
+
+def close_caches():
+    """
+    Writes the buffered recency of the disk caches, called at exit
+    """
+    with _lock:
+        _close_disk_caches()
+
+
+atexit.register(close_caches)
+
+
+def get_cache(package: str):
+    """
+    Returns the result cache of a language package, None if caching is disabled
+
+    Args:
+        package: language package name, e.g. 'hi'
+
+    Returns: LRUCache or DiskCache
+    """
+    settings = _settings
+    if settings is None:
+        return None
+    cache = _caches.get(package)
+    if cache is None:
+        with _lock:
+            if package not in _caches:
+                maxsize, path = settings
+                if path is None:
+                    _caches[package] = LRUCache(maxsize)
+                else:
+                    grammar_key = compute_cache_key(get_package_dir(package))
+                    _caches[package] = DiskCache(path, package, grammar_key, maxsize)
+            cache = _caches[package]
+    return cache
+
+
+def cache_stats(lang: str) -> Optional[CacheStats]:
+    """
+    Returns hit, miss and eviction counters of this process and size of the cache of a language
+
+    Args:
+        lang: language code
+
+    Returns: CacheStats, None if caching is disabled
+    """
+    cache = get_cache(get_package(lang))
+    return None if cache is None else cache.stats()
@@ -1,15 +1,30 @@
-from inverse_text_normalization.hi.run_predict import inverse_normalize_text as hi_itn
-from inverse_text_normalization.en.run_predict import inverse_normalize_text as en_itn
-from inverse_text_normalization.gu.run_predict import inverse_normalize_text as gu_itn
-from inverse_text_normalization.te.run_predict import inverse_normalize_text as te_itn
-from inverse_text_normalization.mr.run_predict import inverse_normalize_text as mr_itn
-from inverse_text_normalization.pa.run_predict import inverse_normalize_text as pa_itn
-from inverse_text_normalization.ta.run_predict import inverse_normalize_text as ta_itn
-from inverse_text_normalization.bn.run_predict import inverse_normalize_text as bn_itn
-from inverse_text_normalization.ml.run_predict import inverse_normalize_text as ml_itn
-from inverse_text_normalization.ori.run_predict import inverse_normalize_text as or_itn
-from inverse_text_normalization.asm.run_predict import inverse_normalize_text as as_itn
-from inverse_text_normalization.kn.run_predict import inverse_normalize_text as kn_itn
+import sys
+import time
+from argparse import ArgumentParser
+from functools import partial
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from inverse_text_normalization.batch import BatchReport, run_batch, sentences_per_second
+from inverse_text_normalization.field_order import permutation_fallbacks, set_permutation_fallback
+from inverse_text_normalization.micro_batch import (
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_DELAY,
+    AsyncBatchRunner,
+)
+from inverse_text_normalization.parallel import DEFAULT_CHUNK_SIZE, map_sentences, shutdown_workers, start_workers
+from inverse_text_normalization.registry import get_package, load_language, preload
+from inverse_text_normalization.result_cache import cache_stats, disable_cache, enable_cache
+from inverse_text_normalization.stream import (
+    DEFAULT_BATCH_SIZE,
+    STD_STREAM,
+    StreamReport,
+    add_batch,
+    micro_batches,
+    open_text,
+    read_lines,
+    write_lines,
+)
 
 def format_numbers_with_commas(sent, lang):
     words = []
@@ -44,13 +59,12 @@ def format_numbers_with_commas(sent, lang):
     return ' '.join(words)
 
 
-def inverse_normalize_text(text_list, lang):
-    if lang == 'hi':
-        itn_results = hi_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang=lang) for sent in itn_results]
-        return itn_results_formatted
-    elif lang in ['en', 'en_bio']:
-        itn_results = en_itn(text_list)
+def _inverse_normalize_sentences(text_list, lang):
+    """
+    Runs the grammars of the given language on each sentence and formats numbers in the output
+    """
+    itn_results = load_language(lang).inverse_normalize_text(text_list)
+    if lang in ['en', 'en_bio']:
         keywords_for_en_format = ["million", "billion", "trillion", "quadrillion", "quintillion", "sextillion"]
         itn_results_formatted = []
         for orig_sent, itn_sent in zip(text_list, itn_results):
@@ -62,62 +76,199 @@ def inverse_normalize_text(text_list, lang):
             itn_results_formatted.append(format_numbers_with_commas(sent=itn_sent, lang=lang_format))
 
         return itn_results_formatted
-    elif lang == 'gu':
-        itn_results = gu_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
 
-    elif lang == 'te':
+    itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
+    return itn_results_formatted
 
-        itn_results = te_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
 
-    elif lang == 'mr':
+def inverse_normalize_text(text_list, lang, return_report=False, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Converts spoken forms in the given sentences to written forms.
+    Grammars of a language are built on the first call for that language, see `preload`.
+    Identical sentences are normalized once and blank sentences are returned as empty strings.
 
-        itn_results = mr_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
+    Args:
+        text_list: list of sentences
+        lang: language code, e.g. 'hi', 'en', 'or'
+        return_report: if true, also return a `BatchReport` with counts and timing of the batch
+        workers: if more than 1, normalize on a pool of this many processes forked after the grammars are built,
+            see `start_workers`
+        chunk_size: number of sentences sent to a worker process at once
 
-    elif lang == 'pa':
+    Returns: list of normalized sentences, (list of normalized sentences, BatchReport) if return_report
+    """
+    load_language(lang)
+    normalize = partial(map_sentences, _inverse_normalize_sentences, workers=workers, chunk_size=chunk_size)
+    itn_results, report = run_batch(text_list, lang, normalize)
+    if return_report:
+        return itn_results, report
+    return itn_results
 
-        itn_results = pa_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
 
-    elif lang == 'ta':
+def _inverse_normalize_batch(lang: str, text_list: List[str]) -> List[str]:
+    return inverse_normalize_text(text_list, lang, workers=_async_workers)
 
-        itn_results = ta_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
 
-    elif lang == 'bn':
+_async_workers = None
+_async_runner = AsyncBatchRunner(_inverse_normalize_batch)
 
-        itn_results = bn_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
 
-    elif lang == 'ml':
+def configure_async(
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_delay: float = DEFAULT_MAX_DELAY,
+    workers: Optional[int] = None,
+):
+    """
+    Configures `ainverse_normalize_text`, waiting for the running batches of the previous configuration to finish.
+    Calls still pending in a batch of the previous configuration are normalized on the default executor of
+    their event loop. Must not be called from a running event loop, which it would block.
 
-        itn_results = ml_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
+    Args:
+        max_concurrency: calls of an event loop in flight at once, further calls wait for a free slot
+        max_batch_size: number of sentences that triggers normalizing a batch right away
+        max_delay: seconds the oldest call of a batch waits for concurrent calls to join it
+        workers: number of worker processes normalizing each batch, see `inverse_normalize_text`
+    """
+    global _async_runner, _async_workers
 
-    elif lang == 'or':
+    _async_runner.close()
+    _async_workers = workers
+    _async_runner = AsyncBatchRunner(
+        _inverse_normalize_batch, max_concurrency=max_concurrency, max_batch_size=max_batch_size, max_delay=max_delay
+    )
 
-        itn_results = or_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
 
-    elif lang == 'as':
+def shutdown_async():
+    """
+    Waits for the running batches of `ainverse_normalize_text` and stops its executor thread
+    """
+    _async_runner.shutdown()
 
-        itn_results = as_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
 
-    
-    elif lang == 'kn':
+async def ainverse_normalize_text(text_list: List[str], lang: str) -> List[str]:
+    """
+    Async counterpart of `inverse_normalize_text`. Sentences of concurrent calls for the same language are
+    normalized together in micro batches on an executor thread, so the event loop is not blocked, see
+    `configure_async`.
 
-        itn_results = kn_itn(text_list)
-        itn_results_formatted = [format_numbers_with_commas(sent=sent, lang='hi') for sent in itn_results]
-        return itn_results_formatted
+    Args:
+        text_list: list of sentences
+        lang: language code
+
+    Returns: list of normalized sentences
+    """
+    get_package(lang)
+    return await _async_runner.run(lang, list(text_list))
+
+
+def _normalize_batches(
+    lines: Iterable[str], lang: str, batch_size: int, workers: Optional[int], chunk_size: int
+) -> Iterator[Tuple[List[str], BatchReport]]:
+    load_language(lang)
+    for batch in micro_batches(lines, batch_size):
+        yield inverse_normalize_text(batch, lang, return_report=True, workers=workers, chunk_size=chunk_size)
+
+
+def inverse_normalize_stream(
+    lines: Iterable[str],
+    lang: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Lazily converts spoken forms in a stream of sentences to written forms, batch_size sentences at a time,
+    so memory does not grow with the length of the stream
+
+    Args:
+        lines: iterable of sentences, e.g. a file object
+        lang: language code
+        batch_size: number of sentences normalized at once
+        workers: number of worker processes, see `inverse_normalize_text`
+        chunk_size: number of sentences sent to a worker process at once
+
+    Returns: normalized sentences in input order
+    """
+    for results, _ in _normalize_batches(lines, lang, batch_size, workers, chunk_size):
+        yield from results
+
+
+def inverse_normalize_file(
+    input_path: str,
+    output_path: str,
+    lang: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    compress_input: Optional[bool] = None,
+    compress_output: Optional[bool] = None,
+    progress: Optional[Callable[[StreamReport], None]] = None,
+) -> StreamReport:
+    """
+    Normalizes a file line by line, writing the output of every batch before reading the next one
+
+    Args:
+        input_path: input file, '-' for stdin
+        output_path: output file, '-' for stdout
+        lang: language code
+        batch_size: number of lines normalized at once, with workers at least workers * chunk_size keeps them busy
+        workers: number of worker processes, see `inverse_normalize_text`
+        chunk_size: number of sentences sent to a worker process at once
+        compress_input: read gzip, by default if input_path ends with .gz
+        compress_output: write gzip, by default if output_path ends with .gz
+        progress: called with the report of the stream so far after every batch
+
+    Returns: StreamReport
+    """
+    start = time.perf_counter()
+    report = StreamReport(lang=lang, sentences=0, batches=0, unique=0, skipped=0, seconds=0.0)
+    with open_text(input_path, 'r', compress_input) as fin, open_text(output_path, 'w', compress_output) as fout:
+        for results, batch_report in _normalize_batches(read_lines(fin), lang, batch_size, workers, chunk_size):
+            write_lines(fout, results)
+            report = add_batch(report, batch_report, time.perf_counter() - start)
+            if progress is not None:
+                progress(report)
+    return report._replace(seconds=time.perf_counter() - start)
+
+
+def _print_progress(report: StreamReport):
+    print(
+        f"{report.lang}: {report.sentences} sentences, {sentences_per_second(report):.1f} sentences/s",
+        file=sys.stderr,
+    )
+
+
+def parse_args():
+    parser = ArgumentParser(description="Streams sentences from a file or stdin through inverse text normalization")
+    parser.add_argument("--lang", help="language code", required=True, type=str)
+    parser.add_argument("--input", help="input file, .gz is decompressed, stdin if omitted", default=STD_STREAM)
+    parser.add_argument("--output", help="output file, .gz is compressed, stdout if omitted", default=STD_STREAM)
+    parser.add_argument("--batch_size", help="sentences normalized at once", default=DEFAULT_BATCH_SIZE, type=int)
+    parser.add_argument("--workers", help="worker processes", required=False, type=int)
+    parser.add_argument("--chunk_size", help="sentences per worker task", default=DEFAULT_CHUNK_SIZE, type=int)
+    parser.add_argument("--gzip_input", help="input is gzip compressed", action='store_true', default=None)
+    parser.add_argument("--gzip_output", help="compress the output with gzip", action='store_true', default=None)
+    parser.add_argument("--progress", help="print throughput after every n batches", default=0, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    def progress(report: StreamReport):
+        if args.progress > 0 and report.batches % args.progress == 0:
+            _print_progress(report)
+
+    stream_report = inverse_normalize_file(
+        args.input,
+        args.output,
+        args.lang,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        compress_input=args.gzip_input,
+        compress_output=args.gzip_output,
+        progress=progress,
+    )
+    _print_progress(stream_report)
@@ -0,0 +1,433 @@
+'''
+HTTP inference server for inverse text normalization and punctuation.
+
+Endpoints:
+    POST /itn        {"lang": "hi", "text": ["दो सौ रुपये", ...]} -> {"text": ["₹ 200", ...]}
+    POST /punctuate  {"lang": "hi", "text": [...]}              -> {"text": [...]}
+    GET  /metrics    requests, errors and p50 / p99 latency per endpoint
+    GET  /health     served languages
+
+"text" may also be a single string, which returns a single string.
+
+The grammars of the served languages are built before the worker processes are forked, so the
+workers share them. Punctuation models are loaded by every worker: each worker holds all served
+models, e.g. 4 workers serving hi and ta hold 8 models. --punctuation_memory_mb bounds the weights
+each worker keeps resident, evicting its least recently used models; checkpoints converted with
+python -m punctuate.mapped_checkpoint are mapped, so workers share the pages of their weights.
+Sentences of concurrent requests for the same endpoint and language are coalesced into micro
+batches (see micro_batch.py), which run on the worker pool so the event loop only handles I/O.
+
+Usage:
+    python -m inverse_text_normalization.server --itn_langs hi en --punctuation_langs hi \
+        [--host 127.0.0.1] [--port 8080] [--workers 4] [--max_batch_size 64] [--max_delay_ms 5] \
+        [--punctuation_memory_mb 1024]
+'''
+
+import asyncio
+import json
+import math
+import multiprocessing
+import time
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from inverse_text_normalization.micro_batch import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_DELAY, MicroBatcher
+from inverse_text_normalization.parallel import fork_available
+from inverse_text_normalization.registry import get_package, preload
+from punctuate.model_store import ALBERT_LANGUAGES, ENGLISH_LANGUAGES
+
+ITN_ENDPOINT = '/itn'
+PUNCTUATE_ENDPOINT = '/punctuate'
+MAX_BODY_BYTES = 10 * 2 ** 20
+MAX_HEADER_LINES = 100
+PUNCTUATION_LANGUAGES = ENGLISH_LANGUAGES + ALBERT_LANGUAGES
+# latencies kept per endpoint for the percentiles
+DEFAULT_METRICS_WINDOW = 10000
+
+
+def _init_worker(itn_langs: List[str], punctuation_langs: List[str], punctuation_memory_budget: Optional[int] = None):
+    # grammars forked from the server are already built, preload only builds them for spawned workers
+    preload(itn_langs)
+    if punctuation_langs:
+        from punctuate.model_registry import configure_registry, get_registry
+
+        if punctuation_memory_budget is not None:
+            configure_registry(punctuation_memory_budget)
+        # models evicted under the memory budget are loaded again on their next request
+        for lang in punctuation_langs:
+            get_registry().get(lang)
+
+
+def _warm_up() -> bool:
+    return True
+
+
+def itn_task(lang: str, text_list: List[str]) -> List[str]:
+    """
+    Inverse normalizes a batch of sentences in a worker
+    """
+    from inverse_text_normalization.run_predict import inverse_normalize_text
+
+    return inverse_normalize_text(text_list, lang)
+
+
+def punctuate_task(lang: str, text_list: List[str]) -> List[str]:
+    """
+    Punctuates a batch of sentences in a worker
+    """
+    from punctuate.model_registry import get_registry
+
+    return get_registry().punctuate_text(lang, text_list)
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """
+    Returns the nearest rank q-th percentile of values, None if there are none
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    rank = max(math.ceil(q / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class LatencyMetrics:
+    """
+    Request counts and latency percentiles per endpoint, over the latest window requests
+
+    Args:
+        window: number of latencies kept per endpoint
+    """
+
+    def __init__(self, window: int = DEFAULT_METRICS_WINDOW):
+        self.window = window
+        self._latencies: Dict[str, deque] = {}
+        self._requests: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, error: bool = False):
+        self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+        self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+        if error:
+            self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        snapshot = {}
+        for endpoint, latencies in self._latencies.items():
+            p50 = percentile(latencies, 50)
+            p99 = percentile(latencies, 99)
+            snapshot[endpoint] = {
+                'requests': self._requests[endpoint],
+                'errors': self._errors.get(endpoint, 0),
+                'p50_ms': None if p50 is None else p50 * 1000,
+                'p99_ms': None if p99 is None else p99 * 1000,
+            }
+        return snapshot
+
+
+class RequestError(Exception):
+    """
+    Invalid request, answered with the given HTTP status
+    """
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class InferenceServer:
+    """
+    asyncio HTTP server for inverse text normalization and punctuation
+
+    Args:
+        itn_langs: language codes served by /itn
+        punctuation_langs: language codes served by /punctuate
+        workers: number of worker processes, 0 runs the batches on a thread of the server process
+        max_batch_size: number of sentences that triggers processing a batch right away
+        max_delay: seconds a request waits for concurrent requests to join its batch
+        punctuation_memory_budget: bytes the punctuation weights of each worker may take, default
+            PUNCTUATION_MEMORY_BUDGET_MB or unlimited; every worker loads its own copy of the models
+        tasks: endpoint -> module level function mapping a language code and sentences to results,
+            itn_task and punctuate_task by default
+        executor: executor running the tasks, a pool of `workers` processes if None
+    """
+
+    def __init__(
+        self,
+        itn_langs: Iterable[str] = (),
+        punctuation_langs: Iterable[str] = (),
+        workers: int = 1,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        punctuation_memory_budget: Optional[int] = None,
+        tasks: Optional[Dict[str, Callable[[str, List[str]], List[str]]]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.itn_langs = list(itn_langs)
+        self.punctuation_langs = list(punctuation_langs)
+        for lang in self.itn_langs:
+            get_package(lang)
+        # fail before any worker starts loading models
+        for lang in self.punctuation_langs:
+            if lang not in PUNCTUATION_LANGUAGES:
+                raise ValueError(
+                    f"Unsupported punctuation language '{lang}'. Supported languages: {PUNCTUATION_LANGUAGES}"
+                )
+        self.punctuation_memory_budget = punctuation_memory_budget
+        self.langs = {ITN_ENDPOINT: set(self.itn_langs), PUNCTUATE_ENDPOINT: set(self.punctuation_langs)}
+        self.workers = workers
+        self.tasks = {ITN_ENDPOINT: itn_task, PUNCTUATE_ENDPOINT: punctuate_task} if tasks is None else tasks
+        self.executor = executor
+        self._owns_executor = executor is None
+        self.metrics = LatencyMetrics()
+        self.batchers = {
+            endpoint: MicroBatcher(self._process_with(task), max_batch_size=max_batch_size, max_delay=max_delay)
+            for endpoint, task in self.tasks.items()
+        }
+        self._server = None
+
+    def _process_with(self, task: Callable[[str, List[str]], List[str]]):
+        async def process(lang: str, text_list: List[str]) -> List[str]:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, task, lang, text_list)
+
+        return process
+
+    def _create_executor(self) -> Executor:
+        initargs = (self.itn_langs, self.punctuation_langs, self.punctuation_memory_budget)
+        if self.workers <= 0:
+            _init_worker(*initargs)
+            return ThreadPoolExecutor(max_workers=1)
+        # built before forking, so the workers share the grammars
+        preload(self.itn_langs)
+        context = multiprocessing.get_context('fork' if fork_available() else None)
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context, initializer=_init_worker, initargs=initargs
+        )
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> Tuple[str, int]:
+        """
+        Builds the grammars, starts the worker pool and starts listening once the workers answer
+
+        Args:
+            host: interface to listen on
+            port: port to listen on, 0 picks a free port
+
+        Returns: host and port the server listens on
+        """
+        loop = asyncio.get_running_loop()
+        if self.executor is None:
+            self.executor = self._create_executor()
+            await asyncio.gather(
+                *[loop.run_in_executor(self.executor, _warm_up) for _ in range(max(self.workers, 1))]
+            )
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        """
+        Stops listening, finishes the pending batches and shuts the worker pool down
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.drain()
+        if self._owns_executor and self.executor is not None:
+            executor, self.executor = self.executor, None
+            # waiting for the workers to exit on a thread keeps the event loop serving
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.handle(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_format_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except RequestError as e:
+            writer.write(_format_response(e.status, {'error': str(e)}, keep_alive=False))
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, Dict]:
+        """
+        Answers a request
+
+        Args:
+            method: HTTP method
+            path: request path
+            body: request body
+
+        Returns: HTTP status and json payload
+        """
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, {'itn_langs': self.itn_langs, 'punctuation_langs': self.punctuation_langs}
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.metrics.snapshot()
+        if path not in self.batchers:
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown endpoint {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"{path} only accepts POST"}
+
+        start = time.perf_counter()
+        try:
+            lang, text_list, single = self._parse_body(path, body)
+            results = await self.batchers[path].submit(lang, text_list)
+            status, payload = HTTPStatus.OK, {'text': results[0] if single else results}
+        except RequestError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"}
+        self.metrics.record(path, time.perf_counter() - start, error=status != HTTPStatus.OK)
+        return status, payload
+
+    def _parse_body(self, path: str, body: bytes) -> Tuple[str, List[str], bool]:
+        try:
+            request = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be json")
+        if not isinstance(request, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be a json object")
+
+        lang = request.get('lang')
+        if lang not in self.langs[path]:
+            raise RequestError(
+                HTTPStatus.BAD_REQUEST, f"Language '{lang}' is not served by {path}: {sorted(self.langs[path])}"
+            )
+        text = request.get('text')
+        single = isinstance(text, str)
+        text_list = [text] if single else text
+        if not isinstance(text_list, list) or not all(isinstance(sentence, str) for sentence in text_list):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'text' must be a string or a list of strings")
+        return lang, text_list, single
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    # returns method, path, lower cased headers and body, None once the client closed the connection
+    request_line = await _read_line(reader)
+    if not request_line.strip():
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    method, path, _ = parts
+
+    headers = {}
+    while True:
+        line = await _read_line(reader)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if len(headers) >= MAX_HEADER_LINES:
+            raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, f"More than {MAX_HEADER_LINES} headers")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length > 0 else b''
+    return method, path.split('?', 1)[0], headers, body
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    # lines over the limit of the stream reader are rejected instead of failing the connection
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request or header line too long")
+
+
+def _format_response(status: HTTPStatus, payload: Dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode('latin-1') + body
+
+
+async def serve(
+    itn_langs: Iterable[str],
+    punctuation_langs: Iterable[str],
+    host: str = '127.0.0.1',
+    port: int = 8080,
+    workers: int = 1,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_delay: float = DEFAULT_MAX_DELAY,
+    punctuation_memory_budget: Optional[int] = None,
+):
+    """
+    Runs the inference server until it is cancelled
+    """
+    server = InferenceServer(
+        itn_langs,
+        punctuation_langs,
+        workers=workers,
+        max_batch_size=max_batch_size,
+        max_delay=max_delay,
+        punctuation_memory_budget=punctuation_memory_budget,
+    )
+    host, port = await server.start(host, port)
+    print(f"Serving {ITN_ENDPOINT} {server.itn_langs} and {PUNCTUATE_ENDPOINT} {server.punctuation_langs} "
+          f"on http://{host}:{port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def parse_args():
+    parser = ArgumentParser(description="HTTP server for inverse text normalization and punctuation")
+    parser.add_argument("--itn_langs", help="languages served by /itn", nargs='*', default=[], type=str)
+    parser.add_argument("--punctuation_langs", help="languages served by /punctuate", nargs='*', default=[], type=str)
+    parser.add_argument("--host", default='127.0.0.1', type=str)
+    parser.add_argument("--port", default=8080, type=int)
+    parser.add_argument("--workers", help="worker processes, 0 runs in the server process", default=1, type=int)
+    parser.add_argument("--max_batch_size", help="sentences per batch", default=DEFAULT_MAX_BATCH_SIZE, type=int)
+    parser.add_argument("--max_delay_ms", help="time a request waits for a batch", default=DEFAULT_MAX_DELAY * 1000,
+                        type=float)
+    parser.add_argument("--punctuation_memory_mb", help="punctuation weights each worker keeps resident, "
+                        "default PUNCTUATION_MEMORY_BUDGET_MB or unlimited", default=None, type=float)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(
+            serve(
+                args.itn_langs,
+                args.punctuation_langs,
+                host=args.host,
+                port=args.port,
+                workers=args.workers,
+                max_batch_size=args.max_batch_size,
+                max_delay=args.max_delay_ms / 1000,
+                punctuation_memory_budget=(
+                    None if args.punctuation_memory_mb is None else int(args.punctuation_memory_mb * 2 ** 20)
+                ),
+            )
+        )
+    except KeyboardInterrupt:
+        pass
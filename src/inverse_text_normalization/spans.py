@@ -0,0 +1,74 @@
+'''
+Span level inverse text normalization.
+
+The tokenizer of every language splits a sentence at whitespace and lets each chunk be either a
+word, with its punctuation split off, or part of a semiotic class. Classes start at a chunk of the
+lexicon and end at most `Lexicon.tail_length` chunks after their last chunk of the lexicon, so the
+shortest path over the sentence is the concatenation of the shortest paths over those windows and
+over the words between them. Only the windows are run through the grammars, the words in between
+are tokenized in python, and the results are joined back in sentence order.
+'''
+
+from collections import namedtuple
+from typing import Callable, List
+
+from inverse_text_normalization.lexicon import Lexicon, split_chunks, tokenize_chunk
+
+# chunk indices [start, end) of a sentence normalized by the grammars
+Span = namedtuple('Span', 'start end')
+
+
+def find_spans(chunks: List[str], lexicon: Lexicon) -> List[Span]:
+    """
+    Finds the windows of a sentence the grammars could rewrite
+
+    Args:
+        chunks: whitespace separated chunks of a sentence
+        lexicon: lexicon of the language
+
+    Returns: sorted, non overlapping spans
+    """
+    spans = []
+    for index, chunk in enumerate(chunks):
+        if not lexicon.needs_grammars(chunk):
+            continue
+        end = min(index + 1 + lexicon.tail_length, len(chunks))
+        if spans and index <= spans[-1].end:
+            spans[-1] = Span(spans[-1].start, max(spans[-1].end, end))
+        else:
+            spans.append(Span(index, end))
+    return spans
+
+
+def normalize_spans(text: str, lexicon: Lexicon, normalize: Callable[[str], str], cache=None) -> str:
+    """
+    Normalizes a sentence, running `normalize` only on the windows the grammars could rewrite
+
+    Args:
+        text: sentence
+        lexicon: lexicon of the language
+        normalize: function normalizing a whole sentence with the grammars
+        cache: result cache of the language, see result_cache.py
+
+    Returns: written form
+    """
+    chunks = split_chunks(text)
+    spans = find_spans(chunks, lexicon)
+
+    words = []
+    position = 0
+    for span in spans + [Span(len(chunks), len(chunks))]:
+        for chunk in chunks[position:span.start]:
+            words.extend(tokenize_chunk(chunk))
+        if span.start < span.end:
+            # whitespace is collapsed by the tokenizer, so the joined chunks are normalized like the original text
+            window = ' '.join(chunks[span.start:span.end])
+            output = cache.get(window) if cache is not None else None
+            if output is None:
+                output = normalize(window)
+                if cache is not None:
+                    cache.put(window, output)
+            if output:
+                words.append(output)
+        position = span.end
+    return ' '.join(words)
@@ -0,0 +1,105 @@
+'''
+Streaming input and output for inverse text normalization.
+
+Lines are read lazily from a file or stdin and normalized in micro batches, so memory depends
+on the batch size only, not on the size of the input. Files ending in .gz are read and written
+compressed.
+'''
+
+import gzip
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+from inverse_text_normalization.batch import BatchReport
+
+DEFAULT_BATCH_SIZE = 1024
+# path of stdin or stdout
+STD_STREAM = '-'
+
+StreamReport = namedtuple('StreamReport', 'lang sentences batches unique skipped seconds')
+
+
+@contextmanager
+def open_text(path: str, mode: str = 'r', compress: Optional[bool] = None) -> Iterator[TextIO]:
+    """
+    Opens a utf-8 text file, stdin or stdout for streaming
+
+    Args:
+        path: file path, '-' for stdin (mode 'r') or stdout (mode 'w')
+        mode: 'r' or 'w'
+        compress: gzip the stream, by default if path ends with .gz
+
+    Returns: text stream, std streams are not closed
+    """
+    if compress is None:
+        compress = path.endswith('.gz')
+
+    if path == STD_STREAM:
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        if not compress:
+            yield stream
+            return
+        # closing the gzip stream does not close the buffer it wraps
+        with gzip.open(stream.buffer, mode + 't', encoding='utf-8') as fp:
+            yield fp
+        return
+
+    if compress:
+        with gzip.open(path, mode + 't', encoding='utf-8') as fp:
+            yield fp
+    else:
+        with open(path, mode, encoding='utf-8') as fp:
+            yield fp
+
+
+def read_lines(fp: TextIO) -> Iterator[str]:
+    """
+    Lazily yields the stripped lines of a text stream, blank lines included so outputs stay aligned with inputs
+    """
+    for line in fp:
+        yield line.strip()
+
+
+def micro_batches(lines: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[str]]:
+    """
+    Lazily groups lines into lists of at most batch_size lines
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_lines(fp: TextIO, lines: Iterable[str]):
+    """
+    Writes lines to a text stream and flushes it, so the output of a batch is visible right away
+    """
+    for line in lines:
+        fp.write(line + '\n')
+    fp.flush()
+
+
+def add_batch(report: StreamReport, batch_report: BatchReport, seconds: float) -> StreamReport:
+    """
+    Adds the counts of a batch to the report of a stream
+
+    Args:
+        report: report of the stream so far
+        batch_report: report of the batch
+        seconds: wall time of the stream so far, including reading and writing
+    """
+    return StreamReport(
+        lang=report.lang,
+        sentences=report.sentences + batch_report.sentences,
+        batches=report.batches + 1,
+        unique=report.unique + batch_report.unique,
+        skipped=report.skipped + batch_report.skipped,
+        seconds=seconds,
+    )
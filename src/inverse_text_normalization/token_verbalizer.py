@@ -0,0 +1,91 @@
+'''
+Per token verbalization.
+
+The verbalizer of a sentence is the concatenation of the verbalizations of its tokens, joined by a
+single space. Most tokens are words or punctuation, `tokens { name: "..." }`, which verbalize to
+their name, so they are verbalized in python. Only semiotic tokens (cardinal, money, date, ...)
+are composed with the verbalizer of the language, one token at a time, and their output is
+memoized by the serialized token.
+'''
+
+from typing import Callable, List, Optional
+
+from inverse_text_normalization.field_order import serialize, token_orderings
+from inverse_text_normalization.result_cache import LRUCache
+
+DEFAULT_MEMO_SIZE = 100000
+NEMO_NON_BREAKING_SPACE = u"\u00A0"
+# fields of word, whitelist and punctuation tokens, see verbalizers/word.py and verbalizers/punctuation.py
+NAME_FIELDS = {'name', 'pause_length'}
+
+
+def plain_name(token: dict) -> Optional[str]:
+    """
+    Returns the name of a word, whitelist or punctuation token, None for a semiotic token
+
+    Args:
+        token: parsed token, e.g. {'tokens': {'name': 'sleep'}}
+    """
+    fields = token.get('tokens')
+    if len(token) != 1 or not isinstance(fields, dict) or not fields.keys() <= NAME_FIELDS:
+        return None
+    name = fields.get('name')
+    return name if isinstance(name, str) and name else None
+
+
+class TokenVerbalizer:
+    """
+    Verbalizes parsed tagger output token by token
+
+    Args:
+        verbalize: function composing serialized tokens with the verbalizer of the language,
+            returning None if the verbalizer does not accept them
+        permute: `_permute` of the language, used by the permutation fallback
+        maxsize: maximum number of memoized semiotic tokens
+    """
+
+    def __init__(
+        self,
+        verbalize: Callable[[str], Optional[str]],
+        permute: Callable[[dict], List[str]],
+        maxsize: int = DEFAULT_MEMO_SIZE,
+    ):
+        self.verbalize = verbalize
+        self.permute = permute
+        self.memo = LRUCache(maxsize)
+
+    def verbalize_token(self, token: dict) -> str:
+        """
+        Verbalizes a single token
+
+        Args:
+            token: parsed token
+
+        Returns: written form of the token
+        """
+        name = plain_name(token)
+        if name is not None:
+            return name.replace(NEMO_NON_BREAKING_SPACE, " ")
+
+        tagged_text = serialize(token)
+        output = self.memo.get(tagged_text)
+        if output is None:
+            for ordering in token_orderings(token, self.permute):
+                output = self.verbalize(ordering)
+                if output is not None:
+                    break
+            else:
+                raise ValueError(f"Cannot verbalize {tagged_text}")
+            self.memo.put(tagged_text, output)
+        return output
+
+    def __call__(self, tokens: List[dict]) -> str:
+        """
+        Verbalizes the tokens of a sentence
+
+        Args:
+            tokens: list of parsed tokens
+
+        Returns: written form of the sentence
+        """
+        return " ".join(self.verbalize_token(token) for token in tokens)
@@ -0,0 +1,159 @@
+'''
+Export of the ALBERT punctuation models for the torchscript and onnxruntime backends.
+
+Traces the token classifier of every language into TorchScript or ONNX, with the batch and
+sequence dimensions dynamic, next to the checkpoint where Punctuation(lang, backend=...) loads it.
+Every exported model is checked against the eager model on random batches of several shapes, and
+the export fails if a logit differs by more than the tolerance or any predicted label differs.
+
+Usage:
+    python -m punctuate.export [--langs hi ta ...] [--backends torchscript onnxruntime] [--quantize]
+'''
+
+from argparse import ArgumentParser
+from typing import Iterable, List, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from punctuate.punctuate_text import ALBERT_LANGUAGES, EXPORT_EXTENSIONS, Punctuation
+
+# ids of sentences of different lengths and batches of different sizes, the exported graphs must not depend on them
+VERIFY_SHAPES = [(1, 8), (4, 37), (16, 128), (2, 256)]
+ONNX_OPSET = 11
+
+
+class LogitsModel(nn.Module):
+    """
+    Wraps a token classifier to take positional input ids and attention mask and return a (logits,) tuple,
+    which traces and exports the same way for every model output type
+    """
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids: torch.Tensor, attention_mask: torch.Tensor):
+        return self.model(input_ids, attention_mask=attention_mask, return_dict=False)[:1]
+
+
+def sample_inputs(vocab_size: int, batch_size: int, length: int, seed: int = 0):
+    """
+    Returns random input ids and an attention mask with a padded tail in every row but the first
+
+    Args:
+        vocab_size: size of the tokenizer vocabulary
+        batch_size: number of rows
+        length: number of tokens per row
+        seed: seed of the random ids
+
+    Returns: input ids and attention mask
+    """
+    generator = torch.Generator().manual_seed(seed)
+    input_ids = torch.randint(5, vocab_size, (batch_size, length), generator=generator)
+    attention_mask = torch.ones((batch_size, length), dtype=torch.long)
+    for row in range(1, batch_size):
+        attention_mask[row, length - row * length // (2 * batch_size):] = 0
+    return input_ids, attention_mask
+
+
+def verify_export(reference: Punctuation, exported: Punctuation, atol: float = 1e-4) -> float:
+    """
+    Compares the logits of an exported model with the eager one
+
+    Args:
+        reference: punctuation with the eager backend
+        exported: punctuation of the same language with an exported backend
+        atol: largest allowed absolute difference of a logit
+
+    Returns: largest absolute difference of a logit at an unpadded position
+    """
+    max_difference = 0.0
+    for seed, (batch_size, length) in enumerate(VERIFY_SHAPES):
+        input_ids, attention_mask = sample_inputs(reference.tokenizer.vocab_size, batch_size, length, seed)
+        expected = reference.forward(input_ids, attention_mask)
+        actual = exported.forward(input_ids, attention_mask)
+        mask = attention_mask.numpy().astype(bool)
+        difference = float(np.abs(expected - actual)[mask].max())
+        if difference > atol or (np.argmax(expected, axis=2) != np.argmax(actual, axis=2))[mask].any():
+            raise ValueError(
+                f"{reference.language_code}: {exported.backend} model differs from eager, "
+                f"max logit difference {difference} for a batch of {batch_size} x {length}"
+            )
+        max_difference = max(max_difference, difference)
+    return max_difference
+
+
+def export_model(lang: str, backend: str, quantize: bool = False, atol: float = 1e-4) -> str:
+    """
+    Exports the punctuation model of a language and verifies it against the eager model
+
+    Args:
+        lang: language code of an ALBERT model
+        backend: 'torchscript' or 'onnxruntime'
+        quantize: export the int8 quantized model, torchscript only
+        atol: largest allowed absolute difference of a logit
+
+    Returns: path of the exported model
+    """
+    if lang not in ALBERT_LANGUAGES:
+        raise ValueError(f"No exportable punctuation model for {lang}, expected one of {ALBERT_LANGUAGES}")
+    if backend not in EXPORT_EXTENSIONS:
+        raise ValueError(f"Unknown export backend {backend}, expected one of {list(EXPORT_EXTENSIONS)}")
+    if quantize and backend == 'onnxruntime':
+        raise ValueError("Quantized models cannot be exported to onnx")
+
+    reference = Punctuation(lang, quantize=quantize)
+    model = LogitsModel(reference.model).eval()
+    path = reference.exported_model_path(backend)
+    example = tuple(tensor.to(reference.device) for tensor in sample_inputs(reference.tokenizer.vocab_size, 2, 16))
+
+    with torch.no_grad():
+        if backend == 'torchscript':
+            torch.jit.trace(model, example).save(path)
+        else:
+            dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in ['input_ids', 'attention_mask', 'logits']}
+            torch.onnx.export(model, example, path, input_names=['input_ids', 'attention_mask'],
+                              output_names=['logits'], dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET)
+
+    verify_export(reference, Punctuation(lang, quantize=quantize, backend=backend), atol=atol)
+    return path
+
+
+def run_export(langs: Optional[Iterable[str]] = None, backends: Optional[Iterable[str]] = None,
+               quantize: bool = False, atol: float = 1e-4) -> List[str]:
+    """
+    Exports the punctuation models of the given languages for the given backends
+
+    Args:
+        langs: language codes, all ALBERT languages if None
+        backends: export backends, all if None
+        quantize: export the int8 quantized models
+        atol: largest allowed absolute difference of a logit
+
+    Returns: list of paths of the exported models
+    """
+    langs = ALBERT_LANGUAGES if langs is None else langs
+    backends = list(EXPORT_EXTENSIONS) if backends is None else backends
+    paths = []
+    for lang in langs:
+        for backend in backends:
+            paths.append(export_model(lang, backend, quantize=quantize, atol=atol))
+            print(f"{lang} {backend}: {paths[-1]}")
+    return paths
+
+
+def parse_args():
+    parser = ArgumentParser(description="Exports the punctuation models to TorchScript or ONNX")
+    parser.add_argument("--langs", help="language codes, default all", nargs='+', required=False, type=str)
+    parser.add_argument("--backends", help="export backends, default all", nargs='+', required=False, type=str,
+                        choices=list(EXPORT_EXTENSIONS))
+    parser.add_argument("--quantize", help="export the int8 quantized models", action='store_true')
+    parser.add_argument("--atol", help="largest allowed absolute difference of a logit", default=1e-4, type=float)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_export(args.langs, args.backends, args.quantize, args.atol)
@@ -0,0 +1,192 @@
+'''
+Memory mapped punctuation checkpoints.
+
+A checkpoint is converted once into a weights file holding every tensor of its state dict
+back to back, each aligned to ALIGNMENT bytes, and a json manifest with the dtype, shape and
+offset of every tensor and the size and modification time of the checkpoint it was converted
+from. Loading maps the weights file and points the parameters and buffers of the model at views
+of it: nothing is read until it is used, no copy of the weights is made, and processes loading
+the same language share the pages of the file.
+
+A manifest that does not match its checkpoint any more is ignored and the checkpoint is loaded
+with torch.load, until it is converted again.
+
+Usage:
+    python -m punctuate.mapped_checkpoint [--store DIR] [--langs hi ta ...]
+'''
+
+import json
+import os
+from argparse import ArgumentParser
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from punctuate.model_store import ALBERT_LANGUAGES, model_store_path
+
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# prefix of the keys of checkpoints saved from nn.DataParallel
+DATA_PARALLEL_PREFIX = 'module.'
+
+
+def mapped_checkpoint_paths(model_path: str) -> Tuple[str, str]:
+    """
+    Returns the paths of the weights file and manifest of a checkpoint
+    """
+    base = os.path.splitext(model_path)[0]
+    return base + '.weights', base + '.manifest.json'
+
+
+def checkpoint_key(model_path: str) -> Dict[str, float]:
+    return {'size': os.path.getsize(model_path), 'mtime': os.path.getmtime(model_path)}
+
+
+def strip_data_parallel_prefix(state_dict: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+    return {
+        name[len(DATA_PARALLEL_PREFIX):] if name.startswith(DATA_PARALLEL_PREFIX) else name: tensor
+        for name, tensor in state_dict.items()
+    }
+
+
+def convert_checkpoint(model_path: str) -> str:
+    """
+    Writes the weights file and manifest of a checkpoint
+
+    Args:
+        model_path: checkpoint with a 'state_dict' entry, as saved by training
+
+    Returns: path of the manifest
+    """
+    weights_path, manifest_path = mapped_checkpoint_paths(model_path)
+    state_dict = strip_data_parallel_prefix(torch.load(model_path, map_location='cpu')['state_dict'])
+
+    tensors = {}
+    offset = 0
+    with open(weights_path + '.tmp', 'wb') as fp:
+        for name, tensor in state_dict.items():
+            array = tensor.detach().contiguous().numpy()
+            padding = -offset % ALIGNMENT
+            fp.write(b'\0' * padding)
+            offset += padding
+            tensors[name] = {'dtype': array.dtype.name, 'shape': list(array.shape), 'offset': offset}
+            fp.write(array.tobytes())
+            offset += array.nbytes
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(weights_path + '.tmp', weights_path)
+
+    # the manifest is written last, a weights file without one is never loaded
+    manifest = {'format': FORMAT_VERSION, 'checkpoint': checkpoint_key(model_path), 'tensors': tensors}
+    with open(manifest_path + '.tmp', 'w') as fp:
+        json.dump(manifest, fp, indent=1)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest_path
+
+
+def load_manifest(model_path: str) -> Optional[dict]:
+    """
+    Returns the manifest of a checkpoint, None if it was not converted or changed since
+
+    Args:
+        model_path: path of the checkpoint
+
+    Returns: manifest or None
+    """
+    weights_path, manifest_path = mapped_checkpoint_paths(model_path)
+    if not os.path.exists(manifest_path) or not os.path.exists(weights_path):
+        return None
+    with open(manifest_path, 'r') as fp:
+        manifest = json.load(fp)
+    if manifest.get('format') != FORMAT_VERSION or manifest.get('checkpoint') != checkpoint_key(model_path):
+        return None
+    return manifest
+
+
+def map_state_dict(weights_path: str, manifest: dict) -> Dict[str, torch.Tensor]:
+    """
+    Maps the tensors of a weights file
+
+    Args:
+        weights_path: path of the weights file
+        manifest: its manifest
+
+    Returns: state dict of tensors backed by the mapped file
+    """
+    # copy on write, the file is never modified and pages are only copied if a tensor is written
+    data = np.memmap(weights_path, dtype=np.uint8, mode='c')
+    state_dict = {}
+    for name, tensor in manifest['tensors'].items():
+        dtype = np.dtype(tensor['dtype'])
+        count = int(np.prod(tensor['shape'], dtype=np.int64))
+        array = data[tensor['offset']:tensor['offset'] + count * dtype.itemsize].view(dtype)
+        state_dict[name] = torch.from_numpy(array.reshape(tensor['shape']))
+    return state_dict
+
+
+def load_mapped_weights(model: nn.Module, model_path: str, manifest: dict):
+    """
+    Points the parameters and buffers of a model at the mapped tensors of a converted checkpoint
+
+    Args:
+        model: model with the architecture of the checkpoint, its own weights are released
+        model_path: path of the checkpoint
+        manifest: manifest of the checkpoint, see load_manifest
+    """
+    state_dict = map_state_dict(mapped_checkpoint_paths(model_path)[0], manifest)
+    expected = model.state_dict()
+    if set(state_dict) != set(expected):
+        missing = sorted(set(expected) - set(state_dict))
+        unexpected = sorted(set(state_dict) - set(expected))
+        raise ValueError(f"{model_path}: mapped checkpoint does not match the model, "
+                         f"missing {missing}, unexpected {unexpected}")
+
+    for name, tensor in state_dict.items():
+        if tensor.shape != expected[name].shape or tensor.dtype != expected[name].dtype:
+            raise ValueError(f"{model_path}: {name} is {tensor.dtype} {list(tensor.shape)}, "
+                             f"the model expects {expected[name].dtype} {list(expected[name].shape)}")
+        *path, attribute = name.split('.')
+        module = model
+        for part in path:
+            module = getattr(module, part)
+        if attribute in module._parameters:
+            module._parameters[attribute].data = tensor
+        else:
+            module._buffers[attribute] = tensor
+
+
+def run_convert(langs: Optional[Iterable[str]] = None, store: Optional[str] = None) -> List[str]:
+    """
+    Converts the downloaded checkpoints of the given languages
+
+    Args:
+        langs: language codes, all ALBERT languages if None
+        store: model store directory, see `model_store_path`
+
+    Returns: list of paths of the manifests
+    """
+    manifests = []
+    for lang in ALBERT_LANGUAGES if langs is None else langs:
+        model_path = model_store_path(store) + lang + '.pt'
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found, "
+                                    f"prefetch it with: python -m punctuate.model_store --langs {lang}"
+                                    + (f" --store {store}" if store else ""))
+        manifests.append(convert_checkpoint(model_path))
+        print(f"{lang}: {manifests[-1]}")
+    return manifests
+
+
+def parse_args():
+    parser = ArgumentParser(description="Converts punctuation checkpoints into memory mapped weights")
+    parser.add_argument("--store", help="store directory, default PUNCTUATION_MODEL_STORE or the package's model_data",
+                        required=False, type=str)
+    parser.add_argument("--langs", help="language codes, default all", nargs='+', required=False, type=str)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_convert(args.langs, args.store)
@@ -0,0 +1,202 @@
+'''
+Process wide registry of punctuation models.
+
+Models are loaded on first use and kept resident, the ALBERT models of all languages share one
+tokenizer and config. With a memory budget, the least recently used models are evicted until the
+resident models fit in it; the model in use is never evicted, so a single model larger than the
+budget still loads. An evicted model is freed once no caller holds it any more and is loaded again
+on its next use. Models load outside the lock of the registry: threads asking for a resident model
+never wait for a load, threads asking for a model being loaded wait for that load.
+
+The budget of the process wide registry is read from PUNCTUATION_MEMORY_BUDGET_MB, unlimited if
+it is not set.
+'''
+
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from punctuate.punctuate_text import Punctuation, quantize_from_env
+
+MEMORY_BUDGET_ENV = 'PUNCTUATION_MEMORY_BUDGET_MB'
+
+ResidentModel = namedtuple('ResidentModel', 'lang quantize backend size_bytes last_used')
+
+
+def _tensor_bytes(value) -> int:
+    # quantized layers keep their packed weights in tuples
+    if isinstance(value, (list, tuple)):
+        return sum(_tensor_bytes(item) for item in value)
+    if hasattr(value, 'element_size') and hasattr(value, 'numel'):
+        return value.numel() * value.element_size()
+    return 0
+
+
+def model_size(punctuation: Punctuation) -> int:
+    """
+    Returns the bytes of the weights of a punctuation model
+    """
+    if punctuation.backend == 'onnxruntime':
+        return os.path.getsize(punctuation.exported_model_path(punctuation.backend))
+    return sum(_tensor_bytes(value) for value in punctuation.model.state_dict().values())
+
+
+class PunctuationRegistry:
+    """
+    Loads punctuation models on demand and keeps the most recently used ones within a memory budget
+
+    Args:
+        memory_budget: bytes the weights of the resident models may take, unlimited if None
+    """
+
+    def __init__(self, memory_budget: Optional[int] = None):
+        self.memory_budget = memory_budget
+        # (lang, quantize, backend) -> [Punctuation, size in bytes, last use], least recently used first
+        self._models: 'OrderedDict[Tuple[str, bool, str], list]' = OrderedDict()
+        # sizes of models seen before, to make room before they are loaded again
+        self._sizes: Dict[Tuple[str, bool, str], int] = {}
+        # keys being loaded -> event set once the load finished
+        self._loading: Dict[Tuple[str, bool, str], threading.Event] = {}
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, lang: str, quantize: Optional[bool] = None, backend: str = 'eager') -> Punctuation:
+        """
+        Returns the punctuation model of a language, loading it if it is not resident
+
+        Args:
+            lang: language code
+            quantize: int8 quantized model, default from PUNCTUATION_QUANTIZE
+            backend: 'eager', 'torchscript' or 'onnxruntime'
+
+        Returns: Punctuation
+        """
+        key = (lang, quantize_from_env() if quantize is None else quantize, backend)
+        while True:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    entry[2] = time.time()
+                    return entry[0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    self._evict(incoming=self._sizes.get(key, 0))
+                    break
+            # another thread loads the model, its result is picked up on the next round
+            loading.wait()
+
+        # the model loads outside the lock, so resident models stay available meanwhile
+        try:
+            punctuation = Punctuation(lang, quantize=key[1], backend=backend)
+            size = model_size(punctuation)
+            with self._lock:
+                self._sizes[key] = size
+                self._models[key] = [punctuation, size, time.time()]
+                self.loads += 1
+                self._evict()
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+        return punctuation
+
+    def punctuate_text(self, lang: str, text: List[str], quantize: Optional[bool] = None,
+                       backend: str = 'eager') -> List[str]:
+        """
+        Punctuates sentences with the model of a language
+
+        Args:
+            lang: language code
+            text: list of sentences
+            quantize: int8 quantized model, default from PUNCTUATION_QUANTIZE
+            backend: 'eager', 'torchscript' or 'onnxruntime'
+
+        Returns: punctuated sentences
+        """
+        return self.get(lang, quantize=quantize, backend=backend).punctuate_text(text)
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, size, _ in self._models.values())
+
+    def _evict(self, incoming: int = 0):
+        if self.memory_budget is None:
+            return
+        # making room for a model to load may evict all, afterwards the most recently used one stays
+        keep = 0 if incoming else 1
+        evicted = False
+        while len(self._models) > keep and self.resident_bytes() + incoming > self.memory_budget:
+            self._models.popitem(last=False)
+            self.evictions += 1
+            evicted = True
+        if evicted:
+            gc.collect()
+
+    def report(self) -> List[ResidentModel]:
+        """
+        Returns the resident models, most recently used first
+        """
+        with self._lock:
+            return [
+                ResidentModel(lang=lang, quantize=quantize, backend=backend, size_bytes=size, last_used=last_used)
+                for (lang, quantize, backend), (_, size, last_used) in reversed(self._models.items())
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        gc.collect()
+
+    def __len__(self):
+        return len(self._models)
+
+
+def format_report(registry: PunctuationRegistry) -> str:
+    """
+    Formats the resident models of a registry as a table
+    """
+    lines = [f"{'lang':<8}{'quantize':<10}{'backend':<13}{'MB':>9}"]
+    for model in registry.report():
+        lines.append(f"{model.lang:<8}{str(model.quantize):<10}{model.backend:<13}{model.size_bytes / 2 ** 20:>9.1f}")
+    budget = 'unlimited' if registry.memory_budget is None else f"{registry.memory_budget / 2 ** 20:.1f} MB"
+    lines.append(f"resident {registry.resident_bytes() / 2 ** 20:.1f} MB of {budget}, "
+                 f"{registry.loads} loads, {registry.evictions} evictions")
+    return '\n'.join(lines)
+
+
+_registry: Optional[PunctuationRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PunctuationRegistry:
+    """
+    Returns the process wide registry, created with the budget of PUNCTUATION_MEMORY_BUDGET_MB
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            budget = os.environ.get(MEMORY_BUDGET_ENV)
+            _registry = PunctuationRegistry(int(float(budget) * 2 ** 20) if budget else None)
+        return _registry
+
+
+def configure_registry(memory_budget: Optional[int] = None) -> PunctuationRegistry:
+    """
+    Sets the memory budget of the process wide registry, evicting models that no longer fit
+
+    Args:
+        memory_budget: bytes the weights of the resident models may take, unlimited if None
+
+    Returns: the process wide registry
+    """
+    registry = get_registry()
+    with registry._lock:
+        registry.memory_budget = memory_budget
+        registry._evict()
+    return registry
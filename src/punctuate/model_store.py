@@ -0,0 +1,272 @@
+'''
+Local store of the punctuation models.
+
+Every file a language needs is kept under the store directory, and the manifest of the store,
+manifest.json, lists the files of every language with their size, modification time and sha256
+checksum. Starting up compares the files of a language with their recorded sizes and modification
+times; only a file modified since it was recorded, e.g. rewritten in place or copied without its
+times, is read to compare its checksum. A populated store never touches the network. Files are
+downloaded only when a language is missing from the manifest or its files do not match it, and with
+PUNCTUATION_OFFLINE=1 never: a missing file fails right away instead.
+
+The store is the model_data directory of the installed package unless it is given, or set with
+PUNCTUATION_MODEL_STORE. Populate it once, e.g. on a machine with network access before copying
+it into an air-gapped cluster:
+    python -m punctuate.model_store --store /models/punctuation [--langs hi en ...]
+and check every checksum with:
+    python -m punctuate.model_store --store /models/punctuation --verify
+'''
+
+import hashlib
+import json
+import os
+import shutil
+import sysconfig
+import threading
+from argparse import ArgumentParser
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+STORE_ENV = 'PUNCTUATION_MODEL_STORE'
+OFFLINE_ENV = 'PUNCTUATION_OFFLINE'
+DEFAULT_STORE = sysconfig.get_path('purelib') + '/deployed_models/model_data/'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+BUCKET = 'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/'
+ENGLISH_LANGUAGES = ['en', 'en_bio']
+ALBERT_LANGUAGES = ['hi', 'gu', 'te', 'mr', 'kn', 'pa', 'ta', 'bn', 'or', 'ml', 'as']
+ALBERT_METADATA_FILES = ['config.json', 'pytorch_model.bin', 'spiece.model', 'spiece.vocab']
+# huggingface files of the english models, unpacked from an archive
+TRANSFORMERS_CACHE_DIR = 'transformers_cache'
+TRANSFORMERS_ARCHIVE = 'distilbert_base_uncased_huggingface_files.zip'
+
+_manifest_lock = threading.Lock()
+
+
+def model_store_path(model_store: Optional[str] = None) -> str:
+    """
+    Returns the directory of the model store, ending with a separator
+
+    Args:
+        model_store: directory, default PUNCTUATION_MODEL_STORE or the model_data directory of the package
+
+    Returns: directory path
+    """
+    path = model_store or os.environ.get(STORE_ENV) or DEFAULT_STORE
+    return os.path.join(path, '')
+
+
+def is_offline() -> bool:
+    return os.environ.get(OFFLINE_ENV, '').lower() in ['1', 'true', 'yes']
+
+
+def remote_files(lang: str) -> List[Tuple[str, str]]:
+    """
+    Returns (url, path in the store) of the files a language downloads, besides the english archive
+    """
+    if lang in ENGLISH_LANGUAGES:
+        return [(BUCKET + f'{lang}/punctuation_en_distilbert.nemo', 'punctuation_en_distilbert.nemo')]
+    files = [(BUCKET + 'albert_metadata/' + name, 'albert_metadata/' + name) for name in ALBERT_METADATA_FILES]
+    files += [(BUCKET + f'{lang}/{lang}{suffix}', lang + suffix) for suffix in ['.pt', '.json', '_dict.json']]
+    return files
+
+
+def file_checksum(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(2 ** 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def read_manifest(model_store: Optional[str] = None) -> dict:
+    path = model_store_path(model_store) + MANIFEST_FILE
+    if not os.path.exists(path):
+        return {'format': FORMAT_VERSION, 'languages': {}}
+    with open(path, 'r') as fp:
+        manifest = json.load(fp)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported manifest format {manifest.get('format')}")
+    return manifest
+
+
+def _write_manifest(store: str, manifest: dict):
+    tmp_path = store + MANIFEST_FILE + '.tmp'
+    with open(tmp_path, 'w') as fp:
+        json.dump(manifest, fp, indent=1, sort_keys=True)
+    os.replace(tmp_path, store + MANIFEST_FILE)
+
+
+def _entry_matches(store: str, entry: dict) -> bool:
+    """
+    Compares a stored file with its manifest entry, reading it only if it was modified since it was recorded
+
+    Args:
+        store: store directory
+        entry: manifest entry of the file
+
+    Returns: True if the file has the recorded size and content
+    """
+    path = store + entry['path']
+    if not os.path.isfile(path) or os.path.getsize(path) != entry['size']:
+        return False
+    if os.stat(path).st_mtime_ns == entry.get('mtime_ns'):
+        return True
+    return file_checksum(path) == entry['sha256']
+
+
+def check_language(lang: str, model_store: Optional[str] = None) -> bool:
+    """
+    Checks that the files of a language are in the store with their recorded sizes and checksums,
+    the checksums are only compared for files modified since they were recorded
+
+    Args:
+        lang: language code
+        model_store: store directory, see model_store_path
+
+    Returns: True if the language can start from the store
+    """
+    store = model_store_path(model_store)
+    files = read_manifest(store)['languages'].get(lang)
+    if not files:
+        return False
+    checked = []
+    for entry in files:
+        if not _entry_matches(store, entry):
+            return False
+        if os.stat(store + entry['path']).st_mtime_ns != entry.get('mtime_ns'):
+            checked.append(entry['path'])
+    if checked:
+        # files with their recorded content but new times, e.g. after copying the store, are not read again
+        try:
+            _update_times(store, lang, checked)
+        except OSError:
+            # a read-only store is checked again on the next start
+            pass
+    return True
+
+
+def _download(url: str, path: str, bar: Optional[Callable] = None):
+    if is_offline():
+        raise FileNotFoundError(
+            f"{path} is missing or changed and {OFFLINE_ENV} is set, "
+            f"prefetch the models with: python -m punctuate.model_store"
+        )
+    import wget
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # a partial download is never mistaken for the file
+    wget.download(url, path + '.part', bar=bar)
+    os.replace(path + '.part', path)
+
+
+def _record_language(store: str, lang: str, paths: List[str]):
+    entries = [
+        {
+            'path': path,
+            'size': os.path.getsize(store + path),
+            'mtime_ns': os.stat(store + path).st_mtime_ns,
+            'sha256': file_checksum(store + path),
+        }
+        for path in sorted(paths)
+    ]
+    with _manifest_lock:
+        manifest = read_manifest(store)
+        manifest['languages'][lang] = entries
+        _write_manifest(store, manifest)
+
+
+def _update_times(store: str, lang: str, paths: List[str]):
+    with _manifest_lock:
+        manifest = read_manifest(store)
+        for entry in manifest['languages'].get(lang, []):
+            if entry['path'] in paths:
+                entry['mtime_ns'] = os.stat(store + entry['path']).st_mtime_ns
+        _write_manifest(store, manifest)
+
+
+def prefetch_language(lang: str, model_store: Optional[str] = None, bar: Optional[Callable] = None) -> List[str]:
+    """
+    Downloads the files of a language missing from the store and records all of them in the manifest,
+    files already in the store, e.g. of an install from before the manifest, are only recorded
+
+    Args:
+        lang: language code
+        model_store: store directory, see model_store_path
+        bar: progress callback of wget
+
+    Returns: paths of the files of the language, relative to the store
+    """
+    store = model_store_path(model_store)
+    recorded = {entry['path']: entry for entry in read_manifest(store)['languages'].get(lang, [])}
+    paths = []
+    for url, path in remote_files(lang):
+        # a file that no longer matches its entry was cut short or corrupted, it is downloaded again
+        if not os.path.isfile(store + path) or (path in recorded and not _entry_matches(store, recorded[path])):
+            _download(url, store + path, bar)
+        paths.append(path)
+
+    if lang in ENGLISH_LANGUAGES:
+        cache_dir = store + TRANSFORMERS_CACHE_DIR
+        if not os.path.isdir(cache_dir) or not os.listdir(cache_dir):
+            _download(BUCKET + 'en/' + TRANSFORMERS_ARCHIVE, store + TRANSFORMERS_ARCHIVE, bar)
+            shutil.unpack_archive(store + TRANSFORMERS_ARCHIVE, cache_dir)
+            os.remove(store + TRANSFORMERS_ARCHIVE)
+        for root, _, names in os.walk(cache_dir):
+            paths.extend(os.path.relpath(os.path.join(root, name), store) for name in names)
+
+    _record_language(store, lang, paths)
+    return paths
+
+
+def verify_store(langs: Optional[Iterable[str]] = None, model_store: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Compares every file of the given languages with its recorded size and checksum
+
+    Args:
+        langs: language codes, every language of the manifest if None
+        model_store: store directory, see model_store_path
+
+    Returns: lang -> list of problems, empty for a language whose files all match
+    """
+    store = model_store_path(model_store)
+    languages = read_manifest(store)['languages']
+    problems = {}
+    for lang in languages if langs is None else langs:
+        problems[lang] = []
+        if lang not in languages:
+            problems[lang].append('not in the manifest')
+            continue
+        for entry in languages[lang]:
+            path = store + entry['path']
+            if not os.path.isfile(path):
+                problems[lang].append(f"{entry['path']}: missing")
+            elif os.path.getsize(path) != entry['size']:
+                problems[lang].append(f"{entry['path']}: {os.path.getsize(path)} bytes, expected {entry['size']}")
+            elif file_checksum(path) != entry['sha256']:
+                problems[lang].append(f"{entry['path']}: checksum mismatch")
+    return problems
+
+
+def parse_args():
+    parser = ArgumentParser(description="Downloads the punctuation models into a local store, or verifies it")
+    parser.add_argument("--store", help="store directory, default PUNCTUATION_MODEL_STORE or the package's model_data",
+                        required=False, type=str)
+    parser.add_argument("--langs", help="language codes, default all", nargs='+', required=False, type=str)
+    parser.add_argument("--verify", help="check the checksums of the stored files instead of downloading",
+                        action='store_true')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.verify:
+        results = verify_store(args.langs, args.store)
+        for lang, lang_problems in results.items():
+            print(f"{lang}: {'ok' if not lang_problems else ', '.join(lang_problems)}")
+        if any(results.values()):
+            raise SystemExit(1)
+    else:
+        for lang in args.langs or ENGLISH_LANGUAGES + ALBERT_LANGUAGES:
+            prefetch_language(lang, args.store)
+            print(f"{lang}: {model_store_path(args.store)}")
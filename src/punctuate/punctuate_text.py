@@ -1,35 +1,93 @@
 import torch
-from transformers import AlbertForTokenClassification, AlbertTokenizer
+from transformers import AlbertConfig, AlbertForTokenClassification, AlbertTokenizer
 import numpy as np
 import json
 import torch.nn as nn
 from indicnlp.tokenize import indic_tokenize
 import os
-import wget
 import sys
 from nemo.collections.nlp.models import PunctuationCapitalizationModel
-import sysconfig
 import string
-import shutil
-cache = sysconfig.get_path('purelib') + '/'
+import copy
+import threading
+from punctuate.mapped_checkpoint import load_manifest, load_mapped_weights, strip_data_parallel_prefix
+from punctuate.model_store import (
+    ALBERT_LANGUAGES,
+    TRANSFORMERS_CACHE_DIR,
+    check_language,
+    model_store_path,
+    prefetch_language,
+)
+from inverse_text_normalization.micro_batch import (
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_DELAY,
+    AsyncBatchRunner,
+)
+# sentences per forward pass of the albert models
+BATCH_SIZE = 32
+# tokens per window of long sentences, consecutive windows overlap by WINDOW_LENGTH - WINDOW_STRIDE tokens
+WINDOW_LENGTH = 256
+WINDOW_STRIDE = 192
+# quantizes the albert models to int8 when Punctuation is not given quantize, e.g. PUNCTUATION_QUANTIZE=1
+QUANTIZE_ENV = 'PUNCTUATION_QUANTIZE'
+# eager runs the pytorch model, the others a model exported with python -m punctuate.export
+BACKENDS = ['eager', 'torchscript', 'onnxruntime']
+EXPORT_EXTENSIONS = {'torchscript': '.ts', 'onnxruntime': '.onnx'}
+
+# albert_metadata directory -> (tokenizer, config), shared by the models of all languages
+_albert_metadata = {}
+_albert_metadata_lock = threading.Lock()
+
+
+def quantize_from_env():
+    return os.environ.get(QUANTIZE_ENV, '').lower() in ['1', 'true', 'yes']
+
+
+def load_albert_metadata(albert_metadata):
+    with _albert_metadata_lock:
+        if albert_metadata not in _albert_metadata:
+            tokenizer = AlbertTokenizer.from_pretrained(albert_metadata)
+            config = AlbertConfig.from_pretrained(albert_metadata, output_attentions=False, output_hidden_states=False)
+            _albert_metadata[albert_metadata] = (tokenizer, config)
+        return _albert_metadata[albert_metadata]
 
 
 class Punctuation:
-    def __init__(self, language_code):
+    def __init__(self, language_code, quantize=None, backend='eager', model_store=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}")
         self.language_code = language_code
+        self.async_runner = None
+        self.quantize = quantize_from_env() if quantize is None else quantize
+        self.backend = backend
+        self.model_dir = model_store_path(model_store)
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         if self.language_code in ['en', 'en_bio']:
-            os.environ["TRANSFORMERS_CACHE"] = str(cache + 'deployed_models/model_data/transformers_cache')
-            self.model_path = cache+'deployed_models/model_data/punctuation_en_distilbert.nemo'
+            if self.backend != 'eager':
+                raise ValueError(f"The {self.language_code} punctuation model only runs with the eager backend")
+            os.environ["TRANSFORMERS_CACHE"] = self.model_dir + TRANSFORMERS_CACHE_DIR
+            self.model_path = self.model_dir + 'punctuation_en_distilbert.nemo'
             self.download_model_data()
             self.model = PunctuationCapitalizationModel.restore_from(self.model_path)
             self.model = self.model.to(self.device)
         else:
-            self.model_path = cache + 'deployed_models/model_data/' + self.language_code + '.pt'
-            self.albert_metadata = cache + 'deployed_models/model_data/albert_metadata/'
-            self.encoder_path = cache + 'deployed_models/model_data/' + self.language_code + '.json'
-            self.dict_map = cache + 'deployed_models/model_data/' + self.language_code + '_dict.json'
+            self.model_path = self.model_dir + self.language_code + '.pt'
+            self.albert_metadata = self.model_dir + 'albert_metadata/'
+            self.encoder_path = self.model_dir + self.language_code + '.json'
+            self.dict_map = self.model_dir + self.language_code + '_dict.json'
+            self.quantized_model_path = self.model_dir + self.language_code + '.int8.pt'
+            if self.quantize and self.device == 'cuda':
+                # dynamically quantized models only run on the cpu, the float model runs on the gpu instead
+                self.quantize = False
+            if self.quantize and self.backend == 'onnxruntime':
+                raise ValueError("Quantized models cannot be exported to onnx")
+            if self.quantize or self.backend == 'onnxruntime':
+                # onnxruntime runs on the cpu
+                self.device = "cpu"
             self.tokenizer, self.model, self.train_encoder, self.punctuation_dict = self.load_model_parameters()
+            self.index_to_label = self.get_index_to_label()
+            self.sentence_end_labels = self.get_sentence_end_labels()
 
     def bar_thermometer(self, current, total, width=80):
         progress_message = "Downloading: %d%% [%d / %d] bytes" % (current / total * 100, current, total)
@@ -37,63 +95,14 @@ class Punctuation:
         sys.stdout.flush()
 
     def download_model_data(self):
-        
-        if not os.path.exists(cache + 'deployed_models/model_data/transformers_cache'):
-            os.makedirs(cache + 'deployed_models/model_data/transformers_cache')
-
-        if not os.path.exists(cache+'deployed_models/model_data'):
-            os.makedirs(cache+'deployed_models/model_data', exist_ok=True)
-
-        if not os.path.exists(cache + 'deployed_models/model_data/albert_metadata'):
-            os.makedirs(cache + 'deployed_models/model_data/albert_metadata/', exist_ok=True)
-
-        if self.language_code in ['en', 'en_bio']:
-            if len(os.listdir(cache + 'deployed_models/model_data/transformers_cache')) != 15:
-                wget.download(
-                    f'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/en/distilbert_base_uncased_huggingface_files.zip',
-                    cache + 'deployed_models/model_data/', bar=self.bar_thermometer
-                )
-                shutil.unpack_archive(cache + 'deployed_models/model_data' + '/distilbert_base_uncased_huggingface_files.zip',
-                                      cache + 'deployed_models/model_data/transformers_cache/')
-                
-            if not os.path.exists(self.model_path):
-                wget.download(
-                    f'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/{self.language_code}/punctuation_en_distilbert.nemo',
-                    self.model_path, bar=self.bar_thermometer)
-        else:
-            if len(os.listdir(self.albert_metadata)) != 4:
-                wget.download(
-                    'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/albert_metadata/config.json',
-                    self.albert_metadata + 'config.json', bar=self.bar_thermometer
-                )
-                wget.download(
-                    'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/albert_metadata/pytorch_model.bin',
-                    self.albert_metadata + 'pytorch_model.bin', bar=self.bar_thermometer
-                )
-                wget.download(
-                    'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/albert_metadata/spiece.model',
-                    self.albert_metadata + 'spiece.model', bar=self.bar_thermometer
-                )
-                wget.download(
-                    'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/albert_metadata/spiece.vocab',
-                    self.albert_metadata + 'spiece.vocab', bar=self.bar_thermometer
-                )
-
-            if not os.path.exists(self.model_path):
-                wget.download(
-                    f'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/{self.language_code}/{self.language_code}.pt',
-                    self.model_path, bar=self.bar_thermometer
-                )
-            if not os.path.exists(self.encoder_path):
-                wget.download(
-                    f'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/{self.language_code}/{self.language_code}.json',
-                    self.encoder_path, bar=self.bar_thermometer
-                )
-            if not os.path.exists(self.dict_map):
-                wget.download(
-                    f'https://storage.googleapis.com/vakyansh-open-models/punctuation_models/{self.language_code}/{self.language_code}_dict.json',
-                    self.dict_map, bar=self.bar_thermometer
-                )
+        # a language recorded in the manifest of the model store starts without touching the network
+        if check_language(self.language_code, self.model_dir):
+            if self.language_code in ['en', 'en_bio']:
+                # the huggingface files are all in the store, transformers must not look for updates
+                os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+                os.environ.setdefault("HF_HUB_OFFLINE", "1")
+            return
+        prefetch_language(self.language_code, self.model_dir, bar=self.bar_thermometer)
 
     def load_model_parameters(self):
         self.download_model_data()
@@ -102,61 +111,173 @@ class Punctuation:
         with open(self.dict_map) as dict_map:
             punctuation_dict = json.load(dict_map)
 
-        tokenizer = AlbertTokenizer.from_pretrained(self.albert_metadata)
+        tokenizer, _ = load_albert_metadata(self.albert_metadata)
 
-        model = AlbertForTokenClassification.from_pretrained(self.albert_metadata,
-                                                             num_labels=len(train_encoder),
-                                                             output_attentions=False,
-                                                             output_hidden_states=False)
+        if self.backend == 'eager':
+            model = self.load_eager_model(len(train_encoder))
+        else:
+            model = self.load_exported_model()
+        return tokenizer, model, train_encoder, punctuation_dict
 
-        model = nn.DataParallel(model)
-        checkpoint = torch.load(self.model_path, map_location=self.device)
-        model.load_state_dict(checkpoint['state_dict'])
-        model = model.module.to(self.device)
+    def load_eager_model(self, num_labels):
+        model = self.load_quantized_model(num_labels) if self.quantize else None
+        if model is None:
+            # every weight comes from the checkpoint, the pretrained ones are not loaded
+            model = AlbertForTokenClassification(self.albert_config(num_labels))
+
+            manifest = load_manifest(self.model_path)
+            if manifest is not None:
+                # converted with python -m punctuate.mapped_checkpoint, the weights are mapped, not read
+                load_mapped_weights(model, self.model_path, manifest)
+            else:
+                checkpoint = torch.load(self.model_path, map_location='cpu')
+                model.load_state_dict(strip_data_parallel_prefix(checkpoint['state_dict']))
+                del checkpoint
+            model = model.to(self.device)
+            if self.quantize:
+                model = self.quantize_model(model)
+                self.save_quantized_model(model)
 
         model.eval()
-        return tokenizer, model, train_encoder, punctuation_dict
+        return model
+
+    def exported_model_path(self, backend):
+        return (self.model_dir + self.language_code + ('.int8' if self.quantize else '')
+                + EXPORT_EXTENSIONS[backend])
+
+    def load_exported_model(self):
+        path = self.exported_model_path(self.backend)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found, export it with: python -m punctuate.export "
+                                    f"--langs {self.language_code} --backends {self.backend}"
+                                    + (" --quantize" if self.quantize else ""))
+        if self.backend == 'torchscript':
+            model = torch.jit.load(path, map_location=self.device)
+            model.eval()
+            return model
+        import onnxruntime
+
+        return onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+
+    def forward(self, input_ids, attention_mask):
+        if self.backend == 'onnxruntime':
+            inputs = {'input_ids': input_ids.numpy(), 'attention_mask': attention_mask.numpy()}
+            return self.model.run(['logits'], inputs)[0]
+        with torch.no_grad():
+            output = self.model(input_ids.to(self.device), attention_mask=attention_mask.to(self.device))
+        return output[0].to('cpu').numpy()
+
+    def albert_config(self, num_labels):
+        config = copy.deepcopy(load_albert_metadata(self.albert_metadata)[1])
+        config.num_labels = num_labels
+        return config
+
+    def quantize_model(self, model):
+        model.eval()
+        return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    def quantized_model_key(self):
+        # the cached weights are stale once the checkpoint or the torch version changes
+        return {
+            'checkpoint_size': os.path.getsize(self.model_path),
+            'checkpoint_mtime': os.path.getmtime(self.model_path),
+            'torch': torch.__version__,
+        }
+
+    def load_quantized_model(self, num_labels):
+        if not os.path.exists(self.quantized_model_path):
+            return None
+        quantized = torch.load(self.quantized_model_path, map_location='cpu')
+        if quantized.get('key') != self.quantized_model_key():
+            return None
+        model = self.quantize_model(AlbertForTokenClassification(self.albert_config(num_labels)))
+        model.load_state_dict(quantized['state_dict'])
+        return model
+
+    def save_quantized_model(self, model):
+        # the cache is optional, in a read-only store the model is quantized again on every load
+        tmp_path = self.quantized_model_path + '.tmp'
+        try:
+            torch.save({'key': self.quantized_model_key(), 'state_dict': model.state_dict()}, tmp_path)
+            os.replace(tmp_path, self.quantized_model_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def get_logits_from_encoded(self, encoded, batch_size=BATCH_SIZE):
+        # sequences of similar length share a batch, so little padding is needed
+        order = sorted(range(len(encoded)), key=lambda k: len(encoded[k]))
+        results = [None] * len(encoded)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            max_length = max(len(encoded[k]) for k in batch)
+            input_ids = torch.full((len(batch), max_length), self.tokenizer.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), max_length), dtype=torch.long)
+            for row, k in enumerate(batch):
+                input_ids[row, :len(encoded[k])] = torch.tensor(encoded[k], dtype=torch.long)
+                attention_mask[row, :len(encoded[k])] = 1
+            logits = self.forward(input_ids, attention_mask)
+            for row, k in enumerate(batch):
+                results[k] = logits[row, :len(encoded[k])]
+        return results
+
+    def get_tokens_and_labels_indices_from_encoded(self, encoded, batch_size=BATCH_SIZE):
+        logits = self.get_logits_from_encoded(encoded, batch_size)
+        return [(self.tokenizer.convert_ids_to_tokens(ids), np.argmax(sentence_logits, axis=1))
+                for ids, sentence_logits in zip(encoded, logits)]
+
+    def get_tokens_and_labels_indices_from_texts(self, texts, batch_size=BATCH_SIZE):
+        encoded = [self.tokenizer.encode(text) for text in texts]
+        return self.get_tokens_and_labels_indices_from_encoded(encoded, batch_size)
 
     def get_tokens_and_labels_indices_from_text(self, text):
+        tokens, label_indices = self.get_tokens_and_labels_indices_from_texts([text])[0]
+        return tokens, label_indices[np.newaxis]
 
-        tokenized_sentence = self.tokenizer.encode(text)
-        input_ids = torch.tensor([tokenized_sentence]).to(self.device)
-        with torch.no_grad():
-            output = self.model(input_ids)
-        label_indices = np.argmax(output[0].to('cpu').numpy(), axis=2)
-        tokens = self.tokenizer.convert_ids_to_tokens(input_ids.to('cpu').numpy()[0])
-        return tokens, label_indices
+    def get_index_to_label(self):
+        index_to_label = np.empty(max(self.train_encoder.values()) + 1, dtype=object)
+        for label, index in self.train_encoder.items():
+            index_to_label[index] = 'blank' if label == 'PAD' else label #fix for PAD predicted in outputs
+        return index_to_label
 
-    def punctuate_text_others_sentence(self, sentence):
+    def get_sentence_end_labels(self):
+        return np.array([any(mark in self.punctuation_dict.get(label, '') for mark in '.।?')
+                         for label in self.index_to_label])
 
-        tokens, label_indices = self.get_tokens_and_labels_indices_from_text(sentence)
+    def decode_sentence(self, sentence, tokens, label_indices):
 
-        new_tokens = []
-        new_labels = []
+        # a word piece starting with ▁ begins a new word, [CLS] and [SEP] are skipped
+        word_pieces = []
+        word_starts = []
         for i in range(1, len(tokens) - 1):
             if tokens[i].startswith("▁"):
-                current_word = tokens[i][1:]
-                new_labels.append(list(self.train_encoder.keys())[list(self.train_encoder.values()).index(label_indices[0][i])])
-                for j in range(i + 1, len(tokens) - 1):
-                    if not tokens[j].startswith("▁"):
-                        current_word = current_word + tokens[j]
-                    if tokens[j].startswith("▁"):
-                        break
-                new_tokens.append(current_word)
-        full_text = ''
-        tokenized_text = indic_tokenize.trivial_tokenize_indic(sentence)
-            
-        new_labels = ['blank' if x=='PAD' else x for x in new_labels] #fix for PAD predicted in outputs
+                word_pieces.append([tokens[i][1:]])
+                word_starts.append(i)
+            elif word_pieces:
+                word_pieces[-1].append(tokens[i])
+        new_tokens = [''.join(pieces) for pieces in word_pieces]
+        new_labels = self.index_to_label[np.asarray(label_indices)[word_starts]] if word_starts else []
 
+        tokenized_text = indic_tokenize.trivial_tokenize_indic(sentence)
         if len(tokenized_text) == len(new_labels):
             full_text_tokens = tokenized_text
         else:
             full_text_tokens = new_tokens
 
-        for word, punctuation in zip(full_text_tokens, new_labels):
-            full_text = full_text + word + self.punctuation_dict[punctuation]
+        return ''.join([word + self.punctuation_dict[punctuation]
+                        for word, punctuation in zip(full_text_tokens, new_labels)])
 
-        return full_text
+    def punctuate_text_others_sentences(self, sentences, batch_size=BATCH_SIZE, encoded=None):
+        if encoded is None:
+            encoded = [self.tokenizer.encode(sentence) for sentence in sentences]
+        tokens_and_labels = self.get_tokens_and_labels_indices_from_encoded(encoded, batch_size)
+        return [self.decode_sentence(sentence, tokens, label_indices)
+                for sentence, (tokens, label_indices) in zip(sentences, tokens_and_labels)]
+
+    def punctuate_text_others_sentence(self, sentence):
+        return self.punctuate_text_others_sentences([sentence])[0]
 
     def punctuate_text_others_buffer(self, sentence, buffer_length=400):
         words = sentence.split()
@@ -177,43 +298,138 @@ class Punctuation:
             sentence = ' '.join(words[beg_word:])
         return txt + self.punctuate_text_others_sentence(sentence)
 
-    def punctuate_text_others(self, text):
-        sentences = []
-        for sentence in text:
-            sentences.append(self.punctuate_text_others_buffer(sentence))
+    def merge_window_labels(self, word_starts, window_starts, window_logits):
+        # consecutive windows hand over after the word of their overlap most likely to end a sentence,
+        # so the next window labels from the start of a sentence it saw whole
+        label_indices = np.zeros(len(word_starts), dtype=np.int64)
+        position = 0
+        for w, (start, logits) in enumerate(zip(window_starts, window_logits)):
+            logits = logits[1:-1]
+            end = start + len(logits)
+            cut = end
+            if w + 1 < len(window_starts):
+                first = max(window_starts[w + 1], position)
+                overlap = logits[first - start:]
+                probabilities = np.exp(overlap - overlap.max(axis=1, keepdims=True))
+                probabilities = probabilities / probabilities.sum(axis=1, keepdims=True)
+                sentence_end = probabilities[:, self.sentence_end_labels].sum(axis=1) * word_starts[first:end]
+                cut = first + int(np.argmax(sentence_end)) + 1
+            label_indices[position:cut] = np.argmax(logits[position - start:cut - start], axis=1)
+            position = cut
+        return label_indices
+
+    def punctuate_text_others_documents(self, documents, batch_size=BATCH_SIZE, window_length=WINDOW_LENGTH,
+                                        stride=WINDOW_STRIDE):
+        window_tokens = window_length - 2
+        # windows must overlap, the merge hands over to the next window inside the overlap
+        if not 0 < stride < window_tokens:
+            raise ValueError(f"stride must be at least 1 and less than {window_tokens}, got {stride}")
+
+        # documents are encoded once, the windows of all documents run in one batched pass
+        document_ids = [self.tokenizer.encode(document, add_special_tokens=False) for document in documents]
+        window_starts = []
+        encoded = []
+        for ids in document_ids:
+            starts = [0]
+            while starts[-1] + window_tokens < len(ids):
+                starts.append(starts[-1] + stride)
+            window_starts.append(starts)
+            encoded.extend(self.tokenizer.build_inputs_with_special_tokens(ids[start:start + window_tokens])
+                           for start in starts)
+        logits = self.get_logits_from_encoded(encoded, batch_size)
+
+        punctuated = []
+        first_window = 0
+        for document, ids, starts in zip(documents, document_ids, window_starts):
+            tokens = self.tokenizer.convert_ids_to_tokens(ids)
+            word_starts = np.array([token.startswith("▁") for token in tokens], dtype=bool)
+            label_indices = self.merge_window_labels(word_starts, starts,
+                                                     logits[first_window:first_window + len(starts)])
+            first_window += len(starts)
+            tokens = [self.tokenizer.cls_token] + tokens + [self.tokenizer.sep_token]
+            punctuated.append(self.decode_sentence(document, tokens, np.pad(label_indices, 1)))
+        return punctuated
+
+    def punctuate_text_others(self, text, batch_size=BATCH_SIZE, buffer_length=400, sliding_window=True):
+        # sentences fitting in one window of tokens are punctuated in batches, longer ones in token windows
+        # or, without sliding_window, in buffers of buffer_length words one after another
+        sentences = [None] * len(text)
+        encoded = [self.tokenizer.encode(sentence) for sentence in text]
+        short = [i for i in range(len(text)) if len(encoded[i]) <= WINDOW_LENGTH]
+        punctuated = self.punctuate_text_others_sentences([text[i] for i in short], batch_size,
+                                                          encoded=[encoded[i] for i in short])
+        for i, sentence in zip(short, punctuated):
+            sentences[i] = sentence
+
+        long = [i for i in range(len(text)) if sentences[i] is None]
+        if sliding_window:
+            punctuated = self.punctuate_text_others_documents([text[i] for i in long], batch_size)
+        else:
+            punctuated = [self.punctuate_text_others_buffer(text[i], buffer_length) for i in long]
+        for i, sentence in zip(long, punctuated):
+            sentences[i] = sentence
         return sentences
 
     def punctuate_english_sentence(self, sentence, buffer_length=400):
-        words = sentence.split()
-        sentence_length = len(words)
-        txt = ''
-        beg_word = 0
-        i = 1
-        while sentence_length > buffer_length:
-            sentence_segment = ' '.join(words[beg_word:i*buffer_length])
-            txt = txt + self.model.add_punctuation_capitalization([sentence_segment])[0] + ' '
-            full_stop_position = len(txt) - txt[::-1].find('.') - 1
-            question_mark_position = len(txt) - txt[::-1].find('?') - 1
-            end_position = full_stop_position if full_stop_position >= question_mark_position else question_mark_position
-            beg_word = len(txt[:end_position].translate(str.maketrans('', '', string.punctuation + '।')).split())
-            sentence_length = sentence_length - beg_word
-            i = i + 1
-            sentence = ' '.join(words[beg_word:])
-
-        return txt + self.model.add_punctuation_capitalization([sentence])[0]
-
-    def punctuate_text_english(self, text):
-        sentences = []
-        for sentence in text:
-            sentences.append(self.punctuate_english_sentence(sentence))
+        return self.punctuate_text_english([sentence], buffer_length=buffer_length)[0]
+
+    def punctuate_text_english(self, text, batch_size=BATCH_SIZE, buffer_length=400):
+        # every round punctuates the next window of all unfinished sentences in one batched call
+        words = [sentence.split() for sentence in text]
+        sentence_length = [len(sentence_words) for sentence_words in words]
+        txt = [''] * len(text)
+        beg_word = [0] * len(text)
+        window = [1] * len(text)
+        sentences = [None] * len(text)
+        active = list(range(len(text)))
+        while active:
+            segments = []
+            for k in active:
+                if sentence_length[k] > buffer_length:
+                    segments.append(' '.join(words[k][beg_word[k]:window[k]*buffer_length]))
+                elif window[k] == 1:
+                    segments.append(text[k])
+                else:
+                    segments.append(' '.join(words[k][beg_word[k]:]))
+            punctuated = self.model.add_punctuation_capitalization(segments, batch_size=batch_size)
+
+            unfinished = []
+            for k, segment in zip(active, punctuated):
+                if sentence_length[k] > buffer_length:
+                    txt[k] = txt[k] + segment + ' '
+                    full_stop_position = len(txt[k]) - txt[k][::-1].find('.') - 1
+                    question_mark_position = len(txt[k]) - txt[k][::-1].find('?') - 1
+                    end_position = full_stop_position if full_stop_position >= question_mark_position else question_mark_position
+                    beg_word[k] = len(txt[k][:end_position].translate(str.maketrans('', '', string.punctuation + '।')).split())
+                    sentence_length[k] = sentence_length[k] - beg_word[k]
+                    window[k] = window[k] + 1
+                    unfinished.append(k)
+                else:
+                    sentences[k] = txt[k] + segment
+            active = unfinished
         return sentences
 
     def punctuate_text(self, text):
         if self.language_code in ['en', 'en_bio']:
             return self.punctuate_text_english(text)
-        elif self.language_code in ['hi', 'gu', 'te', 'mr', 'kn', 'pa', 'ta', 'bn', 'or', 'ml', 'as']:
+        elif self.language_code in ALBERT_LANGUAGES:
             return self.punctuate_text_others(text)
 
+    def configure_async(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                        max_delay=DEFAULT_MAX_DELAY):
+        # concurrent apunctuate_text calls are batched on an executor thread, at most max_concurrency in flight.
+        # blocks until the running batches of the previous configuration finish, so not to be called from a running loop
+        if self.async_runner is not None:
+            self.async_runner.close()
+        self.async_runner = AsyncBatchRunner(lambda language_code, text: self.punctuate_text(text),
+                                             max_concurrency=max_concurrency, max_batch_size=max_batch_size,
+                                             max_delay=max_delay)
+
+    async def apunctuate_text(self, text):
+        if self.async_runner is None:
+            self.configure_async()
+        return await self.async_runner.run(self.language_code, list(text))
+
 
 if __name__ == "__main__":
     
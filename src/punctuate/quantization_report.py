@@ -0,0 +1,169 @@
+'''
+Accuracy and latency of the int8 quantized punctuation models.
+
+Punctuates a held-out set of every language with the full precision and the quantized ALBERT model
+and reports, per language and model, the load time, the time per sentence, the share of words
+followed by the reference punctuation and the share of sentences the quantized model punctuates
+exactly like the full precision one.
+
+The held-out set of a language is <data_dir>/<lang>.txt, one punctuated sentence per line; the
+punctuation is stripped before the sentences are passed to the models.
+
+Usage:
+    python -m punctuate.quantization_report --data_dir held_out [--langs hi ta ...] [--repeat 3]
+'''
+
+import gc
+import os
+import string
+import time
+from argparse import ArgumentParser
+from collections import namedtuple
+from typing import Iterable, List, Optional, Tuple
+
+from punctuate.punctuate_text import ALBERT_LANGUAGES, Punctuation
+
+PUNCTUATION_MARKS = string.punctuation + '।'
+
+QuantizationResult = namedtuple(
+    'QuantizationResult', 'lang variant sentences load_seconds sentence_ms accuracy agreement'
+)
+
+
+def split_punctuation(sentence: str) -> List[Tuple[str, str]]:
+    """
+    Splits a punctuated sentence into words and the punctuation following them
+
+    Args:
+        sentence: punctuated sentence
+
+    Returns: list of (word, punctuation) pairs, punctuation is '' for none
+    """
+    words = []
+    for token in sentence.split():
+        word = token.rstrip(PUNCTUATION_MARKS)
+        if word:
+            words.append((word, token[len(word):]))
+        elif words:
+            # punctuation written apart from its word
+            words[-1] = (words[-1][0], words[-1][1] + token)
+    return words
+
+
+def punctuation_accuracy(predictions: List[str], references: List[str]) -> float:
+    """
+    Share of words followed by the same punctuation as in the reference, all words of a sentence
+    count as wrong when the prediction has a different number of words
+
+    Args:
+        predictions: punctuated sentences
+        references: reference sentences, in the same order
+
+    Returns: accuracy between 0 and 1
+    """
+    correct = 0
+    total = 0
+    for prediction, reference in zip(predictions, references):
+        predicted_words = split_punctuation(prediction)
+        reference_words = split_punctuation(reference)
+        total += len(reference_words)
+        if len(predicted_words) == len(reference_words):
+            correct += sum(predicted[1] == expected[1] for predicted, expected in zip(predicted_words, reference_words))
+    return correct / total if total else 1.0
+
+
+def read_held_out(path: str) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as fp:
+        return [line.strip() for line in fp if line.strip()]
+
+
+def _punctuate(punctuation: Punctuation, sentences: List[str], repeat: int) -> Tuple[List[str], float]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        predictions = punctuation.punctuate_text(sentences)
+    return predictions, (time.perf_counter() - start) * 1000 / (repeat * len(sentences))
+
+
+def evaluate_language(lang: str, references: List[str], repeat: int = 3) -> List[QuantizationResult]:
+    """
+    Punctuates the held-out sentences of a language with the full precision and the quantized model
+
+    Args:
+        lang: language code of an ALBERT model
+        references: punctuated held-out sentences
+        repeat: number of times the sentences are punctuated for timing
+
+    Returns: list of results, full precision first
+    """
+    if lang not in ALBERT_LANGUAGES:
+        raise ValueError(f"No quantized punctuation model for {lang}, expected one of {ALBERT_LANGUAGES}")
+    if not references:
+        raise ValueError(f"{lang}: empty held-out set")
+    sentences = [' '.join(word for word, _ in split_punctuation(reference)) for reference in references]
+
+    results = []
+    baseline = None
+    for variant, quantize in [('fp32', False), ('int8', True)]:
+        start = time.perf_counter()
+        punctuation = Punctuation(lang, quantize=quantize)
+        load_seconds = time.perf_counter() - start
+        predictions, sentence_ms = _punctuate(punctuation, sentences, repeat)
+        # only one model is kept in memory at a time
+        del punctuation
+        gc.collect()
+
+        if baseline is None:
+            baseline = predictions
+        agreement = sum(prediction == expected for prediction, expected in zip(predictions, baseline)) / len(baseline)
+        results.append(
+            QuantizationResult(
+                lang=lang,
+                variant=variant,
+                sentences=len(sentences),
+                load_seconds=load_seconds,
+                sentence_ms=sentence_ms,
+                accuracy=punctuation_accuracy(predictions, references),
+                agreement=agreement,
+            )
+        )
+    return results
+
+
+def run_report(data_dir: str, langs: Optional[Iterable[str]] = None, repeat: int = 3) -> List[QuantizationResult]:
+    """
+    Evaluates the quantized models of the given languages on their held-out sets and prints a table
+
+    Args:
+        data_dir: directory holding <lang>.txt held-out sets
+        langs: language codes, default every language with a held-out set
+        repeat: number of times the sentences are punctuated for timing
+
+    Returns: list of results
+    """
+    if langs is None:
+        langs = [lang for lang in ALBERT_LANGUAGES if os.path.exists(os.path.join(data_dir, lang + '.txt'))]
+    print(f"{'lang':<6}{'variant':<9}{'sentences':>10}{'load s':>9}{'sentence ms':>13}{'accuracy':>10}{'agreement':>11}")
+    results = []
+    for lang in langs:
+        references = read_held_out(os.path.join(data_dir, lang + '.txt'))
+        for result in evaluate_language(lang, references, repeat=repeat):
+            print(
+                f"{lang:<6}{result.variant:<9}{result.sentences:>10}{result.load_seconds:>9.2f}"
+                f"{result.sentence_ms:>13.2f}{result.accuracy:>10.4f}{result.agreement:>11.4f}"
+            )
+            results.append(result)
+    return results
+
+
+def parse_args():
+    parser = ArgumentParser(description="Compares the full precision and the int8 quantized punctuation models")
+    parser.add_argument("--data_dir", help="directory with a <lang>.txt held-out set per language", required=True, type=str)
+    parser.add_argument("--langs", help="language codes, default every language with a held-out set", nargs='+',
+                        required=False, type=str)
+    parser.add_argument("--repeat", help="times the sentences are punctuated for timing", default=3, type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_report(args.data_dir, args.langs, args.repeat)